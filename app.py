@@ -1,3 +1,6 @@
+import sqlite3
+
+from textual import work
 from textual.app import App, ComposeResult
 from textual.containers import Container
 from textual.widgets import (
@@ -11,12 +14,18 @@ from textual.theme import Theme
 from database import (
     DB_FILE,
     init_db,
+    close_connections,
 )
+import async_database
+import backup
+import instrumentation
+import maintenance
 
 from screens.provider.provider_management import ProviderManagement
 from screens.client.client_management import ClientManagement
 from screens.message.message_management import MessageManagement
 from screens.invoice.invoice_management import InvoiceManagement
+from screens.report.report_screen import ReportScreen
 
 # Define solarized-dark theme
 solarized_dark_theme = Theme(
@@ -53,6 +62,55 @@ class pynvoice(App):
         self.register_theme(solarized_dark_theme)
         # Set the app's theme
         self.theme = "solarized-dark"
+        # Optional periodic backups (PYNVOICE_BACKUP_INTERVAL, in minutes)
+        interval = backup.interval_from_env()
+        if interval:
+            self.set_interval(interval, self.start_backup)
+        # Optional periodic maintenance (PYNVOICE_MAINTENANCE_INTERVAL, minutes)
+        interval = maintenance.interval_from_env()
+        if interval:
+            self.set_interval(interval, self.start_maintenance)
+
+    def start_backup(self) -> None:
+        """Start a background backup unless the previous one is still running."""
+        if not any(
+            worker.group == "backup" and worker.is_running for worker in self.workers
+        ):
+            self.run_backup()
+
+    @work(thread=True, group="backup")
+    def run_backup(self) -> None:
+        """Copy the database step by step off the UI thread."""
+        try:
+            backup.backup_from_env()
+        except (sqlite3.Error, OSError, ValueError) as e:
+            self.call_from_thread(self.notify, f"Backup failed: {e}", severity="error")
+
+    def start_maintenance(self) -> None:
+        """Start background maintenance unless the previous run is still going."""
+        if not any(
+            worker.group == "maintenance" and worker.is_running
+            for worker in self.workers
+        ):
+            self.run_maintenance()
+
+    @work(thread=True, group="maintenance")
+    def run_maintenance(self) -> None:
+        """Analyze, vacuum and check within the default time budget."""
+        try:
+            result = maintenance.run_maintenance()
+        except sqlite3.Error as e:
+            self.call_from_thread(
+                self.notify, f"Maintenance failed: {e}", severity="error"
+            )
+            return
+        if result.problems:
+            self.call_from_thread(
+                self.notify,
+                "Database integrity check found problems; "
+                "run `python cli.py maintain --full-check`",
+                severity="error",
+            )
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -71,6 +129,7 @@ class pynvoice(App):
                 Button("👤 Providers", id="sender_management", classes="menu-option"),
                 Button("🏢 Clients", id="client_management", classes="menu-option"),
                 Button("💬 Messages", id="footer_management", classes="menu-option"),
+                Button("📊 Reports", id="report_management", classes="menu-option"),
                 Button(
                     "🚪 Exit",
                     id="exit",
@@ -92,6 +151,8 @@ class pynvoice(App):
             self.push_screen(ClientManagement())
         elif event.button.id == "footer_management":
             self.push_screen(MessageManagement())
+        elif event.button.id == "report_management":
+            self.push_screen(ReportScreen())
         elif event.button.id == "exit":
             self.exit()
 
@@ -106,6 +167,8 @@ class pynvoice(App):
                 self.push_screen(ClientManagement())
             elif event.widget.id == "footer_management":
                 self.push_screen(MessageManagement())
+            elif event.widget.id == "report_management":
+                self.push_screen(ReportScreen())
             elif event.widget.id == "exit":
                 self.exit()
 
@@ -120,6 +183,9 @@ if __name__ == "__main__":
     if not os.path.exists(DB_FILE):
         print(f"Database file '{DB_FILE}' not found. It will be created.")
 
+    if instrumentation.enabled_from_env():
+        instrumentation.enable()
+
     init_db()  # Initialize database schema if needed
 
     try:
@@ -128,4 +194,8 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
     finally:
+        async_database.shutdown()
+        close_connections()
+        if instrumentation.is_enabled():
+            print(instrumentation.summary())
         print("I hope you enjoyed your pynvoice session.  Take care!")
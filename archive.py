@@ -0,0 +1,246 @@
+"""Hot/cold split of invoices: old paid invoices move to an archive file.
+
+Settled history is rarely looked at, but every scan of invoice and
+invoice_item walks it. archive_invoices() moves paid invoices dated before a
+cutoff, with their items, into a second database file next to DB_FILE
+(database.archive_file()), which keeps the working set the screens and
+reports touch small.
+
+The archive is attached to a connection with ATTACH as ARCHIVE_SCHEMA, so
+its tables can be joined with the live ones in one statement:
+
+- database.get_invoice_data() and get_invoice_data_many() fall back to the
+  archive, so PDFs of archived invoices can still be generated
+- database.iter_invoice_data() and the exporter include archived invoices
+- the revenue reports take include_archive=True to cover both files
+
+Senders, clients and footer messages stay in the main database; archived
+invoices keep referring to them by id. Invoice and item ids never repeat
+(both tables use AUTOINCREMENT), so archived rows keep their ids.
+
+Each batch moves in two transactions, because with the main database in
+WAL mode a transaction over two files is atomic per file only. The first
+copies the batch into the archive with INSERT OR REPLACE and commits; the
+second deletes from the main database only the invoices (and items) that
+the archive now holds. A crash or a failed archive commit leaves the rows
+in the main database, and running the archive again finishes the move
+without duplicating anything.
+"""
+
+import json
+import time
+from datetime import date, timedelta
+
+from database import (
+    ARCHIVE_SCHEMA,
+    DEFAULT_BATCH_SIZE,
+    attach_archive,
+    get_connection,
+    transaction,
+)
+from money import QUANTITY_SCALE
+
+# Paid invoices older than this many days are archived by default
+DEFAULT_ARCHIVE_DAYS = 730
+
+_INVOICE_COLUMNS = (
+    "id, sender_id, client_id, footer_message_id, paid, date_created, "
+    "external_key, subtotal, item_count, grand_total"
+)
+_ITEM_COLUMNS = "id, invoice_id, item_name, quantity, unit_price"
+
+# Matches the live tables, minus foreign keys to tables in another file and
+# the triggers: archived rows are only ever read
+_ARCHIVE_SCHEMA_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.invoice (
+        id INTEGER PRIMARY KEY,
+        sender_id INTEGER NOT NULL,
+        client_id INTEGER NOT NULL,
+        footer_message_id INTEGER,
+        paid BOOLEAN DEFAULT FALSE,
+        date_created TIMESTAMP,
+        external_key TEXT,
+        subtotal NUMERIC NOT NULL DEFAULT 0,
+        item_count INTEGER NOT NULL DEFAULT 0,
+        grand_total NUMERIC NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_invoice_date_created
+        ON invoice (date_created);
+    CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.invoice_item (
+        id INTEGER PRIMARY KEY,
+        invoice_id INTEGER NOT NULL,
+        item_name TEXT NOT NULL,
+        quantity INTEGER NOT NULL DEFAULT 0,
+        unit_price INTEGER NOT NULL DEFAULT 0,
+        line_total INTEGER GENERATED ALWAYS AS (
+            (quantity * unit_price + {QUANTITY_SCALE // 2}) / {QUANTITY_SCALE}
+        ) VIRTUAL
+    );
+    CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_invoice_item_invoice_id
+        ON invoice_item (invoice_id, id);
+"""
+
+
+class ArchiveResult:
+    """Outcome of an archive run"""
+
+    def __init__(self, before, invoices, items, seconds, complete=True):
+        self.before = before
+        self.invoices = invoices
+        self.items = items
+        self.seconds = seconds
+        self.complete = complete  # False when a batch could not be moved
+
+    def __repr__(self):
+        return (
+            f"ArchiveResult(before={self.before!r}, invoices={self.invoices}, "
+            f"items={self.items}, complete={self.complete}, "
+            f"seconds={self.seconds:.2f})"
+        )
+
+
+def default_cutoff(days=DEFAULT_ARCHIVE_DAYS, today=None):
+    """The "YYYY-MM-DD" date that many days before today"""
+    return ((today or date.today()) - timedelta(days=days)).isoformat()
+
+
+def open_archive(conn=None):
+    """Attach the archive to a connection, creating the file and its tables.
+
+    Raises ValueError inside an open transaction, where ATTACH is not
+    allowed.
+    """
+    conn = conn or get_connection()
+    if not attach_archive(conn, create=True):
+        raise ValueError("Cannot attach the archive inside a transaction")
+    # Readers of the archive should not block the next archive run either
+    conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.journal_mode = WAL").fetchall()
+    conn.executescript(_ARCHIVE_SCHEMA_SQL)
+    return conn
+
+
+def count_archivable(before):
+    """Number of paid invoices dated before the cutoff"""
+    return (
+        get_connection()
+        .execute(
+            "SELECT COUNT(*) FROM main.invoice WHERE paid = 1 AND date_created < ?",
+            (before,),
+        )
+        .fetchone()[0]
+    )
+
+
+def _copy_batch(c, ids_json):
+    """Copy the invoices in ids_json and their items into the archive"""
+    c.execute(
+        f"""
+        INSERT OR REPLACE INTO {ARCHIVE_SCHEMA}.invoice ({_INVOICE_COLUMNS})
+        SELECT {_INVOICE_COLUMNS} FROM main.invoice
+        WHERE id IN (SELECT value FROM json_each(?))
+    """,
+        (ids_json,),
+    )
+    c.execute(
+        f"""
+        INSERT OR REPLACE INTO {ARCHIVE_SCHEMA}.invoice_item ({_ITEM_COLUMNS})
+        SELECT {_ITEM_COLUMNS} FROM main.invoice_item
+        WHERE invoice_id IN (SELECT value FROM json_each(?))
+    """,
+        (ids_json,),
+    )
+
+
+def _delete_archived(c, ids_json):
+    """Delete the invoices in ids_json that the archive holds in full.
+
+    An invoice stays when the archive lacks it or any of its items, e.g. one
+    added since the copy. Returns (invoices, items) deleted.
+    """
+    moved = json.dumps(
+        [
+            row[0]
+            for row in c.execute(
+                f"""
+                SELECT i.id FROM main.invoice i
+                JOIN {ARCHIVE_SCHEMA}.invoice a ON a.id = i.id
+                WHERE i.id IN (SELECT value FROM json_each(?))
+                  AND NOT EXISTS (
+                      SELECT 1 FROM main.invoice_item it
+                      WHERE it.invoice_id = i.id
+                        AND it.id NOT IN (SELECT id FROM {ARCHIVE_SCHEMA}.invoice_item)
+                  )
+            """,
+                (ids_json,),
+            )
+        ]
+    )
+    # Invoices first, so the totals triggers on the item delete find no
+    # invoice row left to update
+    c.execute(
+        "DELETE FROM main.invoice WHERE id IN (SELECT value FROM json_each(?))",
+        (moved,),
+    )
+    invoices = c.rowcount
+    c.execute(
+        "DELETE FROM main.invoice_item "
+        "WHERE invoice_id IN (SELECT value FROM json_each(?))",
+        (moved,),
+    )
+    return invoices, c.rowcount
+
+
+def archive_invoices(before, batch_size=None, progress=None):
+    """Move paid invoices dated before `before` ("YYYY-MM-DD") to the archive.
+
+    Invoices are moved batch_size at a time, each batch in two short write
+    transactions (copy, then delete) so the TUI is never locked out for
+    long. progress, if given, is called with the running invoice count after
+    every batch. A batch of which nothing could be deleted, because its
+    invoices kept changing between copy and delete, ends the run with
+    complete False rather than retrying forever. Returns an ArchiveResult.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    open_archive()
+    started = time.perf_counter()
+    invoices = items = 0
+    complete = True
+    while True:
+        with transaction() as c:
+            ids = [
+                row[0]
+                for row in c.execute(
+                    "SELECT id FROM main.invoice "
+                    "WHERE paid = 1 AND date_created < ? LIMIT ?",
+                    (before, batch_size),
+                )
+            ]
+            if not ids:
+                break
+            _copy_batch(c, json.dumps(ids))
+        with transaction() as c:
+            moved, moved_items = _delete_archived(c, json.dumps(ids))
+        if not moved:
+            complete = False
+            break
+        invoices += moved
+        items += moved_items
+        if progress is not None:
+            progress(invoices)
+    return ArchiveResult(
+        before, invoices, items, time.perf_counter() - started, complete
+    )
+
+
+def archive_stats():
+    """(invoices, items) held in the archive; (0, 0) when there is none"""
+    conn = get_connection()
+    if not attach_archive(conn):
+        return 0, 0
+    return conn.execute(
+        f"""
+        SELECT (SELECT COUNT(*) FROM {ARCHIVE_SCHEMA}.invoice),
+               (SELECT COUNT(*) FROM {ARCHIVE_SCHEMA}.invoice_item)
+    """
+    ).fetchone()
+
@@ -0,0 +1,109 @@
+"""Asyncio facade over database.py for the Textual screens.
+
+Each function here has the same arguments and result as its namesake in
+database.py but runs on a background thread, so a slow disk or a write lock
+held by another process never freezes the event loop. Reads run on a
+single-thread executor and writes go through a writer.WriteQueue, which
+group-commits them; with WAL, reads keep being answered while a write waits
+for the lock.
+
+Awaiting callers may be cancelled (Textual cancels a screen's workers when it
+is dismissed). A call that has not started yet is dropped; one that is
+already running finishes on its thread and its result is discarded.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+import pdf_generator
+import reports
+from writer import WriteQueue
+
+_reader = None
+_writer = WriteQueue()
+_lock = threading.Lock()
+
+
+def _read_executor():
+    global _reader
+    with _lock:
+        if _reader is None:
+            _reader = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="pynvoice-db-read"
+            )
+        return _reader
+
+
+async def run(func, *args, write=False, **kwargs):
+    """Run func(*args, **kwargs) on the reader thread, or the writer queue"""
+    if write:
+        return await asyncio.wrap_future(_writer.submit(func, *args, **kwargs))
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _read_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+def write_stats():
+    """Return the writer queue's job, batch and lock-wait counts"""
+    return _writer.stats()
+
+
+def shutdown():
+    """Wait for queued calls, then stop the database threads.
+
+    Safe to call more than once; later calls start fresh threads.
+    """
+    global _reader
+    with _lock:
+        reader, _reader = _reader, None
+    if reader is not None:
+        reader.shutdown(wait=True)
+    _writer.close()
+
+
+def _facade(module, name, write=False):
+    # Look the function up on every call so patches of the module apply
+    @functools.wraps(getattr(module, name))
+    async def call(*args, **kwargs):
+        return await run(getattr(module, name), *args, write=write, **kwargs)
+
+    return call
+
+
+change_token = _facade(database, "change_token")
+list_senders = _facade(database, "list_senders")
+list_senders_page = _facade(database, "list_senders_page")
+list_clients = _facade(database, "list_clients")
+list_clients_page = _facade(database, "list_clients_page")
+list_footer_messages = _facade(database, "list_footer_messages")
+list_invoices_page = _facade(database, "list_invoices_page")
+get_invoice_data = _facade(database, "get_invoice_data")
+search = _facade(database, "search")
+search_senders = _facade(database, "search_senders")
+search_clients = _facade(database, "search_clients")
+search_footer_messages = _facade(database, "search_footer_messages")
+search_invoices = _facade(database, "search_invoices")
+
+create_sender = _facade(database, "create_sender", write=True)
+update_sender = _facade(database, "update_sender", write=True)
+create_client = _facade(database, "create_client", write=True)
+update_client = _facade(database, "update_client", write=True)
+create_footer_message = _facade(database, "create_footer_message", write=True)
+update_footer_message = _facade(database, "update_footer_message", write=True)
+create_invoice = _facade(database, "create_invoice", write=True)
+update_invoice = _facade(database, "update_invoice", write=True)
+add_invoice_item = _facade(database, "add_invoice_item", write=True)
+add_invoice_items = _facade(database, "add_invoice_items", write=True)
+
+revenue_by_client = _facade(reports, "revenue_by_client")
+revenue_by_sender = _facade(reports, "revenue_by_sender")
+revenue_by_month = _facade(reports, "revenue_by_month")
+paid_summary = _facade(reports, "paid_summary")
+aging_report = _facade(reports, "aging_report")
+
+# Reads the invoice and renders with reportlab; both belong off the loop
+generate_invoice_pdf = _facade(pdf_generator, "generate_invoice_pdf")
@@ -0,0 +1,252 @@
+"""Online backups of the database with the SQLite backup API.
+
+backup_database() copies DB_FILE while the TUI keeps running. Pages are
+copied DEFAULT_PAGES at a time with a short sleep between steps, so each
+step holds the read lock on the live database only briefly and the copy
+never saturates the disk the application commits to. The copy goes
+to a ".part" file that is renamed into place once complete (gzipped first
+when asked), so a backup file is never half written. Backups are named
+<db name>-YYYYMMDD-HHMMSS.db[.gz] and older ones beyond `keep` are removed.
+
+In WAL mode, which both pragma profiles use, the copy reads from one
+snapshot held open across all steps: writers carry on and the backup shows
+the database as it was when the backup started. Without WAL, a write from
+another connection makes SQLite start a step-wise copy over; after
+MAX_RESTARTS of those the rest is copied in one step.
+
+Once archive.py has created the archive database it holds the only copy of
+archived invoices, so backup_sources() lists it next to DB_FILE and both are
+backed up. Each file's backups carry its own name and are rotated apart.
+
+Set PYNVOICE_BACKUP_INTERVAL (minutes) to have app.py back up in the
+background while it runs; PYNVOICE_BACKUP_DIR, PYNVOICE_BACKUP_KEEP and
+PYNVOICE_BACKUP_GZIP set the directory (default "backups" next to the
+database), how many backups to keep (default 7) and compression.
+"""
+
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import time
+
+import database
+
+INTERVAL_ENV = "PYNVOICE_BACKUP_INTERVAL"
+DIR_ENV = "PYNVOICE_BACKUP_DIR"
+KEEP_ENV = "PYNVOICE_BACKUP_KEEP"
+GZIP_ENV = "PYNVOICE_BACKUP_GZIP"
+
+# Pages copied per step (1 MiB with the default 4 KiB page size) and the
+# pause between steps in seconds. Together they cap the copy at about
+# 100 MB/s, which leaves the disk free enough for the TUI's commits
+DEFAULT_PAGES = 256
+DEFAULT_SLEEP = 0.01
+DEFAULT_KEEP = 7
+
+# Step-wise copies started over by concurrent writes before the rest is
+# copied in one step
+MAX_RESTARTS = 3
+
+GZIP_LEVEL = 6
+
+
+class BackupResult:
+    """Outcome of a backup run"""
+
+    def __init__(self, path, pages, size, restarts, removed, seconds):
+        self.path = path
+        self.pages = pages
+        self.size = size  # bytes written, after compression
+        self.restarts = restarts
+        self.removed = removed  # older backups deleted by rotation
+        self.seconds = seconds
+
+    def __repr__(self):
+        return (
+            f"BackupResult(path={self.path!r}, pages={self.pages}, "
+            f"size={self.size}, restarts={self.restarts}, "
+            f"seconds={self.seconds:.2f})"
+        )
+
+
+class _Restarted(Exception):
+    pass
+
+
+def default_backup_dir():
+    """PYNVOICE_BACKUP_DIR, or a "backups" directory next to DB_FILE"""
+    return os.environ.get(DIR_ENV) or os.path.join(
+        os.path.dirname(os.path.abspath(database.DB_FILE)), "backups"
+    )
+
+
+def _stem(source):
+    return os.path.splitext(os.path.basename(source))[0]
+
+
+def _pattern(stem):
+    return re.compile(rf"^{re.escape(stem)}-\d{{8}}-\d{{6}}\.db(\.gz)?$")
+
+
+def list_backups(directory=None, source=None):
+    """Backups of source (default DB_FILE) in directory, oldest first"""
+    directory = directory or default_backup_dir()
+    pattern = _pattern(_stem(source or database.DB_FILE))
+    if not os.path.isdir(directory):
+        return []
+    # The timestamp in the name sorts chronologically
+    return [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if pattern.match(name)
+    ]
+
+
+def rotate_backups(keep, directory=None, source=None):
+    """Delete all but the newest `keep` backups; returns the deleted paths"""
+    backups = list_backups(directory, source)
+    removed = backups[: max(len(backups) - keep, 0)]
+    for path in removed:
+        os.unlink(path)
+    return removed
+
+
+def backup_sources():
+    """DB_FILE, and the archive database once it exists"""
+    sources = [database.DB_FILE]
+    if os.path.exists(database.archive_file()):
+        sources.append(database.archive_file())
+    return sources
+
+
+def _copy(source, target, pages, sleep, progress):
+    """Copy with the backup API; returns (pages, restarts)"""
+    restarts = 0
+    last_remaining = None
+
+    def step(status, remaining, total):
+        nonlocal restarts, last_remaining
+        # Every step copies at least one page, so a remaining count that did
+        # not go down means SQLite started over
+        if last_remaining is not None and remaining >= last_remaining:
+            restarts += 1
+            if restarts >= MAX_RESTARTS:
+                raise _Restarted()
+        last_remaining = remaining
+        if progress is not None:
+            progress(total - remaining, total)
+        # sqlite3's own sleep argument only applies to busy retries
+        if remaining and sleep:
+            time.sleep(sleep)
+
+    src = sqlite3.connect(source, isolation_level=None)
+    try:
+        if src.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            # A read transaction pins one snapshot for every step, so writes
+            # made meanwhile no longer restart the copy; in WAL mode readers
+            # never block writers
+            src.execute("BEGIN")
+            src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        dst = sqlite3.connect(target)
+        try:
+            # The .part file is thrown away if anything fails, so it needs no
+            # journal and no sync per step; backup_database() syncs it once
+            dst.execute("PRAGMA journal_mode = OFF").fetchall()
+            dst.execute("PRAGMA synchronous = OFF")
+            try:
+                src.backup(dst, pages=pages, progress=step)
+            except _Restarted:
+                src.backup(dst, pages=-1)
+            # Leave a single self-contained file rather than a WAL database
+            dst.execute("PRAGMA journal_mode = DELETE").fetchall()
+            page_count = dst.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    return page_count, restarts
+
+
+def _sync(path):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def backup_database(
+    directory=None,
+    compress=False,
+    keep=DEFAULT_KEEP,
+    pages=DEFAULT_PAGES,
+    sleep=DEFAULT_SLEEP,
+    source=None,
+    progress=None,
+):
+    """Write a timestamped backup of source (default DB_FILE) to directory.
+
+    directory defaults to default_backup_dir(). keep=None keeps every
+    backup. progress, if given, is called with (pages copied, total pages)
+    after each step. Returns a BackupResult.
+    """
+    source = source or database.DB_FILE
+    if not os.path.exists(source):
+        raise ValueError(f"Database file '{source}' not found")
+    directory = directory or default_backup_dir()
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+
+    name = f"{_stem(source)}-{time.strftime('%Y%m%d-%H%M%S')}.db"
+    path = os.path.join(directory, name)
+    part = path + ".part"
+    try:
+        page_count, restarts = _copy(source, part, pages, sleep, progress)
+        _sync(part)
+        if compress:
+            with open(part, "rb") as f, gzip.open(
+                part + ".gz", "wb", compresslevel=GZIP_LEVEL
+            ) as out:
+                shutil.copyfileobj(f, out, 1024 * 1024)
+            os.unlink(part)
+            part, path = part + ".gz", path + ".gz"
+            _sync(part)
+        os.replace(part, path)
+    finally:
+        for leftover in (part, part + ".gz"):
+            if os.path.exists(leftover):
+                os.unlink(leftover)
+
+    removed = rotate_backups(keep, directory, source) if keep else []
+    return BackupResult(
+        path,
+        page_count,
+        os.path.getsize(path),
+        restarts,
+        removed,
+        time.perf_counter() - started,
+    )
+
+
+def interval_from_env():
+    """Seconds between background backups, or None when they are off"""
+    minutes = float(os.environ.get(INTERVAL_ENV) or 0)
+    return minutes * 60 if minutes > 0 else None
+
+
+def backup_from_env():
+    """Back up every backup_sources() file with the PYNVOICE_BACKUP_* settings.
+
+    Returns a BackupResult per file.
+    """
+    keep = int(os.environ.get(KEEP_ENV) or DEFAULT_KEEP)
+    compress = os.environ.get(GZIP_ENV, "").strip().lower() not in (
+        "",
+        "0",
+        "false",
+        "no",
+        "off",
+    )
+    return [
+        backup_database(compress=compress, keep=keep or None, source=source)
+        for source in backup_sources()
+    ]
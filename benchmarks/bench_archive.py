@@ -0,0 +1,90 @@
+"""Time everyday reads before and after archiving old paid invoices.
+
+Usage: python benchmarks/bench_archive.py [INVOICES]
+
+Fills a temporary database with INVOICES invoices (default 500,000) of three
+items each, spread over ten years with 90% of them paid, then times a full
+invoice listing, a client report and an item search, archives paid invoices
+older than two years and times them again.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import archive  # noqa: E402
+import database  # noqa: E402
+import reports  # noqa: E402
+
+ITEM_NAMES = ("Design", "Hosting", "Consulting", "Audit", "Support")
+
+
+def _fill(count):
+    senders = [database.create_sender(f"Sender {n}") for n in range(20)]
+    clients = [database.create_client(f"Client {n}") for n in range(2000)]
+    rng = random.Random(1)
+    with database.transaction() as c:
+        c.executemany(
+            "INSERT INTO invoice (sender_id, client_id, paid, date_created) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                (
+                    rng.choice(senders),
+                    rng.choice(clients),
+                    rng.random() < 0.9,
+                    f"{rng.randint(2015, 2024)}-{rng.randint(1, 12):02}-10 10:00:00",
+                )
+                for _ in range(count)
+            ),
+        )
+        c.executemany(
+            "INSERT INTO invoice_item (invoice_id, item_name, quantity, unit_price) "
+            "VALUES (?, ?, 1000, ?)",
+            (
+                (invoice_id, rng.choice(ITEM_NAMES), rng.randint(100, 10000))
+                for invoice_id in range(1, count + 1)
+                for _ in range(3)
+            ),
+        )
+
+
+def _time(label, call):
+    started = time.perf_counter()
+    call()
+    print(f"  {label:<24} {(time.perf_counter() - started) * 1000:>8.1f} ms")
+
+
+def _measure():
+    reports.clear_cache()
+    _time("iter_invoices", lambda: sum(1 for _ in database.iter_invoices()))
+    _time("revenue_by_client", reports.revenue_by_client)
+    _time("search_invoices", lambda: database.search_invoices("audit"))
+
+
+def main(count=500_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_FILE = os.path.join(tmp, "bench.db")
+        database.set_pragma_profile("fast_bulk")
+        database.init_db()
+        _fill(count)
+        print(f"{count:,} invoices, all in the main database")
+        _measure()
+
+        started = time.perf_counter()
+        result = archive.archive_invoices("2023-01-01", batch_size=5000)
+        print(
+            f"archived {result.invoices:,} invoices and {result.items:,} items "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        print(f"{count - result.invoices:,} invoices left in the main database")
+        _measure()
+        database.close_connections()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
@@ -0,0 +1,102 @@
+"""Measure how an online backup affects writes from the application.
+
+Usage: python benchmarks/bench_backup.py [INVOICES]
+
+Fills a temporary database with INVOICES invoices (default 1,000,000), then
+backs it up with the default page steps and in one step while the main
+thread keeps creating clients, and reports the backup time and the commit
+latencies seen during it.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backup  # noqa: E402
+import database  # noqa: E402
+
+# Pause between the writer's commits, roughly someone working in the TUI
+WRITE_PAUSE = 0.05
+
+
+def _fill(count):
+    sender = database.create_sender("Sender")
+    client = database.create_client("Client")
+    rng = random.Random(1)
+    with database.transaction() as c:
+        c.executemany(
+            "INSERT INTO invoice (sender_id, client_id, paid, date_created, "
+            "item_count, subtotal, grand_total) VALUES (?, ?, ?, ?, 3, 5000, 5000)",
+            (
+                (
+                    sender,
+                    client,
+                    rng.random() < 0.5,
+                    f"{rng.randint(2015, 2024)}-{rng.randint(1, 12):02}-10 10:00:00",
+                )
+                for _ in range(count)
+            ),
+        )
+    database.get_connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def _report(label, latencies, extra=""):
+    latencies.sort()
+    print(
+        f"{label:<12} {extra}{len(latencies):>4} writes  "
+        f"median {latencies[len(latencies) // 2] * 1000:5.1f} ms  "
+        f"max {latencies[-1] * 1000:6.1f} ms  "
+        f"over 50 ms {sum(t > 0.05 for t in latencies):>3}"
+    )
+
+
+def _write(latencies):
+    started = time.perf_counter()
+    database.create_client("Writer")
+    latencies.append(time.perf_counter() - started)
+    time.sleep(WRITE_PAUSE)
+
+
+def _baseline(seconds=5.0):
+    latencies = []
+    stop = time.perf_counter() + seconds
+    while time.perf_counter() < stop:
+        _write(latencies)
+    _report("no backup", latencies)
+
+
+def _run(label, directory, **options):
+    result = {}
+    thread = threading.Thread(
+        target=lambda: result.update(
+            backup=backup.backup_database(directory=directory, keep=None, **options)
+        )
+    )
+    latencies = []
+    thread.start()
+    while thread.is_alive():
+        _write(latencies)
+    thread.join()
+    _report(label, latencies, f"backup {result['backup'].seconds:5.2f}s  ")
+
+
+def main(count=1_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_FILE = os.path.join(tmp, "bench.db")
+        database.init_db()
+        _fill(count)
+        print(f"{count:,} invoices, {os.path.getsize(database.DB_FILE) / 2**20:.0f} MB")
+        _baseline()
+        _run("page steps", os.path.join(tmp, "steps"))
+        _run("one step", os.path.join(tmp, "whole"), pages=-1, sleep=0)
+        database.close_connections()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
@@ -0,0 +1,108 @@
+"""Compare UUID text keys with integer keys for senders and clients.
+
+Usage: python benchmarks/bench_keys.py [INVOICES]
+
+Builds a database with INVOICES invoices (default 200,000) at schema
+version 9, where sender and client ids are UUID text, then copies it and
+runs the migration to integer keys. Both files are vacuumed and compared on
+size, a full invoice list (the join behind list_invoices) and per-client
+invoice lookups.
+"""
+
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from migrations import migrate  # noqa: E402
+
+TEXT_KEY_VERSION = 9
+
+
+def _build(path, count):
+    conn = sqlite3.connect(path)
+    migrate(conn, target=TEXT_KEY_VERSION)
+    senders = [str(uuid.uuid4()) for _ in range(20)]
+    clients = [str(uuid.uuid4()) for _ in range(2000)]
+    rng = random.Random(1)
+    with conn:
+        conn.executemany(
+            "INSERT INTO sender (id, name) VALUES (?, ?)",
+            [(key, f"Sender {n}") for n, key in enumerate(senders)],
+        )
+        conn.executemany(
+            "INSERT INTO client (id, name) VALUES (?, ?)",
+            [(key, f"Client {n}") for n, key in enumerate(clients)],
+        )
+        conn.executemany(
+            "INSERT INTO invoice (sender_id, client_id, paid, date_created, "
+            "item_count, subtotal, grand_total) VALUES (?, ?, ?, ?, 3, 5000, 5000)",
+            (
+                (
+                    rng.choice(senders),
+                    rng.choice(clients),
+                    rng.random() < 0.5,
+                    f"{rng.randint(2015, 2024)}-{rng.randint(1, 12):02}-10 10:00:00",
+                )
+                for _ in range(count)
+            ),
+        )
+    conn.close()
+
+
+def _measure(label, path):
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    size = os.path.getsize(path)
+    client_ids = [row[0] for row in conn.execute("SELECT id FROM client")]
+    conn.close()
+
+    database.DB_FILE = path
+    database.close_connections()
+    started = time.perf_counter()
+    rows = sum(1 for _ in database.iter_invoices())
+    listing = time.perf_counter() - started
+
+    conn = database.get_connection()
+    started = time.perf_counter()
+    for client_id in client_ids[:500]:
+        conn.execute(
+            "SELECT COUNT(*), SUM(grand_total) FROM invoice WHERE client_id = ?",
+            (client_id,),
+        ).fetchone()
+    lookups = (time.perf_counter() - started) / 500
+    database.close_connections()
+
+    print(
+        f"{label:<13} {size / 2**20:>7.1f} MB  list {rows:,} invoices "
+        f"{listing:.2f}s  client lookup {lookups * 1000:.2f} ms"
+    )
+
+
+def main(count=200_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path = os.path.join(tmp, "text_keys.db")
+        int_path = os.path.join(tmp, "integer_keys.db")
+        _build(text_path, count)
+        shutil.copy(text_path, int_path)
+
+        conn = sqlite3.connect(int_path)
+        started = time.perf_counter()
+        migrate(conn)
+        print(f"migration took {time.perf_counter() - started:.2f}s")
+        conn.close()
+
+        _measure("UUID text", text_path)
+        _measure("integer", int_path)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
@@ -0,0 +1,101 @@
+"""Time each maintenance step and its effect on common queries.
+
+Usage: python benchmarks/bench_maintenance.py [INVOICES]
+
+Fills a temporary database with INVOICES invoices (default 500,000) of three
+items each, times the revenue reports and an invoice page before and after
+ANALYZE, then deletes the oldest half of the invoices and times the
+incremental vacuum that gives their pages back and a quick_check.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import maintenance  # noqa: E402
+import reports  # noqa: E402
+
+
+def _fill(count):
+    senders = [database.create_sender(f"Sender {n}") for n in range(20)]
+    clients = [database.create_client(f"Client {n}") for n in range(2000)]
+    rng = random.Random(1)
+    with database.transaction() as c:
+        c.executemany(
+            "INSERT INTO invoice (sender_id, client_id, paid, date_created) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                (
+                    rng.choice(senders),
+                    rng.choice(clients),
+                    rng.random() < 0.5,
+                    f"{rng.randint(2015, 2024)}-{rng.randint(1, 12):02}-10 10:00:00",
+                )
+                for _ in range(count)
+            ),
+        )
+        c.executemany(
+            "INSERT INTO invoice_item (invoice_id, item_name, quantity, unit_price) "
+            "VALUES (?, 'Consulting', 1000, ?)",
+            (
+                (invoice_id, rng.randint(100, 10000))
+                for invoice_id in range(1, count + 1)
+                for _ in range(3)
+            ),
+        )
+
+
+def _time(label, call):
+    started = time.perf_counter()
+    result = call()
+    print(f"  {label:<22} {(time.perf_counter() - started) * 1000:>9.1f} ms")
+    return result
+
+
+def _queries():
+    reports.clear_cache()
+    _time("revenue_by_client", lambda: reports.revenue_by_client(paid=True))
+    _time("revenue_by_month", reports.revenue_by_month)
+    _time("aging_report", reports.aging_report)
+    _time("list_invoices_page", database.list_invoices_page)
+
+
+def main(count=500_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_FILE = os.path.join(tmp, "bench.db")
+        database.init_db()
+        _fill(count)
+        print(f"{count:,} invoices, no planner statistics")
+        _queries()
+
+        print("maintenance")
+        _time("analyze", maintenance.analyze)
+        print("with planner statistics")
+        _queries()
+
+        with database.transaction() as c:
+            c.execute("DELETE FROM invoice WHERE date_created < '2020-01-01'")
+            c.execute(
+                "DELETE FROM invoice_item "
+                "WHERE invoice_id NOT IN (SELECT id FROM invoice)"
+            )
+        database.get_connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        size = os.path.getsize(database.DB_FILE)
+        print(f"deleted half the invoices, {maintenance.free_pages():,} free pages")
+        freed, _ = _time("incremental_vacuum", maintenance.incremental_vacuum)
+        print(
+            f"  freed {freed:,} pages, file {size / 2**20:.0f} MB -> "
+            f"{os.path.getsize(database.DB_FILE) / 2**20:.0f} MB"
+        )
+        _time("quick_check", maintenance.check)
+        database.close_connections()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
@@ -0,0 +1,82 @@
+"""Compare memory and speed of tuple, dict and Record rows.
+
+Usage: python benchmarks/bench_records.py [ROWS]
+
+Builds ROWS invoice summaries (default 100,000) in each representation and
+reports construction time, field access time and the memory held by the list.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import InvoiceSummary  # noqa: E402
+
+FIELDS = InvoiceSummary.__slots__
+
+
+def _raw_rows(count):
+    # Lists, so tuple() below builds new objects instead of returning its input
+    return [
+        [
+            i,
+            f"Sender {i % 50}",
+            f"Client {i % 500}",
+            "2024-01-01 10:00:00",
+            i % 2,
+            i % 10,
+            Decimal(i) / 100,
+        ]
+        for i in range(count)
+    ]
+
+
+BUILDERS = {
+    "tuple": tuple,
+    "dict": lambda row: dict(zip(FIELDS, row)),
+    "record": lambda row: InvoiceSummary(*row),
+}
+
+READERS = {
+    "tuple": lambda row: (row[2], row[6]),
+    "dict": lambda row: (row["client_name"], row["grand_total"]),
+    "record": lambda row: (row.client_name, row.grand_total),
+}
+
+
+def measure(kind, raw):
+    build = BUILDERS[kind]
+    read = READERS[kind]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = [build(row) for row in raw]
+    build_seconds = time.perf_counter() - started
+    memory, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for row in rows:
+        read(row)
+    read_seconds = time.perf_counter() - started
+    return build_seconds, read_seconds, memory
+
+
+def main(count=100_000):
+    raw = _raw_rows(count)
+    print(f"{count:,} invoice summaries")
+    print(f"{'type':<8} {'build':>10} {'access':>10} {'memory':>12} {'bytes/row':>10}")
+    for kind in BUILDERS:
+        build_seconds, read_seconds, memory = measure(kind, raw)
+        print(
+            f"{kind:<8} {build_seconds * 1000:>8.1f}ms {read_seconds * 1000:>8.1f}ms "
+            f"{memory / 1024 / 1024:>10.1f}MB {memory / count:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,75 @@
+"""Time the revenue reports on a large generated database.
+
+Usage: python benchmarks/bench_reports.py [INVOICES]
+
+Fills a temporary database with INVOICES invoices (default 500,000) spread
+over 20 senders, 2,000 clients and ten years, then times each report cold
+and again from the cache.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import reports  # noqa: E402
+
+
+def _fill(count):
+    senders = [database.create_sender(f"Sender {n}") for n in range(20)]
+    clients = [database.create_client(f"Client {n}") for n in range(2000)]
+    rng = random.Random(1)
+    with database.transaction() as c:
+        # Totals are written directly; the item triggers would only slow this down
+        c.executemany(
+            "INSERT INTO invoice (sender_id, client_id, paid, date_created, "
+            "item_count, subtotal, grand_total) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    rng.choice(senders),
+                    rng.choice(clients),
+                    rng.random() < 0.5,
+                    f"{rng.randint(2015, 2024)}-{rng.randint(1, 12):02}-10 10:00:00",
+                    5,
+                    total,
+                    total,
+                )
+                for total in (rng.randint(1000, 100000) for _ in range(count))
+            ),
+        )
+
+
+def main(count=500_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_FILE = os.path.join(tmp, "bench.db")
+        database.set_pragma_profile("fast_bulk")
+        database.init_db()
+        _fill(count)
+        print(f"{count:,} invoices")
+
+        for report in (
+            reports.revenue_by_client,
+            reports.revenue_by_sender,
+            reports.revenue_by_month,
+            reports.paid_summary,
+        ):
+            started = time.perf_counter()
+            rows = report()
+            cold = time.perf_counter() - started
+            started = time.perf_counter()
+            report()
+            cached = time.perf_counter() - started
+            print(
+                f"{report.__name__:<18} {len(rows):>5} rows  "
+                f"cold {cold * 1000:>7.1f} ms  cached {cached * 1000:>6.2f} ms"
+            )
+        database.close_connections()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
@@ -0,0 +1,78 @@
+"""Compare concurrent small writes with and without the group-commit queue.
+
+Usage: python benchmarks/bench_writes.py [THREADS] [WRITES_PER_THREAD]
+
+Each thread adds single items to an invoice, first with one transaction per
+call and then through a shared WriteQueue. Uses the durable profile, where
+every commit is fsynced, in a temporary database.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from writer import WriteQueue  # noqa: E402
+
+
+def _run_threads(threads, writes, write):
+    def worker(n):
+        for k in range(writes):
+            write(f"Item {n}-{k}")
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def main(threads=8, writes=200):
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_FILE = os.path.join(tmp, "bench.db")
+        database.init_db()
+        invoice_id = database.create_invoice(
+            database.create_sender("Sender"), database.create_client("Client")
+        )
+        total = threads * writes
+
+        database.reset_lock_stats()
+        seconds = _run_threads(
+            threads,
+            writes,
+            lambda name: database.add_invoice_item(invoice_id, name, 1, 10),
+        )
+        lock = database.lock_stats()
+        print(
+            f"direct:      {total / seconds:>8,.0f} writes/sec  "
+            f"lock wait {lock['total_wait']:.2f}s, {lock['retries']} retries"
+        )
+
+        database.reset_lock_stats()
+        queue = WriteQueue()
+        seconds = _run_threads(
+            threads,
+            writes,
+            lambda name: queue.call(
+                database.add_invoice_item, invoice_id, name, 1, 10
+            ),
+        )
+        stats = queue.stats()
+        queue.close()
+        print(
+            f"write queue: {total / seconds:>8,.0f} writes/sec  "
+            f"{stats['batches']} commits, largest batch {stats['largest_batch']}, "
+            f"lock wait {stats['lock']['total_wait']:.2f}s"
+        )
+        database.close_connections()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
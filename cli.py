@@ -0,0 +1,345 @@
+"""Command line tools for pynvoice.
+
+Usage: python cli.py [--db FILE] [--profile NAME] <command> ...
+Run ``python cli.py --help`` for the list of commands.
+"""
+
+import argparse
+import os
+import sys
+
+import archive
+import backup
+import database
+import instrumentation
+import maintenance
+import reports
+from exporter import export_invoices
+from importer import DEFAULT_CHUNK_SIZE, FORMATS, KINDS, import_file
+
+
+def _cmd_import(args):
+    def report(rows):
+        print(f"  {rows:,} records...", file=sys.stderr)
+
+    result = import_file(
+        args.kind,
+        args.path,
+        fmt=args.format,
+        chunk_size=args.chunk_size,
+        key=args.key,
+        progress=report if args.verbose else None,
+    )
+    print(
+        f"Imported {result.rows:,} {result.kind} in {result.seconds:.2f}s "
+        f"({result.rows_per_second:,.0f} rows/sec)"
+    )
+    if result.lock_wait >= 0.01:
+        print(f"Waited {result.lock_wait:.2f}s for the database lock")
+
+
+def _cmd_export(args):
+    result = export_invoices(
+        args.path,
+        fmt=args.format,
+        start=args.start,
+        end=args.end,
+        client_id=args.client,
+        paid=args.paid,
+        compress=args.gzip or None,
+        include_archive=args.include_archive,
+    )
+    print(
+        f"Exported {result.invoices:,} invoices ({result.rows:,} rows) "
+        f"in {result.seconds:.2f}s",
+        file=sys.stderr if args.path == "-" else sys.stdout,
+    )
+
+
+def _cmd_check_totals(args):
+    mismatches = database.check_invoice_totals(repair=args.repair)
+    for invoice_id, stored_count, count, stored_total, total in mismatches:
+        print(
+            f"Invoice #{invoice_id}: stored {stored_count} items / {stored_total}, "
+            f"actual {count} items / {total}"
+        )
+    if not mismatches:
+        print("All invoice totals are consistent.")
+    elif args.repair:
+        print(f"Repaired {len(mismatches)} invoice(s).")
+    else:
+        print(f"{len(mismatches)} invoice(s) disagree; rerun with --repair to fix.")
+        return 1
+
+
+def _cmd_aging(args):
+    rows = reports.aging_report(as_of=args.as_of)
+    if args.min_days:
+        rows = [row for row in rows if row.oldest_days >= args.min_days]
+    if not rows:
+        print("No unpaid invoices.")
+        return
+    header = ("Client", "Invoices", "Current", "30-59", "60-89", "90+", "Total")
+    print(f"{header[0]:<30} {header[1]:>8}" + "".join(f" {h:>12}" for h in header[2:]))
+    for row in rows:
+        amounts = (row.current, row.days_30, row.days_60, row.days_90, row.total)
+        print(
+            f"{row.client[:30]:<30} {row.invoices:>8}"
+            + "".join(f" {amount:>12,.2f}" for amount in amounts)
+        )
+    totals = [
+        sum(getattr(row, name) for row in rows)
+        for name in ("current", "days_30", "days_60", "days_90", "total")
+    ]
+    print(
+        f"{'Total':<30} {sum(row.invoices for row in rows):>8}"
+        + "".join(f" {amount:>12,.2f}" for amount in totals)
+    )
+
+
+def _cmd_archive(args):
+    before = args.before or archive.default_cutoff(args.days)
+    if args.dry_run:
+        count = archive.count_archivable(before)
+        print(f"{count:,} paid invoices dated before {before} would be archived")
+        return
+
+    def report(invoices):
+        print(f"  {invoices:,} invoices...", file=sys.stderr)
+
+    result = archive.archive_invoices(
+        before, batch_size=args.batch_size, progress=report if args.verbose else None
+    )
+    print(
+        f"Archived {result.invoices:,} invoices ({result.items:,} items) dated "
+        f"before {before} to {database.archive_file()} in {result.seconds:.2f}s"
+    )
+    if not result.complete:
+        print(
+            f"Stopped early with {archive.count_archivable(before):,} invoices "
+            "left, as some kept changing while being moved; run it again"
+        )
+        return 1
+
+
+def _cmd_backup(args):
+    def report(done, total):
+        print(f"  {done:,} / {total:,} pages...", file=sys.stderr)
+
+    sources = backup.backup_sources() if args.archive else [database.DB_FILE]
+    for source in sources:
+        result = backup.backup_database(
+            directory=args.dir,
+            compress=args.gzip,
+            keep=args.keep or None,
+            pages=args.pages,
+            source=source,
+            progress=report if args.verbose else None,
+        )
+        print(
+            f"Backed up {source} to {result.path} "
+            f"({result.size / 2**20:,.1f} MB) in {result.seconds:.2f}s"
+        )
+        if result.restarts:
+            print(f"Restarted {result.restarts} time(s) because of concurrent writes")
+        for path in result.removed:
+            print(f"Removed old backup {path}")
+
+
+def _cmd_maintain(args):
+    if args.full_vacuum:
+        before = os.path.getsize(database.DB_FILE)
+        maintenance.full_vacuum()
+        after = os.path.getsize(database.DB_FILE)
+        print(f"Vacuumed: {before / 2**20:,.1f} MB -> {after / 2**20:,.1f} MB")
+    elif not args.no_vacuum and not maintenance.incremental_enabled():
+        print("Incremental vacuum is off; run with --full-vacuum once to enable it")
+
+    result = maintenance.run_maintenance(
+        budget=args.budget or None,
+        analyze_stats=not args.no_analyze,
+        vacuum=not args.no_vacuum,
+        integrity=not args.no_check,
+        full_check=args.full_check,
+    )
+    if result.analyzed is not None:
+        print(f"Analyzed {len(result.analyzed)} tables")
+    if result.pages_freed is not None:
+        print(
+            f"Freed {result.pages_freed:,} pages, {result.free_pages:,} still free"
+        )
+    if result.problems:
+        for problem in result.problems:
+            print(f"Integrity problem: {problem}")
+    elif result.problems == []:
+        print("Integrity check passed")
+    elif not args.no_check:
+        print("Integrity check did not finish within the budget")
+    if not result.complete:
+        print(f"Stopped after the {args.budget:g}s budget; run again to continue")
+    if result.problems:
+        return 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pynvoice", description="pynvoice tools")
+    parser.add_argument("--db", help=f"database file (default: {database.DB_FILE})")
+    parser.add_argument(
+        "--profile",
+        help="database pragma profile, e.g. durable or fast_bulk",
+    )
+    parser.add_argument(
+        "--instrument",
+        action="store_true",
+        default=instrumentation.enabled_from_env(),
+        help="time database calls and print a summary on exit",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("import", help="import senders, clients or invoices")
+    p.add_argument("kind", choices=KINDS)
+    p.add_argument("path", help="CSV or JSONL file")
+    p.add_argument("--format", choices=FORMATS, help="default: from the extension")
+    p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    p.add_argument(
+        "--key",
+        default="external_key",
+        help="field holding each record's external key, used for upserts",
+    )
+    p.add_argument("-v", "--verbose", action="store_true", help="report progress")
+    p.set_defaults(func=_cmd_import)
+
+    p = commands.add_parser(
+        "export", help="export invoices with their items to CSV or JSONL"
+    )
+    p.add_argument("path", help="output file (.gz to compress), or - for stdout")
+    p.add_argument("--format", choices=FORMATS, help="default: from the extension")
+    p.add_argument("--start", help="first invoice date to include (YYYY-MM-DD)")
+    p.add_argument("--end", help="date to stop before (YYYY-MM-DD)")
+    p.add_argument(
+        "--client", type=int, help="only this client's invoices (client id)"
+    )
+    paid = p.add_mutually_exclusive_group()
+    paid.add_argument("--paid", action="store_true", default=None)
+    paid.add_argument("--unpaid", dest="paid", action="store_false")
+    p.add_argument("--gzip", action="store_true", help="compress the output")
+    p.add_argument(
+        "--no-archive",
+        dest="include_archive",
+        action="store_false",
+        help="leave out invoices moved to the archive database",
+    )
+    p.set_defaults(func=_cmd_export)
+
+    p = commands.add_parser(
+        "check-totals", help="verify stored invoice totals against their items"
+    )
+    p.add_argument("--repair", action="store_true", help="recompute wrong totals")
+    p.set_defaults(func=_cmd_check_totals)
+
+    p = commands.add_parser(
+        "aging", help="unpaid totals per client by days outstanding"
+    )
+    p.add_argument("--as-of", help="count ages up to this date (YYYY-MM-DD)")
+    p.add_argument(
+        "--min-days",
+        type=int,
+        default=0,
+        help="only clients whose oldest unpaid invoice is at least this old",
+    )
+    p.set_defaults(func=_cmd_aging)
+
+    p = commands.add_parser(
+        "archive", help="move old paid invoices to the archive database"
+    )
+    cutoff = p.add_mutually_exclusive_group()
+    cutoff.add_argument("--before", help="archive invoices dated before YYYY-MM-DD")
+    cutoff.add_argument(
+        "--days",
+        type=int,
+        default=archive.DEFAULT_ARCHIVE_DAYS,
+        help="archive invoices older than this many days (default: %(default)s)",
+    )
+    p.add_argument("--batch-size", type=int, help="invoices moved per transaction")
+    p.add_argument(
+        "--dry-run", action="store_true", help="only count what would be archived"
+    )
+    p.add_argument("-v", "--verbose", action="store_true", help="report progress")
+    p.set_defaults(func=_cmd_archive)
+
+    p = commands.add_parser(
+        "backup", help="back up the database while it stays in use"
+    )
+    p.add_argument("--dir", help="backup directory (default: backups/ next to the db)")
+    p.add_argument("--gzip", action="store_true", help="compress the backup")
+    p.add_argument(
+        "--keep",
+        type=int,
+        default=backup.DEFAULT_KEEP,
+        help="backups to keep, 0 for all (default: %(default)s)",
+    )
+    p.add_argument(
+        "--pages",
+        type=int,
+        default=backup.DEFAULT_PAGES,
+        help="pages copied per step (default: %(default)s)",
+    )
+    p.add_argument(
+        "--no-archive",
+        dest="archive",
+        action="store_false",
+        help="skip the archive database, which is backed up too by default",
+    )
+    p.add_argument("-v", "--verbose", action="store_true", help="report progress")
+    p.set_defaults(func=_cmd_backup)
+
+    p = commands.add_parser(
+        "maintain", help="refresh planner statistics, free space and check integrity"
+    )
+    p.add_argument(
+        "--budget",
+        type=float,
+        default=maintenance.DEFAULT_BUDGET,
+        help="seconds to spend, 0 for no limit (default: %(default)s)",
+    )
+    p.add_argument("--no-analyze", action="store_true", help="skip ANALYZE")
+    p.add_argument("--no-vacuum", action="store_true", help="skip incremental vacuum")
+    p.add_argument("--no-check", action="store_true", help="skip the integrity check")
+    p.add_argument(
+        "--full-check",
+        action="store_true",
+        help="run the slower integrity_check instead of quick_check",
+    )
+    p.add_argument(
+        "--full-vacuum",
+        action="store_true",
+        help="rebuild the file first (locks the database while it runs)",
+    )
+    p.set_defaults(func=_cmd_maintain)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        database.DB_FILE = args.db
+    if args.profile:
+        database.set_pragma_profile(args.profile)
+    if args.instrument:
+        instrumentation.enable()
+
+    database.init_db()
+    try:
+        return args.func(args) or 0
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        database.close_connections()
+        if args.instrument:
+            print(instrumentation.summary(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,130 +1,755 @@
+import itertools
+import json
+import os
+import random
+import re
 import sqlite3
+import threading
+import time
 import uuid
+from contextlib import contextmanager
+
+from migrations import CHANGE_TRACKED_TABLES, migrate
+from money import (
+    from_minor,
+    from_scaled_quantity,
+    to_minor,
+    to_scaled_quantity,
+)
+from records import (
+    Client,
+    FooterMessage,
+    Invoice,
+    InvoiceItem,
+    InvoiceSummary,
+    SearchResult,
+    Sender,
+)
 
 DB_FILE = "pynvoice.db"
 
+# Compiled statements kept per pooled connection (sqlite3 defaults to 128)
+STATEMENT_CACHE_SIZE = 256
 
-def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute(
-        """
-        CREATE TABLE IF NOT EXISTS sender (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            address TEXT,
-            email TEXT,
-            phone TEXT
-        )
+# Rows fetched per round trip by the iter_* functions, and the default page
+# size of the list_*_page functions
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PAGE_SIZE = 100
+
+# Most hits returned by the search functions
+DEFAULT_SEARCH_LIMIT = 50
+
+# Schema name the archive of old paid invoices is attached under (archive.py)
+ARCHIVE_SCHEMA = "archive"
+
+# How often a write retries when the lock is still held after busy_timeout,
+# and the first backoff delay in seconds (doubled, with jitter, each retry)
+WRITE_RETRIES = 3
+WRITE_RETRY_DELAY = 0.05
+
+# Pragma profiles applied to every connection as it is opened. WAL lets
+# readers keep working while another process is inserting items.
+PRAGMA_PROFILES = {
+    # Every commit is fsynced; the safe choice for interactive use
+    "durable": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16384,  # negative values are KiB
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "DEFAULT",
+    },
+    # For imports and batch jobs: commits survive a crash of the process but
+    # not of the operating system
+    "fast_bulk": {
+        "busy_timeout": 30000,
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -131072,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+DEFAULT_PRAGMA_PROFILE = "durable"
+PRAGMA_PROFILE_ENV = "PYNVOICE_DB_PROFILE"
+
+# busy_timeout goes first so the others wait out a lock instead of failing
+_PRAGMA_ORDER = (
+    "busy_timeout",
+    "journal_mode",
+    "synchronous",
+    "cache_size",
+    "mmap_size",
+    "temp_store",
+)
+
+
+def get_pragma_profile(profile=None):
+    """Resolve a profile name (or a dict of pragmas) to a dict of pragmas.
+
+    With no argument the PYNVOICE_DB_PROFILE environment variable is used,
+    falling back to the durable profile.
     """
-    )
-    c.execute(
-        """
-        CREATE TABLE IF NOT EXISTS client (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            address TEXT,
-            email TEXT
-        )
+    if profile is None:
+        profile = os.environ.get(PRAGMA_PROFILE_ENV) or DEFAULT_PRAGMA_PROFILE
+    if isinstance(profile, dict):
+        pragmas = dict(profile)
+    else:
+        name = profile.strip().lower().replace("-", "_")
+        if name not in PRAGMA_PROFILES:
+            raise ValueError(
+                f"Unknown database profile '{profile}' "
+                f"(choose from: {', '.join(sorted(PRAGMA_PROFILES))})"
+            )
+        pragmas = dict(PRAGMA_PROFILES[name])
+
+    unknown = set(pragmas) - set(_PRAGMA_ORDER)
+    if unknown:
+        raise ValueError(f"Unsupported pragma(s): {', '.join(sorted(unknown))}")
+    for name, value in pragmas.items():
+        if not isinstance(value, int) and not str(value).isalnum():
+            raise ValueError(f"Invalid value for pragma {name}: {value!r}")
+    return pragmas
+
+
+def apply_pragmas(conn, pragmas):
+    """Apply a resolved pragma profile to an open connection"""
+    for name in _PRAGMA_ORDER:
+        if name in pragmas:
+            conn.execute(f"PRAGMA {name} = {pragmas[name]}").fetchall()
+
+
+class ConnectionPool:
+    """Hands out one long-lived connection per thread and database file.
+
+    Connections are opened lazily the first time a thread asks for a given
+    file and reused for every later call, so the connect, schema-parse and
+    statement-compile cost is paid once instead of once per query.
     """
-    )
-    c.execute(
-        """
-        CREATE TABLE IF NOT EXISTS footer_message (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            message TEXT NOT NULL
+
+    def __init__(
+        self, cached_statements=STATEMENT_CACHE_SIZE, pragmas=None, factory=None
+    ):
+        self.cached_statements = cached_statements
+        self.pragmas = pragmas
+        # Connection class for new connections; instrumentation swaps it out
+        self.factory = factory or sqlite3.Connection
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._generation = 0
+
+    def get(self, path):
+        local = self._local
+        if getattr(local, "generation", None) != self._generation:
+            # close_all() ran since this thread last looked; start over
+            local.connections = {}
+            local.generation = self._generation
+        conn = local.connections.get(path)
+        if conn is None:
+            conn = self._open(path)
+            local.connections[path] = conn
+        return conn
+
+    def _open(self, path):
+        # check_same_thread is off only so close_all() can close connections
+        # owned by other threads; each connection is still used by one thread
+        conn = sqlite3.connect(
+            path,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+            factory=self.factory,
         )
+        if self.pragmas is None:
+            self.pragmas = get_pragma_profile()
+        apply_pragmas(conn, self.pragmas)
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._generation += 1
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+
+_pool = ConnectionPool()
+
+
+def get_connection():
+    """Return the calling thread's pooled connection to DB_FILE"""
+    return _pool.get(DB_FILE)
+
+
+def close_connections():
+    """Close every pooled connection; call once when the application exits"""
+    _pool.close_all()
+
+
+def set_pragma_profile(profile):
+    """Switch the pragma profile (by name or dict) used for pooled connections.
+
+    Open connections are closed so every thread picks up the new settings the
+    next time it touches the database.
     """
-    )
-    c.execute(
-        """
-        CREATE TABLE IF NOT EXISTS invoice (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            sender_id TEXT NOT NULL,
-            client_id TEXT NOT NULL,
-            footer_message_id INTEGER,
-            paid BOOLEAN DEFAULT FALSE,
-            date_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (sender_id) REFERENCES sender (id),
-            FOREIGN KEY (client_id) REFERENCES client (id),
-            FOREIGN KEY (footer_message_id) REFERENCES footer_message (id)
-        )
+    _pool.pragmas = get_pragma_profile(profile)
+    _pool.close_all()
+
+
+def set_connection_factory(factory=None):
+    """Open pooled connections with a sqlite3.Connection subclass.
+
+    None restores the plain class. Like set_pragma_profile, this closes the
+    open connections so the next call on each thread gets the new class.
     """
-    )
+    _pool.factory = factory or sqlite3.Connection
+    _pool.close_all()
 
-    # Add paid column to existing tables if it doesn't exist
-    try:
-        c.execute("ALTER TABLE invoice ADD COLUMN paid BOOLEAN DEFAULT FALSE")
-    except sqlite3.OperationalError:
-        # Column already exists
-        pass
 
-    c.execute(
-        """
-        CREATE TABLE IF NOT EXISTS invoice_item (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            invoice_id INTEGER NOT NULL,
-            item_name TEXT NOT NULL,
-            amount REAL NOT NULL,
-            cost_per_unit REAL NOT NULL,
-            FOREIGN KEY (invoice_id) REFERENCES invoice (id)
-        )
+class LockStats:
+    """Counts how long write transactions waited for the database lock"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.transactions = 0
+            self.contended = 0
+            self.retries = 0
+            self.failures = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record(self, waited, retries, failed=False):
+        with self._lock:
+            self.transactions += 1
+            # Anything over a millisecond means another writer held the lock
+            if waited > 0.001 or retries:
+                self.contended += 1
+            self.retries += retries
+            self.failures += failed
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "transactions": self.transactions,
+                "contended": self.contended,
+                "retries": self.retries,
+                "failures": self.failures,
+                "total_wait": self.total_wait,
+                "max_wait": self.max_wait,
+            }
+
+
+_lock_stats = LockStats()
+
+
+def lock_stats():
+    """Return lock-wait statistics for write transactions in this process.
+
+    total_wait and max_wait are in seconds and include busy_timeout waits.
     """
-    )
-    conn.commit()
-    conn.close()
+    return _lock_stats.as_dict()
 
 
-def list_senders():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT id, name, address, email, phone FROM sender")
-    senders = c.fetchall()
-    conn.close()
-    return senders
+def reset_lock_stats():
+    _lock_stats.reset()
 
 
-def list_clients():
-    """List all clients from the database as per FR2.2"""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT id, name, address, email FROM client")
-    clients = c.fetchall()
-    conn.close()
-    return clients
+def _begin_immediate(conn):
+    """Take the write lock, retrying with backoff if busy_timeout runs out"""
+    started = time.perf_counter()
+    delay = WRITE_RETRY_DELAY
+    for attempt in range(WRITE_RETRIES + 1):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) or attempt == WRITE_RETRIES:
+                _lock_stats.record(time.perf_counter() - started, attempt, failed=True)
+                raise
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            delay *= 2
+        else:
+            _lock_stats.record(time.perf_counter() - started, attempt)
+            return
 
 
-def list_footer_messages():
-    """List all footer messages from the database"""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT id, message FROM footer_message")
-    messages = c.fetchall()
-    conn.close()
-    return messages
+@contextmanager
+def transaction():
+    """Run the enclosed statements in a single write transaction.
 
+    Yields a cursor on the pooled connection. Commits on success and rolls
+    back on any exception. When a transaction is already open the block runs
+    inside a savepoint instead, so helpers can be composed.
 
-def list_invoices():
-    """List all invoices with their basic information including paid status"""
-    conn = sqlite3.connect(DB_FILE)
+    The write lock is taken up front; if another connection still holds it
+    after busy_timeout, the attempt is retried WRITE_RETRIES times with
+    exponential backoff before "database is locked" is raised.
+    """
+    conn = get_connection()
     c = conn.cursor()
-    c.execute(
-        """
+    if conn.in_transaction:
+        conn.execute("SAVEPOINT nested")
+        try:
+            yield c
+        except BaseException:
+            conn.execute("ROLLBACK TO nested")
+            conn.execute("RELEASE nested")
+            raise
+        else:
+            conn.execute("RELEASE nested")
+        finally:
+            c.close()
+        return
+
+    _begin_immediate(conn)
+    try:
+        yield c
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+    finally:
+        c.close()
+
+
+def archive_file():
+    """Path of the archive database kept next to DB_FILE"""
+    root, ext = os.path.splitext(DB_FILE)
+    return f"{root}-archive{ext or '.db'}"
+
+
+def attach_archive(conn=None, create=False):
+    """Attach the archive database to a connection as ARCHIVE_SCHEMA.
+
+    Does nothing when it is attached already. Unless create is set, a missing
+    archive file is not created. ATTACH cannot run inside a transaction, so
+    an open one leaves the archive unattached. Returns True when the archive
+    schema is available on the connection.
+    """
+    conn = conn or get_connection()
+    if any(row[1] == ARCHIVE_SCHEMA for row in conn.execute("PRAGMA database_list")):
+        return True
+    path = archive_file()
+    if conn.in_transaction or not (create or os.path.exists(path)):
+        return False
+    conn.execute("ATTACH DATABASE ? AS " + ARCHIVE_SCHEMA, (path,))
+    return True
+
+
+def init_db():
+    """Create or upgrade the schema; a single pragma read when already current"""
+    migrate(get_connection())
+
+
+def _iter_rows(sql, params=(), batch_size=None, row_factory=None):
+    """Yield the rows of a query, fetching batch_size rows at a time"""
+    c = get_connection().cursor()
+    c.row_factory = row_factory
+    c.execute(sql, params)
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    try:
+        while True:
+            rows = c.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        c.close()
+
+
+def _fetch_page(sql, params, page_size, cursor_of, row_factory=None):
+    """Return (rows, next_cursor); next_cursor is None on the last page"""
+    if page_size < 1:
+        raise ValueError("Page size must be positive")
+    c = get_connection().cursor()
+    c.row_factory = row_factory
+    rows = c.execute(sql, params + (page_size + 1,)).fetchall()
+    c.close()
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, cursor_of(rows[-1])
+    return rows, None
+
+
+class ReferenceCache:
+    """Process-wide read-through cache for the small reference tables.
+
+    Writes made through this module invalidate the affected table. Commits by
+    other connections or processes are caught with PRAGMA data_version: when
+    it moves on the calling connection, every entry is dropped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._entries = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self, conn):
+        # data_version is only comparable on the connection that produced it,
+        # so each thread remembers the last value its own connection returned
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        seen = getattr(self._local, "seen", None)
+        if seen is None:
+            seen = self._local.seen = {}
+        if seen.get(DB_FILE) != (conn, version):
+            seen[DB_FILE] = (conn, version)
+            self.clear()
+
+    def get(self, table, load):
+        """Return the rows of table, calling load() to fetch them on a miss"""
+        conn = get_connection()
+        if conn.in_transaction:
+            # The open transaction may hold uncommitted rows; don't cache them
+            return list(load())
+        self._check_version(conn)
+        key = (DB_FILE, table)
+        with self._lock:
+            rows = self._entries.get(key)
+            if rows is not None:
+                self.hits += 1
+                return list(rows)
+            self.misses += 1
+            generation = self._generation
+
+        rows = tuple(load())
+        with self._lock:
+            # Skip the store if an invalidation raced with the load
+            if generation == self._generation:
+                self._entries[key] = rows
+        return list(rows)
+
+    def invalidate(self, *tables):
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._entries if key[1] in tables]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+_cache = ReferenceCache()
+
+
+def invalidate_cache(*tables):
+    """Drop cached rows for the given tables, or for all of them"""
+    if tables:
+        _cache.invalidate(*tables)
+    else:
+        _cache.clear()
+
+
+def cache_stats():
+    """Return the reference cache's hit and miss counts"""
+    return {"hits": _cache.hits, "misses": _cache.misses}
+
+
+def change_token(*tables):
+    """Return a token that changes whenever any of the given tables is written.
+
+    Screens keep the token from their last load and skip rebuilding when it
+    comes back unchanged. With no arguments every tracked table is covered.
+    Writes from any connection or process count.
+    """
+    tables = tables or CHANGE_TRACKED_TABLES
+    unknown = set(tables) - set(CHANGE_TRACKED_TABLES)
+    if unknown:
+        raise ValueError(f"Changes are not tracked for: {', '.join(sorted(unknown))}")
+    versions = dict(
+        get_connection().execute("SELECT table_name, version FROM change_counter")
+    )
+    return tuple(versions[table] for table in tables)
+
+
+_SENDER_SELECT = "SELECT id, name, address, email, phone FROM sender"
+_CLIENT_SELECT = "SELECT id, name, address, email FROM client"
+_INVOICE_SELECT = """
         SELECT 
             i.id,
             s.name as sender_name,
             c.name as client_name,
             i.date_created,
-            i.paid
+            i.paid,
+            i.item_count,
+            i.grand_total
         FROM invoice i
         LEFT JOIN sender s ON i.sender_id = s.id
         LEFT JOIN client c ON i.client_id = c.id
-        ORDER BY i.date_created DESC
+"""
+
+
+def _invoice_row(cursor, row):
+    # grand_total is stored in cents
+    return InvoiceSummary(*row[:-1], from_minor(row[-1]))
+
+
+def _item(item_name, quantity, unit_price):
+    return InvoiceItem(
+        item_name, from_scaled_quantity(quantity), from_minor(unit_price)
+    )
+
+
+def list_senders():
+    """List all senders; served from the reference cache when unchanged"""
+    return _cache.get("sender", iter_senders)
+
+
+def iter_senders(batch_size=None):
+    """Yield every sender ordered by name without loading them all at once"""
+    return _iter_rows(
+        f"{_SENDER_SELECT} ORDER BY name, id",
+        batch_size=batch_size,
+        row_factory=Sender.from_row,
+    )
+
+
+def list_senders_page(page_size=DEFAULT_PAGE_SIZE, after=None):
+    """Return one page of senders ordered by name, plus the cursor for the next.
+
+    Pass the returned cursor back as after to continue; it is None once the
+    last page has been reached.
     """
+    if after is None:
+        sql, params = f"{_SENDER_SELECT} ORDER BY name, id LIMIT ?", ()
+    else:
+        sql = f"{_SENDER_SELECT} WHERE (name, id) > (?, ?) ORDER BY name, id LIMIT ?"
+        params = tuple(after)
+    return _fetch_page(
+        sql, params, page_size, lambda row: (row.name, row.id), Sender.from_row
     )
-    invoices = c.fetchall()
-    conn.close()
-    return invoices
+
+
+def list_clients():
+    """List all clients from the database as per FR2.2"""
+    return _cache.get("client", iter_clients)
+
+
+def iter_clients(batch_size=None):
+    """Yield every client ordered by name without loading them all at once"""
+    return _iter_rows(
+        f"{_CLIENT_SELECT} ORDER BY name, id",
+        batch_size=batch_size,
+        row_factory=Client.from_row,
+    )
+
+
+def list_clients_page(page_size=DEFAULT_PAGE_SIZE, after=None):
+    """Return one page of clients ordered by name, plus the cursor for the next"""
+    if after is None:
+        sql, params = f"{_CLIENT_SELECT} ORDER BY name, id LIMIT ?", ()
+    else:
+        sql = f"{_CLIENT_SELECT} WHERE (name, id) > (?, ?) ORDER BY name, id LIMIT ?"
+        params = tuple(after)
+    return _fetch_page(
+        sql, params, page_size, lambda row: (row.name, row.id), Client.from_row
+    )
+
+
+def list_footer_messages():
+    """List all footer messages from the database"""
+    return _cache.get("footer_message", _load_footer_messages)
+
+
+def _load_footer_messages():
+    c = get_connection().cursor()
+    c.row_factory = FooterMessage.from_row
+    return c.execute("SELECT id, message FROM footer_message").fetchall()
+
+
+def list_invoices():
+    """List all invoices with their basic information including paid status"""
+    return list(iter_invoices())
+
+
+def iter_invoices(batch_size=None):
+    """Yield every invoice, newest first, without loading them all at once"""
+    return _iter_rows(
+        f"{_INVOICE_SELECT} ORDER BY i.date_created DESC, i.id DESC",
+        batch_size=batch_size,
+        row_factory=_invoice_row,
+    )
+
+
+def list_invoices_page(page_size=DEFAULT_PAGE_SIZE, after=None):
+    """Return one page of invoices, newest first, plus the cursor for the next.
+
+    The cursor is the (date_created, id) of the last row on the page.
+    """
+    if after is None:
+        sql = f"{_INVOICE_SELECT} ORDER BY i.date_created DESC, i.id DESC LIMIT ?"
+        params = ()
+    else:
+        sql = f"""{_INVOICE_SELECT}
+        WHERE (i.date_created, i.id) < (?, ?)
+        ORDER BY i.date_created DESC, i.id DESC LIMIT ?"""
+        params = tuple(after)
+    return _fetch_page(
+        sql, params, page_size, lambda row: (row.date_created, row.id), _invoice_row
+    )
+
+
+def _fts_query(text):
+    """Turn user input into an FTS5 query matching every word as a prefix.
+
+    Words are quoted, so FTS5 operators typed by the user are taken
+    literally. Returns None when there is nothing to search for.
+    """
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_clients(text, limit=DEFAULT_SEARCH_LIMIT):
+    """Clients whose name, address or email match text, best match first"""
+    query = _fts_query(text)
+    if query is None:
+        return []
+    c = get_connection().cursor()
+    c.row_factory = Client.from_row
+    return c.execute(
+        """
+        SELECT c.id, c.name, c.address, c.email
+        FROM client_fts
+        JOIN client c ON c.rowid = client_fts.rowid
+        WHERE client_fts MATCH ?
+        ORDER BY bm25(client_fts), c.name
+        LIMIT ?
+    """,
+        (query, limit),
+    ).fetchall()
+
+
+def search_senders(text, limit=DEFAULT_SEARCH_LIMIT):
+    """Senders whose name, address, email or phone match text"""
+    query = _fts_query(text)
+    if query is None:
+        return []
+    c = get_connection().cursor()
+    c.row_factory = Sender.from_row
+    return c.execute(
+        """
+        SELECT s.id, s.name, s.address, s.email, s.phone
+        FROM sender_fts
+        JOIN sender s ON s.rowid = sender_fts.rowid
+        WHERE sender_fts MATCH ?
+        ORDER BY bm25(sender_fts), s.name
+        LIMIT ?
+    """,
+        (query, limit),
+    ).fetchall()
+
+
+def search_footer_messages(text, limit=DEFAULT_SEARCH_LIMIT):
+    """Footer messages matching text"""
+    query = _fts_query(text)
+    if query is None:
+        return []
+    c = get_connection().cursor()
+    c.row_factory = FooterMessage.from_row
+    return c.execute(
+        """
+        SELECT f.id, f.message
+        FROM footer_message_fts
+        JOIN footer_message f ON f.id = footer_message_fts.rowid
+        WHERE footer_message_fts MATCH ?
+        ORDER BY bm25(footer_message_fts)
+        LIMIT ?
+    """,
+        (query, limit),
+    ).fetchall()
+
+
+def search_invoices(text, limit=DEFAULT_SEARCH_LIMIT):
+    """Invoices with an item, client or sender matching text, best match first"""
+    query = _fts_query(text)
+    if query is None:
+        return []
+    c = get_connection().cursor()
+    c.row_factory = _invoice_row
+    return c.execute(
+        f"""
+        WITH hits (invoice_id, rank) AS (
+            SELECT ii.invoice_id, bm25(invoice_item_fts)
+            FROM invoice_item_fts
+            JOIN invoice_item ii ON ii.id = invoice_item_fts.rowid
+            WHERE invoice_item_fts MATCH :query
+            UNION ALL
+            SELECT inv.id, bm25(client_fts)
+            FROM client_fts
+            JOIN client cl ON cl.rowid = client_fts.rowid
+            JOIN invoice inv ON inv.client_id = cl.id
+            WHERE client_fts MATCH :query
+            UNION ALL
+            SELECT inv.id, bm25(sender_fts)
+            FROM sender_fts
+            JOIN sender se ON se.rowid = sender_fts.rowid
+            JOIN invoice inv ON inv.sender_id = se.id
+            WHERE sender_fts MATCH :query
+        ),
+        best AS (
+            SELECT invoice_id, MIN(rank) AS rank FROM hits GROUP BY invoice_id
+        )
+        {_INVOICE_SELECT}
+        JOIN best ON best.invoice_id = i.id
+        ORDER BY best.rank, i.date_created DESC, i.id DESC
+        LIMIT :limit
+    """,
+        {"query": query, "limit": limit},
+    ).fetchall()
+
+
+def search(text, limit=DEFAULT_SEARCH_LIMIT):
+    """Search clients, senders, footer messages and invoice items at once.
+
+    Every word in text is matched as a prefix, so "acm inv" finds
+    "Acme Invoicing". Returns SearchResult records ordered by bm25 rank
+    (best first); item hits carry the id of their invoice.
+    """
+    query = _fts_query(text)
+    if query is None:
+        return []
+    c = get_connection().cursor()
+    c.row_factory = SearchResult.from_row
+    return c.execute(
+        """
+        SELECT 'client', c.id, c.name, c.email, bm25(client_fts) AS rank
+        FROM client_fts JOIN client c ON c.rowid = client_fts.rowid
+        WHERE client_fts MATCH :query
+        UNION ALL
+        SELECT 'sender', s.id, s.name, s.email, bm25(sender_fts)
+        FROM sender_fts JOIN sender s ON s.rowid = sender_fts.rowid
+        WHERE sender_fts MATCH :query
+        UNION ALL
+        SELECT 'footer_message', f.id, f.message, NULL, bm25(footer_message_fts)
+        FROM footer_message_fts JOIN footer_message f ON f.id = footer_message_fts.rowid
+        WHERE footer_message_fts MATCH :query
+        UNION ALL
+        SELECT 'invoice_item', ii.invoice_id, ii.item_name,
+               'Invoice #' || ii.invoice_id, bm25(invoice_item_fts)
+        FROM invoice_item_fts JOIN invoice_item ii ON ii.id = invoice_item_fts.rowid
+        WHERE invoice_item_fts MATCH :query
+        ORDER BY rank
+        LIMIT :limit
+    """,
+        {"query": query, "limit": limit},
+    ).fetchall()
 
 
 def create_client(name, address=None, email=None):
@@ -132,23 +757,19 @@ def create_client(name, address=None, email=None):
     if not name or not name.strip():
         raise ValueError("Client name is required")
 
-    client_id = str(uuid.uuid4())
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    try:
+    with transaction() as c:
         c.execute(
-            "INSERT INTO client (id, name, address, email) VALUES (?, ?, ?, ?)",
+            "INSERT INTO client (uuid, name, address, email) VALUES (?, ?, ?, ?)",
             (
-                client_id,
+                str(uuid.uuid4()),
                 name.strip(),
                 address.strip() if address else None,
                 email.strip() if email else None,
             ),
         )
-        conn.commit()
-        return client_id
-    finally:
-        conn.close()
+        client_id = c.lastrowid
+    _cache.invalidate("client")
+    return client_id
 
 
 def create_sender(name, address=None, email=None, phone=None):
@@ -156,24 +777,37 @@ def create_sender(name, address=None, email=None, phone=None):
     if not name or not name.strip():
         raise ValueError("Sender name is required")
 
-    sender_id = str(uuid.uuid4())
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    try:
+    with transaction() as c:
         c.execute(
-            "INSERT INTO sender (id, name, address, email, phone) VALUES (?, ?, ?, ?, ?)",
+            "INSERT INTO sender (uuid, name, address, email, phone) "
+            "VALUES (?, ?, ?, ?, ?)",
             (
-                sender_id,
+                str(uuid.uuid4()),
                 name.strip(),
                 address.strip() if address else None,
                 email.strip() if email else None,
                 phone.strip() if phone else None,
             ),
         )
-        conn.commit()
-        return sender_id
-    finally:
-        conn.close()
+        sender_id = c.lastrowid
+    _cache.invalidate("sender")
+    return sender_id
+
+
+def get_sender_id(sender_uuid):
+    """Return the id of the sender with this UUID, or None"""
+    row = get_connection().execute(
+        "SELECT id FROM sender WHERE uuid = ?", (sender_uuid,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def get_client_id(client_uuid):
+    """Return the id of the client with this UUID, or None"""
+    row = get_connection().execute(
+        "SELECT id FROM client WHERE uuid = ?", (client_uuid,)
+    ).fetchone()
+    return row[0] if row else None
 
 
 def create_footer_message(message):
@@ -181,18 +815,14 @@ def create_footer_message(message):
     if not message or not message.strip():
         raise ValueError("Footer message is required")
 
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    try:
+    with transaction() as c:
         c.execute(
             "INSERT INTO footer_message (message) VALUES (?)",
             (message.strip(),),
         )
-        conn.commit()
         footer_id = c.lastrowid
-        return footer_id
-    finally:
-        conn.close()
+    _cache.invalidate("footer_message")
+    return footer_id
 
 
 def update_client(client_id, name, address=None, email=None):
@@ -200,9 +830,7 @@ def update_client(client_id, name, address=None, email=None):
     if not name or not name.strip():
         raise ValueError("Client name is required")
 
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    try:
+    with transaction() as c:
         c.execute(
             "UPDATE client SET name = ?, address = ?, email = ? WHERE id = ?",
             (
@@ -212,12 +840,10 @@ def update_client(client_id, name, address=None, email=None):
                 client_id,
             ),
         )
-        conn.commit()
         if c.rowcount == 0:
             raise ValueError(f"Client with ID {client_id} not found")
-        return client_id
-    finally:
-        conn.close()
+    _cache.invalidate("client")
+    return client_id
 
 
 def update_sender(sender_id, name, address=None, email=None, phone=None):
@@ -225,9 +851,7 @@ def update_sender(sender_id, name, address=None, email=None, phone=None):
     if not name or not name.strip():
         raise ValueError("Sender name is required")
 
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    try:
+    with transaction() as c:
         c.execute(
             "UPDATE sender SET name = ?, address = ?, email = ?, phone = ? WHERE id = ?",
             (
@@ -238,12 +862,10 @@ def update_sender(sender_id, name, address=None, email=None, phone=None):
                 sender_id,
             ),
         )
-        conn.commit()
         if c.rowcount == 0:
             raise ValueError(f"Sender with ID {sender_id} not found")
-        return sender_id
-    finally:
-        conn.close()
+    _cache.invalidate("sender")
+    return sender_id
 
 
 def update_footer_message(footer_id, message):
@@ -251,88 +873,112 @@ def update_footer_message(footer_id, message):
     if not message or not message.strip():
         raise ValueError("Footer message is required")
 
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    try:
+    with transaction() as c:
         c.execute(
             "UPDATE footer_message SET message = ? WHERE id = ?",
             (message.strip(), footer_id),
         )
-        conn.commit()
         if c.rowcount == 0:
             raise ValueError(f"Footer message with ID {footer_id} not found")
-        return footer_id
-    finally:
-        conn.close()
+    _cache.invalidate("footer_message")
+    return footer_id
 
 
 def create_invoice(sender_id, client_id, footer_message_id=None, paid=False):
     """Create a new invoice"""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    try:
+    with transaction() as c:
         c.execute(
             "INSERT INTO invoice (sender_id, client_id, footer_message_id, paid) VALUES (?, ?, ?, ?)",
             (sender_id, client_id, footer_message_id, paid),
         )
-        conn.commit()
         invoice_id = c.lastrowid
         return invoice_id
-    finally:
-        conn.close()
 
 
 def update_invoice(
     invoice_id, sender_id, client_id, footer_message_id=None, paid=False
 ):
     """Update an existing invoice"""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    try:
+    with transaction() as c:
         c.execute(
             "UPDATE invoice SET sender_id = ?, client_id = ?, footer_message_id = ?, paid = ? WHERE id = ?",
             (sender_id, client_id, footer_message_id, paid, invoice_id),
         )
-        conn.commit()
         if c.rowcount == 0:
             raise ValueError(f"Invoice with ID {invoice_id} not found")
         return invoice_id
-    finally:
-        conn.close()
 
 
-def add_invoice_item(invoice_id, item_name, amount, cost_per_unit):
-    """Add an item to an invoice"""
+def _validate_item(item_name, amount, cost_per_unit):
+    """Check an item and convert it to (item_name, quantity, unit_price) as stored"""
     if not item_name or not item_name.strip():
         raise ValueError("Item name is required")
-    if amount <= 0:
+    try:
+        quantity = to_scaled_quantity(amount)
+    except ValueError:
+        raise ValueError("Amount must be a number") from None
+    if quantity <= 0:
         raise ValueError("Amount must be positive")
-    if cost_per_unit <= 0:
+    try:
+        unit_price = to_minor(cost_per_unit)
+    except ValueError:
+        raise ValueError("Cost per unit must be a number") from None
+    if unit_price <= 0:
         raise ValueError("Cost per unit must be positive")
+    return item_name.strip(), quantity, unit_price
 
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    try:
+
+def add_invoice_item(invoice_id, item_name, amount, cost_per_unit):
+    """Add an item to an invoice"""
+    item_name, quantity, unit_price = _validate_item(item_name, amount, cost_per_unit)
+
+    with transaction() as c:
         c.execute(
-            "INSERT INTO invoice_item (invoice_id, item_name, amount, cost_per_unit) VALUES (?, ?, ?, ?)",
-            (invoice_id, item_name.strip(), amount, cost_per_unit),
+            "INSERT INTO invoice_item (invoice_id, item_name, quantity, unit_price) VALUES (?, ?, ?, ?)",
+            (invoice_id, item_name, quantity, unit_price),
         )
-        conn.commit()
         item_id = c.lastrowid
         return item_id
-    finally:
-        conn.close()
 
 
-def get_invoice_data(invoice_id):
-    """Get complete invoice data including sender, client, items, and footer message"""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
+def add_invoice_items(invoice_id, items):
+    """Add many items to an invoice in a single transaction.
 
-    # Get invoice with sender and client details
-    c.execute(
-        """
-        SELECT 
+    items is an iterable of (item_name, amount, cost_per_unit) tuples; amounts
+    may be int, float, str or Decimal. Every
+    row is validated before anything is written, and a failure rolls back the
+    whole batch. Returns the new item ids in input order.
+    """
+    rows = []
+    for position, item in enumerate(items, start=1):
+        try:
+            item_name, amount, cost_per_unit = item
+            rows.append((invoice_id,) + _validate_item(item_name, amount, cost_per_unit))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Item {position}: {e}") from None
+
+    if not rows:
+        return []
+
+    with transaction() as c:
+        # The write lock is held from here on, so ids above the current
+        # maximum can only belong to the rows inserted below
+        c.execute("SELECT COALESCE(MAX(id), 0) FROM invoice_item")
+        last_id = c.fetchone()[0]
+        c.executemany(
+            "INSERT INTO invoice_item (invoice_id, item_name, quantity, unit_price) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        c.execute("SELECT id FROM invoice_item WHERE id > ? ORDER BY id", (last_id,))
+        return [row[0] for row in c.fetchall()]
+
+
+def _decode_items(items_json):
+    """Turn the JSON item array built by json_group_array into InvoiceItems"""
+    return [_item(*item) for item in json.loads(items_json)]
+
+
+_INVOICE_DATA_COLUMNS = """
             i.id as invoice_id,
             i.date_created,
             i.paid,
@@ -341,32 +987,228 @@ def get_invoice_data(invoice_id):
             f.message as footer_message,
             i.sender_id,
             i.client_id,
-            i.footer_message_id
-        FROM invoice i
+            i.footer_message_id"""
+
+_INVOICE_DATA_JOINS = """
         LEFT JOIN sender s ON i.sender_id = s.id
         LEFT JOIN client c ON i.client_id = c.id
-        LEFT JOIN footer_message f ON i.footer_message_id = f.id
+        LEFT JOIN footer_message f ON i.footer_message_id = f.id"""
+
+
+@contextmanager
+def read_snapshot():
+    """Run several reads against one consistent snapshot of the database"""
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        conn.commit()
+
+
+def _select_invoice_data(conn, invoice_id, prefix=""):
+    # prefix picks the schema of the invoice tables, e.g. "archive."
+    c = conn.execute(
+        f"""
+        SELECT {_INVOICE_DATA_COLUMNS},
+            (
+                SELECT json_group_array(json_array(item_name, quantity, unit_price))
+                FROM (
+                    SELECT item_name, quantity, unit_price
+                    FROM {prefix}invoice_item
+                    WHERE invoice_id = i.id
+                    ORDER BY id
+                )
+            ) as items
+        FROM {prefix}invoice i
+        {_INVOICE_DATA_JOINS}
         WHERE i.id = ?
     """,
         (invoice_id,),
     )
+    row = c.fetchone()
+    c.close()
+    return row
 
-    invoice_data = c.fetchone()
 
-    # Get invoice items
-    c.execute(
-        """
-        SELECT item_name, amount, cost_per_unit
-        FROM invoice_item
-        WHERE invoice_id = ?
+def get_invoice_data(invoice_id):
+    """Get complete invoice data including sender, client, items, and footer message.
+
+    Header and items come back from one statement, so they are read from the
+    same snapshot even while another process is adding items. Invoices moved
+    to the archive database are looked up there. Returns
+    (Invoice, [InvoiceItem, ...]), or (None, []) when the invoice does not
+    exist.
+    """
+    conn = get_connection()
+    row = _select_invoice_data(conn, invoice_id)
+    if row is None and attach_archive(conn):
+        row = _select_invoice_data(conn, invoice_id, f"{ARCHIVE_SCHEMA}.")
+
+    if row is None:
+        return None, []
+    return Invoice(*row[:-1]), _decode_items(row[-1])
+
+
+def _select_invoice_data_many(conn, ids_json, prefix=""):
+    # prefix picks the schema of the invoice tables, e.g. "archive."
+    c = conn.cursor()
+    c.row_factory = Invoice.from_row
+    headers = c.execute(
+        f"""
+        SELECT {_INVOICE_DATA_COLUMNS}
+        FROM {prefix}invoice i
+        {_INVOICE_DATA_JOINS}
+        WHERE i.id IN (SELECT value FROM json_each(?))
     """,
-        (invoice_id,),
+        (ids_json,),
+    ).fetchall()
+    item_rows = conn.execute(
+        f"""
+        SELECT invoice_id, item_name, quantity, unit_price
+        FROM {prefix}invoice_item
+        WHERE invoice_id IN (SELECT value FROM json_each(?))
+        ORDER BY invoice_id, id
+    """,
+        (ids_json,),
     )
 
-    items = c.fetchall()
-    conn.close()
+    # Items arrive sorted by invoice, so one pass groups them
+    items_by_invoice = {}
+    for invoice_id, rows in itertools.groupby(item_rows, key=lambda r: r[0]):
+        items_by_invoice[invoice_id] = [_item(*row[1:]) for row in rows]
+    return {
+        header.id: (header, items_by_invoice.get(header.id, []))
+        for header in headers
+    }
+
+
+def get_invoice_data_many(invoice_ids):
+    """Get invoice data for many invoices with two queries in total.
+
+    Invoices moved to the archive database are looked up there, with two
+    more queries. Returns a dict mapping each found invoice id to
+    (invoice_data, items), in the order the ids were given; unknown ids are
+    left out.
+    """
+    ids = list(dict.fromkeys(invoice_ids))
+    if not ids:
+        return {}
 
-    return invoice_data, items
+    conn = get_connection()
+    archived = attach_archive(conn)
+    with read_snapshot() as conn:
+        found = _select_invoice_data_many(conn, json.dumps(ids))
+        missing = [invoice_id for invoice_id in ids if invoice_id not in found]
+        if missing and archived:
+            found.update(
+                _select_invoice_data_many(
+                    conn, json.dumps(missing), f"{ARCHIVE_SCHEMA}."
+                )
+            )
+
+    return {invoice_id: found[invoice_id] for invoice_id in ids if invoice_id in found}
+
+
+def iter_invoice_data(
+    start_id=None,
+    end_id=None,
+    paid=None,
+    client_id=None,
+    batch_size=None,
+    include_archive=True,
+):
+    """Yield (invoice_data, items) for every matching invoice in id order.
+
+    Invoices are fetched batch_size at a time with get_invoice_data_many, so
+    walking any number of invoices costs three queries per batch. start_id and
+    end_id bound the id range (inclusive); paid and client_id filter.
+    include_archive=False leaves out invoices moved to the archive database.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    conditions, params = ["id > ?"], []
+    if end_id is not None:
+        conditions.append("id <= ?")
+        params.append(end_id)
+    if paid is not None:
+        conditions.append("paid = ?")
+        params.append(bool(paid))
+    if client_id is not None:
+        conditions.append("client_id = ?")
+        params.append(client_id)
+    where = " AND ".join(conditions)
+    sql = f"SELECT id FROM invoice WHERE {where}"
+    sources = 1
+    if include_archive and attach_archive():
+        # UNION, not UNION ALL: a batch interrupted between its copy and
+        # its delete leaves an invoice in both files
+        sql += f" UNION SELECT id FROM {ARCHIVE_SCHEMA}.invoice WHERE {where}"
+        sources = 2
+    sql += " ORDER BY id LIMIT ?"
+
+    last_id = start_id - 1 if start_id is not None else 0
+    while True:
+        ids = [
+            row[0]
+            for row in get_connection().execute(
+                sql, ([last_id] + params) * sources + [batch_size]
+            )
+        ]
+        if not ids:
+            return
+        yield from get_invoice_data_many(ids).values()
+        if len(ids) < batch_size:
+            return
+        last_id = ids[-1]
+
+
+def check_invoice_totals(repair=False):
+    """Compare stored invoice totals against their items.
+
+    Returns a list of (invoice_id, stored_item_count, actual_item_count,
+    stored_grand_total, actual_grand_total) for every invoice that disagrees.
+    With repair=True those invoices are recomputed from their items.
+    """
+    c = get_connection().execute(
+        """
+        SELECT i.id, i.item_count, COALESCE(t.item_count, 0),
+               i.grand_total, COALESCE(t.subtotal, 0)
+        FROM invoice i
+        LEFT JOIN (
+            SELECT invoice_id, SUM(line_total) AS subtotal, COUNT(*) AS item_count
+            FROM invoice_item
+            GROUP BY invoice_id
+        ) AS t ON t.invoice_id = i.id
+        WHERE i.item_count != COALESCE(t.item_count, 0)
+           OR i.subtotal != COALESCE(t.subtotal, 0)
+           OR i.grand_total != COALESCE(t.subtotal, 0)
+        ORDER BY i.id
+    """
+    )
+    mismatches = c.fetchall()
+
+    if repair and mismatches:
+        with transaction() as c:
+            c.executemany(
+                """
+                UPDATE invoice SET
+                    item_count = ?,
+                    subtotal = ?,
+                    grand_total = ?
+                WHERE id = ?
+            """,
+                [
+                    (count, total, total, invoice_id)
+                    for invoice_id, _, count, _, total in mismatches
+                ],
+            )
+    return [
+        (invoice_id, stored_count, count, from_minor(stored_total), from_minor(total))
+        for invoice_id, stored_count, count, stored_total, total in mismatches
+    ]
 
 
 def create_sample_data():
@@ -395,8 +1237,13 @@ def create_sample_data():
     invoice_id = create_invoice(sender_id, client_id, footer_id)
 
     # Add sample items
-    add_invoice_item(invoice_id, "Consulting Hours", 40, 125.00)
-    add_invoice_item(invoice_id, "Project Analysis", 1, 500.00)
-    add_invoice_item(invoice_id, "Documentation", 8, 75.00)
+    add_invoice_items(
+        invoice_id,
+        [
+            ("Consulting Hours", 40, 125.00),
+            ("Project Analysis", 1, 500.00),
+            ("Documentation", 8, 75.00),
+        ],
+    )
 
     return invoice_id
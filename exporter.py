@@ -0,0 +1,311 @@
+"""Streaming export of invoices with their sender, client and items.
+
+One query joins every matching invoice to its sender, client and items, and
+its rows are fetched DEFAULT_BATCH_SIZE at a time and written out as they
+arrive, so memory use stays flat however many invoices are exported. The
+query runs as a single read, so the file is a consistent snapshot even while
+the TUI keeps writing. Invoices moved to the archive database (archive.py)
+are included unless include_archive=False; a second query reads them in the
+same order, and the two streams are merged.
+
+The formats mirror what importer.py reads, so an export of invoices whose
+senders and clients have external keys can be imported elsewhere:
+
+- CSV: one row per line item, with the invoice fields repeated on each row;
+  an invoice without items gets one row with empty item fields
+- JSONL: one object per invoice with its items in an ``items`` list
+
+Money and quantities are written as exact decimal strings. A path ending in
+``.gz`` (or compress=True) writes gzip-compressed output.
+"""
+
+import csv
+import gzip
+import heapq
+import itertools
+import json
+import sys
+import time
+
+from database import (
+    ARCHIVE_SCHEMA,
+    DEFAULT_BATCH_SIZE,
+    attach_archive,
+    get_connection,
+)
+from importer import FORMATS, detect_format
+from money import from_minor, from_scaled_quantity
+
+INVOICE_FIELDS = (
+    "invoice_id",
+    "external_key",
+    "date_created",
+    "paid",
+    "sender_key",
+    "sender_name",
+    "client_key",
+    "client_name",
+    "item_count",
+    "subtotal",
+    "grand_total",
+)
+ITEM_FIELDS = ("item_name", "amount", "cost_per_unit", "line_total")
+
+# Nearly as small as gzip's default level 9 and much faster on large exports
+GZIP_LEVEL = 6
+
+_EXPORT_COLUMNS = """
+    SELECT i.id, i.external_key, i.date_created, i.paid,
+           s.external_key, s.name, c.external_key, c.name,
+           i.item_count, i.subtotal, i.grand_total,
+           it.item_name, it.quantity, it.unit_price, it.line_total, it.id"""
+
+
+def _export_select(prefix=""):
+    # prefix picks the schema of the invoice tables, e.g. "archive."
+    return f"""{_EXPORT_COLUMNS}
+    FROM {prefix}invoice i
+    LEFT JOIN sender s ON s.id = i.sender_id
+    LEFT JOIN client c ON c.id = i.client_id
+    LEFT JOIN {prefix}invoice_item it ON it.invoice_id = i.id
+"""
+
+
+class ExportResult:
+    """Outcome of an export run"""
+
+    def __init__(self, fmt, invoices, rows, seconds):
+        self.fmt = fmt
+        self.invoices = invoices
+        self.rows = rows  # lines written, not counting a CSV header
+        self.seconds = seconds
+
+    @property
+    def invoices_per_second(self):
+        return self.invoices / self.seconds if self.seconds else float(self.invoices)
+
+    def __repr__(self):
+        return (
+            f"ExportResult(fmt={self.fmt!r}, invoices={self.invoices}, "
+            f"rows={self.rows}, seconds={self.seconds:.2f})"
+        )
+
+
+def _export_format(path):
+    path = str(path)
+    if path.lower().endswith(".gz"):
+        path = path[:-3]
+    return detect_format(path)
+
+
+def iter_export_rows(
+    start=None,
+    end=None,
+    client_id=None,
+    paid=None,
+    batch_size=None,
+    include_archive=True,
+):
+    """Yield one (invoice fields..., item fields...) tuple per line item.
+
+    Invoices come in (date_created, id) order with their items in the order
+    they were added. start (inclusive) and end (exclusive) bound date_created,
+    as "YYYY-MM-DD" strings; client_id and paid filter. Item fields are None
+    for an invoice without items. include_archive=False leaves out invoices
+    moved to the archive database.
+    """
+    # Walking the date index keeps rows in output order without a sort; the
+    # unary + stops the planner from picking the client index instead. It
+    # also drops the column's integer affinity, hence the CAST for ids given
+    # as strings
+    conditions, params = [], []
+    if start is not None:
+        conditions.append("i.date_created >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("i.date_created < ?")
+        params.append(end)
+    if client_id is not None:
+        conditions.append("+i.client_id = CAST(? AS INTEGER)")
+        params.append(client_id)
+    if paid is not None:
+        conditions.append("+i.paid = ?")
+        params.append(bool(paid))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    order = " ORDER BY i.date_created, i.id, it.id"
+    queries = [(f"{_export_select()} {where}{order}", params)]
+    conn = get_connection()
+    if include_archive and attach_archive(conn):
+        # A batch interrupted between its copy and its delete leaves an
+        # invoice in both files; the main database's copy wins
+        archived = conditions + ["i.id NOT IN (SELECT id FROM main.invoice)"]
+        queries.append(
+            (
+                f"{_export_select(ARCHIVE_SCHEMA + '.')} "
+                f"WHERE {' AND '.join(archived)}{order}",
+                params,
+            )
+        )
+
+    # Each query walks its own file's date index; merging the two ordered
+    # streams keeps memory flat where one ORDER BY over both would sort the
+    # whole export. Statements started together on one connection read the
+    # same snapshot
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    cursors = [conn.cursor() for _ in queries]
+    try:
+        for c, (sql, query_params) in zip(cursors, queries):
+            c.execute(sql, query_params)
+        streams = [_fetch(c, batch_size) for c in cursors]
+        rows = streams[0] if len(streams) == 1 else heapq.merge(*streams, key=_order)
+        for row in rows:
+            yield _convert(row)
+    finally:
+        for c in cursors:
+            c.close()
+
+
+def _fetch(c, batch_size):
+    while True:
+        rows = c.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def _order(row):
+    # The ORDER BY of each query: date_created (NULL first), invoice id and
+    # item id, which is NULL only on the single row of an item-less invoice
+    return row[2] is not None, row[2] or "", row[0], row[-1] or 0
+
+
+def _convert(row):
+    (
+        invoice_id,
+        external_key,
+        date_created,
+        paid,
+        sender_key,
+        sender_name,
+        client_key,
+        client_name,
+        item_count,
+        subtotal,
+        grand_total,
+        item_name,
+        quantity,
+        unit_price,
+        line_total,
+        _item_id,
+    ) = row
+    invoice = (
+        invoice_id,
+        external_key,
+        date_created,
+        bool(paid),
+        sender_key,
+        sender_name,
+        client_key,
+        client_name,
+        item_count,
+        from_minor(subtotal),
+        from_minor(grand_total),
+    )
+    if item_name is None:
+        return invoice + (None, None, None, None)
+    return invoice + (
+        item_name,
+        from_scaled_quantity(quantity),
+        from_minor(unit_price),
+        from_minor(line_total),
+    )
+
+
+def _text(value):
+    return "" if value is None else str(value)
+
+
+def _write_csv(f, rows):
+    writer = csv.writer(f)
+    writer.writerow(INVOICE_FIELDS + ITEM_FIELDS)
+    written, last_id, invoices = 0, None, 0
+    for row in rows:
+        writer.writerow([_text(value) for value in row])
+        written += 1
+        if row[0] != last_id:
+            invoices += 1
+            last_id = row[0]
+    return invoices, written
+
+
+def _write_jsonl(f, rows):
+    count = len(INVOICE_FIELDS)
+    invoices = 0
+    for _invoice_id, group in itertools.groupby(rows, key=lambda row: row[0]):
+        first = next(group)
+        record = dict(zip(INVOICE_FIELDS, first[:count]))
+        for field in ("subtotal", "grand_total"):
+            record[field] = str(record[field])
+        record["items"] = []
+        for row in itertools.chain([first], group):
+            if row[count] is None:
+                continue
+            item = dict(zip(ITEM_FIELDS, row[count:]))
+            for field in ITEM_FIELDS[1:]:
+                item[field] = str(item[field])
+            record["items"].append(item)
+        f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n")
+        invoices += 1
+    return invoices, invoices
+
+
+def _open(path, compress):
+    if str(path) == "-":
+        return sys.stdout
+    if compress:
+        return gzip.open(
+            path, "wt", compresslevel=GZIP_LEVEL, newline="", encoding="utf-8"
+        )
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def export_invoices(
+    path,
+    fmt=None,
+    start=None,
+    end=None,
+    client_id=None,
+    paid=None,
+    compress=None,
+    batch_size=None,
+    include_archive=True,
+):
+    """Write matching invoices and their items to a CSV or JSONL file.
+
+    path "-" writes to stdout, which needs an explicit fmt. compress defaults
+    to whether path ends in ".gz". The filters and include_archive are those
+    of iter_export_rows. Returns an ExportResult.
+    """
+    fmt = fmt or _export_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'")
+    if compress is None:
+        compress = str(path).lower().endswith(".gz")
+
+    started = time.perf_counter()
+    rows = iter_export_rows(
+        start, end, client_id, paid, batch_size, include_archive
+    )
+    f = _open(path, compress)
+    try:
+        if fmt == "csv":
+            invoices, written = _write_csv(f, rows)
+        else:
+            invoices, written = _write_jsonl(f, rows)
+    finally:
+        rows.close()
+        if f is not sys.stdout:
+            f.close()
+    return ExportResult(fmt, invoices, written, time.perf_counter() - started)
@@ -0,0 +1,287 @@
+"""Bulk import of senders, clients and invoices from CSV or JSONL files.
+
+Files are streamed and written in chunks of ``chunk_size`` records, each chunk
+in its own transaction, so memory use stays flat no matter how large the file
+is. Records carrying an ``external_key`` are upserted: importing the same file
+twice updates the existing rows instead of duplicating them.
+
+Expected fields:
+
+- senders: name, address, email, phone, external_key
+- clients: name, address, email, external_key
+- invoices (JSONL): external_key, sender_key, client_key, paid, date_created,
+  items (a list of objects with item_name, amount, cost_per_unit)
+- invoices (CSV): one row per line item with the invoice fields above plus
+  item_name, amount and cost_per_unit; consecutive rows sharing an
+  external_key belong to the same invoice, and a row without one is an
+  invoice of its own
+
+``sender_key`` and ``client_key`` refer to the external keys of previously
+imported senders and clients.
+"""
+
+import csv
+import itertools
+import json
+import time
+import uuid
+
+from database import add_invoice_items, invalidate_cache, lock_stats, transaction
+
+DEFAULT_CHUNK_SIZE = 1000
+
+FORMATS = ("csv", "jsonl")
+KINDS = ("senders", "clients", "invoices")
+
+
+class ImportResult:
+    """Outcome of an import run"""
+
+    def __init__(self, kind, rows, seconds, lock_wait=0.0):
+        self.kind = kind
+        self.rows = rows
+        self.seconds = seconds
+        self.lock_wait = lock_wait  # seconds spent waiting for the write lock
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else float(self.rows)
+
+    def __repr__(self):
+        return (
+            f"ImportResult(kind={self.kind!r}, rows={self.rows}, "
+            f"seconds={self.seconds:.2f})"
+        )
+
+
+def detect_format(path):
+    """Guess the file format from its extension"""
+    lowered = str(path).lower()
+    if lowered.endswith(".csv"):
+        return "csv"
+    if lowered.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ValueError(f"Cannot tell the format of '{path}'; pass csv or jsonl")
+
+
+def read_records(path, fmt=None):
+    """Yield one dict per record in the file"""
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'")
+
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Line {line_number}: invalid JSON ({e})") from None
+
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in ("1", "true", "yes", "y", "paid")
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _contact_rows(records, fields, start):
+    rows = []
+    for position, record in enumerate(records, start=start):
+        name = _clean(record.get("name"))
+        if not name:
+            raise ValueError(f"Record {position}: name is required")
+        values = [_clean(record.get(field)) for field in fields]
+        external_key = _clean(record.get("external_key"))
+        rows.append([str(uuid.uuid4()), name] + values + [external_key])
+    return rows
+
+
+def _import_contacts(table, fields, chunks, progress):
+    columns = ", ".join(["uuid", "name"] + list(fields) + ["external_key"])
+    placeholders = ", ".join("?" * (len(fields) + 3))
+    updates = ", ".join(f"{col} = excluded.{col}" for col in ["name"] + list(fields))
+    sql = (
+        f"INSERT INTO {table} ({columns}) VALUES ({placeholders}) "
+        f"ON CONFLICT (external_key) DO UPDATE SET {updates}"
+    )
+
+    rows_done = 0
+    for chunk in chunks:
+        rows = _contact_rows(chunk, fields, rows_done + 1)
+        with transaction() as c:
+            c.executemany(sql, rows)
+        invalidate_cache(table)
+        rows_done += len(rows)
+        if progress:
+            progress(rows_done)
+    return rows_done
+
+
+def _group_invoice_rows(records):
+    """Fold CSV item rows into one invoice record per external_key run.
+
+    A row without an external_key is an invoice of its own; rows cannot be
+    told apart from the next invoice's otherwise.
+    """
+    # The row's position keys a keyless row, which no other row shares
+    runs = itertools.groupby(
+        enumerate(records),
+        key=lambda pair: _clean(pair[1].get("external_key")) or pair[0],
+    )
+    for _key, pairs in runs:
+        rows = [row for _position, row in pairs]
+        invoice = dict(rows[0])
+        invoice["items"] = [
+            {
+                "item_name": row.get("item_name"),
+                "amount": row.get("amount"),
+                "cost_per_unit": row.get("cost_per_unit"),
+            }
+            for row in rows
+            if _clean(row.get("item_name"))
+        ]
+        yield invoice
+
+
+def _lookup_ids(c, table, keys):
+    keys = sorted(k for k in keys if k)
+    c.execute(
+        f"SELECT external_key, id FROM {table} "
+        "WHERE external_key IN (SELECT value FROM json_each(?))",
+        (json.dumps(keys),),
+    )
+    return dict(c.fetchall())
+
+
+def _import_invoices(chunks, progress):
+    rows_done = 0
+    for chunk in chunks:
+        with transaction() as c:
+            sender_ids = _lookup_ids(
+                c, "sender", {_clean(r.get("sender_key")) for r in chunk}
+            )
+            client_ids = _lookup_ids(
+                c, "client", {_clean(r.get("client_key")) for r in chunk}
+            )
+
+            for position, record in enumerate(chunk, start=rows_done + 1):
+                sender_key = _clean(record.get("sender_key"))
+                client_key = _clean(record.get("client_key"))
+                if sender_key not in sender_ids:
+                    raise ValueError(f"Record {position}: unknown sender '{sender_key}'")
+                if client_key not in client_ids:
+                    raise ValueError(f"Record {position}: unknown client '{client_key}'")
+
+                c.execute(
+                    """
+                    INSERT INTO invoice (sender_id, client_id, paid, date_created, external_key)
+                    VALUES (:sender_id, :client_id, :paid,
+                            COALESCE(:date_created, CURRENT_TIMESTAMP), :external_key)
+                    ON CONFLICT (external_key) DO UPDATE SET
+                        sender_id = excluded.sender_id,
+                        client_id = excluded.client_id,
+                        paid = excluded.paid,
+                        date_created = COALESCE(:date_created, invoice.date_created)
+                    RETURNING id
+                """,
+                    {
+                        "sender_id": sender_ids[sender_key],
+                        "client_id": client_ids[client_key],
+                        "paid": _parse_bool(record.get("paid")),
+                        "date_created": _clean(record.get("date_created")),
+                        "external_key": _clean(record.get("external_key")),
+                    },
+                )
+                invoice_id = c.fetchone()[0]
+
+                # An upserted invoice gets the file's items, not a merge
+                c.execute("DELETE FROM invoice_item WHERE invoice_id = ?", (invoice_id,))
+                try:
+                    add_invoice_items(
+                        invoice_id,
+                        [
+                            (
+                                item.get("item_name"),
+                                item.get("amount"),
+                                item.get("cost_per_unit"),
+                            )
+                            for item in record.get("items") or []
+                        ],
+                    )
+                except (TypeError, ValueError) as e:
+                    raise ValueError(f"Record {position}: {e}") from None
+
+        rows_done += len(chunk)
+        if progress:
+            progress(rows_done)
+    return rows_done
+
+
+def import_file(
+    kind, path, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE, key="external_key", progress=None
+):
+    """Import senders, clients or invoices from a CSV or JSONL file.
+
+    key names the field holding each record's external key. progress, if
+    given, is called with the running record count after every chunk.
+    Returns an ImportResult. A bad record aborts the import; chunks committed
+    before it stay in the database and a re-run upserts over them.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown import kind '{kind}' (choose from: {', '.join(KINDS)})")
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be positive")
+
+    fmt = fmt or detect_format(path)
+    records = read_records(path, fmt)
+    if key != "external_key":
+        records = ({**r, "external_key": r.get(key)} for r in records)
+
+    started = time.perf_counter()
+    waited = lock_stats()["total_wait"]
+    if kind == "senders":
+        rows = _import_contacts(
+            "sender",
+            ("address", "email", "phone"),
+            _chunks(records, chunk_size),
+            progress,
+        )
+    elif kind == "clients":
+        rows = _import_contacts(
+            "client",
+            ("address", "email"),
+            _chunks(records, chunk_size),
+            progress,
+        )
+    else:
+        if fmt == "csv":
+            records = _group_invoice_rows(records)
+        rows = _import_invoices(_chunks(records, chunk_size), progress)
+
+    return ImportResult(
+        kind,
+        rows,
+        time.perf_counter() - started,
+        lock_wait=lock_stats()["total_wait"] - waited,
+    )
@@ -0,0 +1,316 @@
+"""Timing of database.py calls and the SQL statements they run.
+
+Off by default; enable() turns it on for the whole process:
+
+- every public database.py function is wrapped in a timer, so callers that
+  look functions up on the module (async_database, cli, the screens) are
+  measured, including calls one database.py function makes to another.
+  The application's own modules that imported functions by name (``from
+  database import ...``: reports, importer, exporter, archive and so on)
+  have those names rebound to the timed versions as well; modules imported
+  after enable() keep the plain functions
+- pooled connections are reopened as InstrumentedConnection, which times
+  each execute()/executemany() and every commit and rollback
+
+Each timed name gets a call count, total and maximum time and a latency
+histogram. Anything slower than the slow threshold is also appended to the
+slow log, one tab-separated line per call. Statement times cover execute()
+only; for a query that is the work up to its first row, and rows fetched
+later count towards the calling function instead. Parameters are never
+recorded, so the log holds no customer data.
+
+Set PYNVOICE_INSTRUMENT=1 to have app.py and cli.py enable it at start-up
+and print a summary on exit; PYNVOICE_SLOW_MS and PYNVOICE_SLOW_LOG change
+the threshold (default 100 ms) and the log file (default
+pynvoice-slow.log).
+"""
+
+import functools
+import inspect
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+import database
+
+INSTRUMENT_ENV = "PYNVOICE_INSTRUMENT"
+SLOW_MS_ENV = "PYNVOICE_SLOW_MS"
+SLOW_LOG_ENV = "PYNVOICE_SLOW_LOG"
+
+DEFAULT_SLOW_MS = 100
+DEFAULT_SLOW_LOG = "pynvoice-slow.log"
+
+# Upper bounds of the histogram buckets in milliseconds; the last bucket
+# holds everything slower
+BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+# Called constantly, return context managers or generators, or only run
+# while enabling, so timing them says nothing. The iter_* functions hand back
+# a generator at once; the statements it runs are still timed
+_UNTIMED = {
+    "get_connection",
+    "transaction",
+    "read_snapshot",
+    "set_connection_factory",
+    "iter_senders",
+    "iter_clients",
+    "iter_invoices",
+}
+
+
+class Timing:
+    """Call count, total and maximum time and histogram for one name"""
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        ms = seconds * 1000
+        for index, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[index] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, fraction):
+        """Upper bound in ms of the bucket holding that fraction of calls"""
+        if not self.count:
+            return 0.0
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= fraction * self.count:
+                if index < len(BUCKETS_MS):
+                    return float(BUCKETS_MS[index])
+                break
+        return self.max * 1000
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+            "buckets": dict(
+                zip([f"<={b}ms" for b in BUCKETS_MS] + ["slower"], self.buckets)
+            ),
+        }
+
+
+class _State:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.enabled = False
+        self.slow_seconds = DEFAULT_SLOW_MS / 1000
+        self.slow_log = DEFAULT_SLOW_LOG
+        self.timings = {}  # (kind, name) -> Timing
+        self.originals = {}  # database.py attribute -> unwrapped function
+        self.rebound = []  # (module, attribute, unwrapped function)
+
+
+_state = _State()
+
+
+def _normalize(sql):
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def record(kind, name, seconds):
+    """Add one timing; kind is "function" or "statement" """
+    with _state.lock:
+        timing = _state.timings.get((kind, name))
+        if timing is None:
+            timing = _state.timings[(kind, name)] = Timing()
+        timing.add(seconds)
+        if _state.slow_log and seconds >= _state.slow_seconds:
+            # Slow calls are rare, so appending under the lock costs little
+            with open(_state.slow_log, "a", encoding="utf-8") as f:
+                f.write(
+                    f"{time.strftime('%Y-%m-%d %H:%M:%S')}\t"
+                    f"{seconds * 1000:.1f}ms\t{kind}\t{name}\n"
+                )
+
+
+def _timed(kind, name, call, *args, **kwargs):
+    started = time.perf_counter()
+    try:
+        return call(*args, **kwargs)
+    finally:
+        record(kind, name, time.perf_counter() - started)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times execute(), executemany() and executescript()"""
+
+    def execute(self, sql, parameters=()):
+        return _timed("statement", _normalize(sql), super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return _timed(
+            "statement", _normalize(sql), super().executemany, sql, seq_of_parameters
+        )
+
+    def executescript(self, sql_script):
+        return _timed(
+            "statement", _normalize(sql_script), super().executescript, sql_script
+        )
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors, commits and rollbacks are timed"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # The built-in shortcuts bypass cursor(), so route them through it
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        return _timed("statement", "COMMIT", super().commit)
+
+    def rollback(self):
+        return _timed("statement", "ROLLBACK", super().rollback)
+
+
+def _public_functions():
+    for name, value in vars(database).items():
+        if (
+            name.startswith("_")
+            or name in _UNTIMED
+            or not inspect.isfunction(value)
+            or value.__module__ != database.__name__
+            # Generators return at once; their work happens in the caller
+            or inspect.isgeneratorfunction(value)
+        ):
+            continue
+        yield name, value
+
+
+def _consumer_modules():
+    """Loaded modules of the application itself, other than database.py"""
+    root = os.path.dirname(os.path.abspath(database.__file__))
+    tests = os.path.join(root, "tests") + os.sep
+    for module in list(sys.modules.values()):
+        path = os.path.abspath(getattr(module, "__file__", None) or os.sep)
+        if (
+            module is not database
+            and path.startswith(root + os.sep)
+            and not path.startswith(tests)
+        ):
+            yield module
+
+
+def _wrap(name, func):
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        return _timed("function", name, func, *args, **kwargs)
+
+    return timed
+
+
+def enable(slow_ms=None, slow_log=None):
+    """Start timing database.py calls and statements.
+
+    slow_ms and slow_log default to PYNVOICE_SLOW_MS and PYNVOICE_SLOW_LOG;
+    an empty slow_log turns the slow log off. Open pooled connections are
+    closed so they reopen instrumented.
+    """
+    if slow_ms is None:
+        slow_ms = float(os.environ.get(SLOW_MS_ENV) or DEFAULT_SLOW_MS)
+    if slow_log is None:
+        slow_log = os.environ.get(SLOW_LOG_ENV, DEFAULT_SLOW_LOG)
+    with _state.lock:
+        _state.slow_seconds = slow_ms / 1000
+        _state.slow_log = slow_log
+        if _state.enabled:
+            return
+        _state.enabled = True
+        wrappers = {}
+        for name, func in _public_functions():
+            _state.originals[name] = func
+            wrappers[func] = _wrap(name, func)
+            setattr(database, name, wrappers[func])
+        # Names bound by "from database import ..." still point at the
+        # plain functions
+        for module in _consumer_modules():
+            for attr, value in list(vars(module).items()):
+                if inspect.isfunction(value) and value in wrappers:
+                    _state.rebound.append((module, attr, value))
+                    setattr(module, attr, wrappers[value])
+    database.set_connection_factory(InstrumentedConnection)
+
+
+def disable():
+    """Stop timing and restore the plain functions and connections"""
+    with _state.lock:
+        if not _state.enabled:
+            return
+        _state.enabled = False
+        for name, func in _state.originals.items():
+            setattr(database, name, func)
+        for module, attr, func in _state.rebound:
+            setattr(module, attr, func)
+        _state.originals.clear()
+        _state.rebound.clear()
+    database.set_connection_factory(None)
+
+
+def is_enabled():
+    return _state.enabled
+
+
+def enabled_from_env():
+    """True when PYNVOICE_INSTRUMENT asks for instrumentation"""
+    value = os.environ.get(INSTRUMENT_ENV, "").strip().lower()
+    return value not in ("", "0", "false", "no", "off")
+
+
+def reset():
+    """Forget every timing recorded so far"""
+    with _state.lock:
+        _state.timings.clear()
+
+
+def stats():
+    """Return {(kind, name): {count, total, max, buckets}} for every timed name"""
+    with _state.lock:
+        return {key: timing.as_dict() for key, timing in _state.timings.items()}
+
+
+def summary(limit=20):
+    """Render the slowest names by total time as a text table"""
+    with _state.lock:
+        rows = sorted(
+            _state.timings.items(), key=lambda item: item[1].total, reverse=True
+        )[:limit]
+        lines = [
+            f"{'kind':<9} {'calls':>7} {'total ms':>10} {'mean ms':>8} "
+            f"{'p95 ms':>7} {'max ms':>8}  name"
+        ]
+        for (kind, name), timing in rows:
+            lines.append(
+                f"{kind:<9} {timing.count:>7} {timing.total * 1000:>10.1f} "
+                f"{timing.total * 1000 / timing.count:>8.2f} "
+                f"{timing.percentile(0.95):>7.0f} {timing.max * 1000:>8.1f}  "
+                f"{name[:100]}"
+            )
+    if len(lines) == 1:
+        return "No database calls were timed."
+    return "\n".join(lines)
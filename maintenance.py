@@ -0,0 +1,223 @@
+"""Routine database maintenance: planner statistics, free space, integrity.
+
+- analyze() refreshes the statistics the query planner picks indexes by.
+  Without them, plans chosen on a small database stay in place as tables
+  grow. PRAGMA analysis_limit keeps each table's ANALYZE to a sample of
+  rows, so it costs about the same on any size of database. Tables are
+  analyzed one by one rather than through PRAGMA optimize, which before
+  SQLite 3.46 only looks at tables the same connection has queried.
+- incremental_vacuum() hands free pages back to the file system a few at a
+  time. Deleting rows (archive.py moves whole years out) leaves them on the
+  free list otherwise. This needs auto_vacuum=INCREMENTAL, which migration
+  11 sets.
+- check() runs PRAGMA quick_check, or the slower integrity_check.
+
+Each step takes a time budget and stops cleanly once it runs out, so
+run_maintenance() can be called from a background thread while the TUI is
+in use. Vacuum steps take the write lock for one short transaction each.
+Set PYNVOICE_MAINTENANCE_INTERVAL (minutes) to have app.py run it
+periodically.
+"""
+
+import os
+import sqlite3
+import time
+
+from database import get_connection, transaction
+
+INTERVAL_ENV = "PYNVOICE_MAINTENANCE_INTERVAL"
+
+# Rows ANALYZE samples per index; SQLite suggests a few hundred to a thousand
+ANALYSIS_LIMIT = 1000
+
+# Pages freed per write transaction by incremental_vacuum()
+VACUUM_PAGES = 256
+
+# Seconds run_maintenance() spends in total by default
+DEFAULT_BUDGET = 5.0
+
+# SQLite virtual machine steps between deadline checks during check()
+_PROGRESS_STEPS = 10000
+
+_AUTO_VACUUM_INCREMENTAL = 2
+
+
+class MaintenanceResult:
+    """Outcome of a maintenance run; a step that did not run stays None"""
+
+    def __init__(self):
+        self.analyzed = None  # tables whose statistics were refreshed
+        self.pages_freed = None
+        self.free_pages = None  # still on the free list afterwards
+        self.problems = None  # [] when the check passed
+        self.complete = True  # False when a step ran out of time
+        self.seconds = 0.0
+
+    def __repr__(self):
+        return (
+            f"MaintenanceResult(analyzed={self.analyzed}, "
+            f"pages_freed={self.pages_freed}, problems={self.problems}, "
+            f"complete={self.complete}, seconds={self.seconds:.2f})"
+        )
+
+
+def _deadline(budget):
+    return None if budget is None else time.perf_counter() + budget
+
+
+def _expired(deadline):
+    return deadline is not None and time.perf_counter() >= deadline
+
+
+def _tables(conn):
+    return [
+        row[0]
+        for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name NOT LIKE 'sqlite_%' AND sql NOT LIKE 'CREATE VIRTUAL%' "
+            "ORDER BY name"
+        )
+    ]
+
+
+def analyze(budget=None):
+    """Refresh planner statistics table by table until budget runs out.
+
+    Tables whose statistics are missing go first. Returns the tables
+    analyzed and whether every table was reached.
+    """
+    deadline = _deadline(budget)
+    conn = get_connection()
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}").fetchall()
+    seen = set()
+    stat1 = "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+    if conn.execute(stat1).fetchone():
+        seen = {row[0] for row in conn.execute("SELECT tbl FROM sqlite_stat1")}
+    tables = sorted(_tables(conn), key=lambda table: table in seen)
+
+    analyzed = []
+    for table in tables:
+        if _expired(deadline):
+            return analyzed, False
+        with transaction() as c:
+            c.execute(f'ANALYZE "{table}"')
+        analyzed.append(table)
+    return analyzed, True
+
+
+def incremental_enabled():
+    """True when the database is in incremental auto-vacuum mode"""
+    mode = get_connection().execute("PRAGMA auto_vacuum").fetchone()[0]
+    return mode == _AUTO_VACUUM_INCREMENTAL
+
+
+def free_pages():
+    """Pages on the free list, which a vacuum would hand back"""
+    return get_connection().execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def incremental_vacuum(budget=None, pages=VACUUM_PAGES):
+    """Hand free pages back to the file system, `pages` per transaction.
+
+    Stops when the free list is empty or budget runs out, and returns
+    (pages freed, pages still free). Raises ValueError when the database is
+    not in incremental auto-vacuum mode, which full_vacuum() switches on.
+    """
+    deadline = _deadline(budget)
+    conn = get_connection()
+    if not incremental_enabled():
+        raise ValueError(
+            "Incremental vacuum is off for this database; run a full vacuum once"
+        )
+    freed = 0
+    remaining = free_pages()
+    while remaining and not _expired(deadline):
+        with transaction() as c:
+            # Each returned row is one page; the pragma stops early unless
+            # every row is stepped through
+            c.execute(f"PRAGMA incremental_vacuum({pages})").fetchall()
+        left = free_pages()
+        freed += remaining - left
+        remaining = left
+    if freed:
+        # The file only shrinks once the WAL is checkpointed; PASSIVE never
+        # waits for readers
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+    return freed, remaining
+
+
+def full_vacuum():
+    """Rebuild the whole file with VACUUM and switch on incremental mode.
+
+    Blocks every other connection until it finishes; meant for the command
+    line, not for the background.
+    """
+    conn = get_connection()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL").fetchall()
+    conn.execute("VACUUM")
+
+
+def check(full=False, budget=None):
+    """Run quick_check (or integrity_check when full) within budget.
+
+    Returns the problems found, [] when the database is sound, or None when
+    the check ran out of time before finishing.
+    """
+    deadline = _deadline(budget)
+    conn = get_connection()
+    if deadline is not None:
+        conn.set_progress_handler(lambda: _expired(deadline), _PROGRESS_STEPS)
+    try:
+        rows = conn.execute(
+            "PRAGMA integrity_check" if full else "PRAGMA quick_check"
+        ).fetchall()
+    except sqlite3.OperationalError as e:
+        if "interrupted" not in str(e):
+            raise
+        return None
+    finally:
+        conn.set_progress_handler(None, 0)
+    problems = [row[0] for row in rows]
+    return [] if problems == ["ok"] else problems
+
+
+def run_maintenance(
+    budget=DEFAULT_BUDGET,
+    analyze_stats=True,
+    vacuum=True,
+    integrity=True,
+    full_check=False,
+):
+    """Analyze, vacuum and check in turn, sharing one time budget.
+
+    budget=None lets every step run to the end. A step skipped because the
+    time ran out leaves its field None and complete False. Returns a
+    MaintenanceResult.
+    """
+    started = time.perf_counter()
+    deadline = _deadline(budget)
+    result = MaintenanceResult()
+
+    def left():
+        return None if deadline is None else max(deadline - time.perf_counter(), 0)
+
+    if analyze_stats:
+        result.analyzed, done = analyze(left())
+        result.complete = result.complete and done
+    if vacuum and incremental_enabled():
+        result.pages_freed, result.free_pages = incremental_vacuum(left())
+        result.complete = result.complete and not result.free_pages
+    if integrity:
+        if _expired(deadline):
+            result.complete = False
+        else:
+            result.problems = check(full_check, left())
+            result.complete = result.complete and result.problems is not None
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def interval_from_env():
+    """Seconds between background maintenance runs, or None when off"""
+    minutes = float(os.environ.get(INTERVAL_ENV) or 0)
+    return minutes * 60 if minutes > 0 else None
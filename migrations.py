@@ -0,0 +1,622 @@
+"""Versioned schema migrations.
+
+The schema version lives in ``PRAGMA user_version``. ``migrate`` reads it
+once and returns straight away when the database is current; otherwise every
+pending migration runs, in order, inside a single transaction together with
+the version bump, so a failed upgrade leaves the database untouched.
+
+To change the schema, append a ``(version, description, function)`` entry to
+``MIGRATIONS``. Never edit a migration that has already shipped. A function
+that returns ``VACUUM`` asks for the database to be rebuilt once the
+transaction has committed, for settings such as ``auto_vacuum`` that only a
+VACUUM applies to an existing file.
+
+Migrations and the queries they enable use ``ALTER TABLE ... DROP COLUMN``
+and ``RETURNING`` (SQLite 3.35) and ``UPDATE ... FROM`` (3.33), so
+``migrate`` refuses to start on an SQLite older than MIN_SQLITE_VERSION
+rather than failing halfway through an upgrade.
+"""
+
+import sqlite3
+
+from money import MINOR_UNITS, QUANTITY_SCALE
+
+# Returned by a migration that needs a VACUUM after it has committed
+VACUUM = "vacuum"
+
+# Oldest SQLite library the schema and its queries work with
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+
+def _columns(c, table):
+    return {row[1] for row in c.execute(f"PRAGMA table_info({table})")}
+
+
+def _baseline_schema(c):
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sender (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            address TEXT,
+            email TEXT,
+            phone TEXT
+        )
+    """
+    )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS client (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            address TEXT,
+            email TEXT
+        )
+    """
+    )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS footer_message (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message TEXT NOT NULL
+        )
+    """
+    )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS invoice (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_id TEXT NOT NULL,
+            client_id TEXT NOT NULL,
+            footer_message_id INTEGER,
+            paid BOOLEAN DEFAULT FALSE,
+            date_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sender_id) REFERENCES sender (id),
+            FOREIGN KEY (client_id) REFERENCES client (id),
+            FOREIGN KEY (footer_message_id) REFERENCES footer_message (id)
+        )
+    """
+    )
+
+    # Databases created before the paid flag existed need the column added
+    if "paid" not in _columns(c, "invoice"):
+        c.execute("ALTER TABLE invoice ADD COLUMN paid BOOLEAN DEFAULT FALSE")
+
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS invoice_item (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            invoice_id INTEGER NOT NULL,
+            item_name TEXT NOT NULL,
+            amount REAL NOT NULL,
+            cost_per_unit REAL NOT NULL,
+            FOREIGN KEY (invoice_id) REFERENCES invoice (id)
+        )
+    """
+    )
+
+
+def _add_secondary_indexes(c):
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_invoice_item_invoice_id "
+        "ON invoice_item (invoice_id)"
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_invoice_date_created "
+        "ON invoice (date_created)"
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_invoice_client_id ON invoice (client_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_invoice_sender_id ON invoice (sender_id)")
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_invoice_paid_date_created "
+        "ON invoice (paid, date_created)"
+    )
+
+
+def _add_external_keys(c):
+    # Identifiers from other systems, used by the importer to upsert rows
+    for table in ("sender", "client", "invoice"):
+        if "external_key" not in _columns(c, table):
+            c.execute(f"ALTER TABLE {table} ADD COLUMN external_key TEXT")
+        c.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_external_key "
+            f"ON {table} (external_key)"
+        )
+
+
+def _add_name_indexes(c):
+    # Keyset pagination walks senders and clients in (name, id) order
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sender_name ON sender (name, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_client_name ON client (name, id)")
+
+
+def _add_invoice_totals(c):
+    # Stored totals let lists and reports show amounts without reading items;
+    # the triggers below keep them in step with every item change
+    for column in (
+        "subtotal NUMERIC NOT NULL DEFAULT 0",
+        "item_count INTEGER NOT NULL DEFAULT 0",
+        "grand_total NUMERIC NOT NULL DEFAULT 0",
+    ):
+        if column.split()[0] not in _columns(c, "invoice"):
+            c.execute(f"ALTER TABLE invoice ADD COLUMN {column}")
+
+    c.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS invoice_item_totals_insert
+        AFTER INSERT ON invoice_item
+        BEGIN
+            UPDATE invoice SET
+                item_count = item_count + 1,
+                subtotal = subtotal + NEW.amount * NEW.cost_per_unit,
+                grand_total = grand_total + NEW.amount * NEW.cost_per_unit
+            WHERE id = NEW.invoice_id;
+        END
+    """
+    )
+    c.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS invoice_item_totals_delete
+        AFTER DELETE ON invoice_item
+        BEGIN
+            UPDATE invoice SET
+                item_count = item_count - 1,
+                subtotal = subtotal - OLD.amount * OLD.cost_per_unit,
+                grand_total = grand_total - OLD.amount * OLD.cost_per_unit
+            WHERE id = OLD.invoice_id;
+        END
+    """
+    )
+    c.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS invoice_item_totals_update
+        AFTER UPDATE OF invoice_id, amount, cost_per_unit ON invoice_item
+        BEGIN
+            UPDATE invoice SET
+                item_count = item_count - 1,
+                subtotal = subtotal - OLD.amount * OLD.cost_per_unit,
+                grand_total = grand_total - OLD.amount * OLD.cost_per_unit
+            WHERE id = OLD.invoice_id;
+            UPDATE invoice SET
+                item_count = item_count + 1,
+                subtotal = subtotal + NEW.amount * NEW.cost_per_unit,
+                grand_total = grand_total + NEW.amount * NEW.cost_per_unit
+            WHERE id = NEW.invoice_id;
+        END
+    """
+    )
+
+    # Backfill totals for invoices that already have items
+    c.execute(
+        """
+        UPDATE invoice SET
+            subtotal = t.subtotal,
+            grand_total = t.subtotal,
+            item_count = t.item_count
+        FROM (
+            SELECT invoice_id,
+                   SUM(amount * cost_per_unit) AS subtotal,
+                   COUNT(*) AS item_count
+            FROM invoice_item
+            GROUP BY invoice_id
+        ) AS t
+        WHERE invoice.id = t.invoice_id
+    """
+    )
+
+
+def _create_totals_triggers(c):
+    # Totals move by each item's integer line_total, so they stay exact
+    c.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS invoice_item_totals_insert
+        AFTER INSERT ON invoice_item
+        BEGIN
+            UPDATE invoice SET
+                item_count = item_count + 1,
+                subtotal = subtotal + NEW.line_total,
+                grand_total = grand_total + NEW.line_total
+            WHERE id = NEW.invoice_id;
+        END
+    """
+    )
+    c.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS invoice_item_totals_delete
+        AFTER DELETE ON invoice_item
+        BEGIN
+            UPDATE invoice SET
+                item_count = item_count - 1,
+                subtotal = subtotal - OLD.line_total,
+                grand_total = grand_total - OLD.line_total
+            WHERE id = OLD.invoice_id;
+        END
+    """
+    )
+    c.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS invoice_item_totals_update
+        AFTER UPDATE OF invoice_id, quantity, unit_price ON invoice_item
+        BEGIN
+            UPDATE invoice SET
+                item_count = item_count - 1,
+                subtotal = subtotal - OLD.line_total,
+                grand_total = grand_total - OLD.line_total
+            WHERE id = OLD.invoice_id;
+            UPDATE invoice SET
+                item_count = item_count + 1,
+                subtotal = subtotal + NEW.line_total,
+                grand_total = grand_total + NEW.line_total
+            WHERE id = NEW.invoice_id;
+        END
+    """
+    )
+
+
+def _integer_money(c):
+    # REAL amount/cost_per_unit become integer quantity (scaled by
+    # QUANTITY_SCALE) and unit_price (cents); invoice totals become cents
+    for trigger in ("insert", "delete", "update"):
+        c.execute(f"DROP TRIGGER IF EXISTS invoice_item_totals_{trigger}")
+
+    c.execute("ALTER TABLE invoice_item ADD COLUMN quantity INTEGER NOT NULL DEFAULT 0")
+    c.execute(
+        "ALTER TABLE invoice_item ADD COLUMN unit_price INTEGER NOT NULL DEFAULT 0"
+    )
+    c.execute(
+        """
+        UPDATE invoice_item SET
+            quantity = CAST(ROUND(amount * ?) AS INTEGER),
+            unit_price = CAST(ROUND(cost_per_unit * ?) AS INTEGER)
+    """,
+        (QUANTITY_SCALE, MINOR_UNITS),
+    )
+    c.execute("ALTER TABLE invoice_item DROP COLUMN amount")
+    c.execute("ALTER TABLE invoice_item DROP COLUMN cost_per_unit")
+    c.execute(
+        f"""
+        ALTER TABLE invoice_item ADD COLUMN line_total INTEGER
+        GENERATED ALWAYS AS (
+            (quantity * unit_price + {QUANTITY_SCALE // 2}) / {QUANTITY_SCALE}
+        ) VIRTUAL
+    """
+    )
+
+    c.execute("UPDATE invoice SET subtotal = 0, grand_total = 0, item_count = 0")
+    c.execute(
+        """
+        UPDATE invoice SET
+            subtotal = t.subtotal,
+            grand_total = t.subtotal,
+            item_count = t.item_count
+        FROM (
+            SELECT invoice_id, SUM(line_total) AS subtotal, COUNT(*) AS item_count
+            FROM invoice_item
+            GROUP BY invoice_id
+        ) AS t
+        WHERE invoice.id = t.invoice_id
+    """
+    )
+    _create_totals_triggers(c)
+
+
+# Tables whose writes bump change_counter. Item edits need no counter of
+# their own: the totals triggers update the invoice row, which bumps invoice.
+CHANGE_TRACKED_TABLES = ("sender", "client", "footer_message", "invoice")
+
+
+def _create_change_triggers(c, table):
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        c.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_changed_{event.lower()}
+            AFTER {event} ON {table}
+            BEGIN
+                UPDATE change_counter SET version = version + 1
+                WHERE table_name = '{table}';
+            END
+        """
+        )
+
+
+def _add_change_counters(c):
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS change_counter (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """
+    )
+    for table in CHANGE_TRACKED_TABLES:
+        c.execute(
+            "INSERT OR IGNORE INTO change_counter (table_name) VALUES (?)", (table,)
+        )
+        _create_change_triggers(c, table)
+
+
+# Full-text indexes: (index, content table, rowid column, indexed columns).
+# They are external-content tables, so the text is stored only once.
+SEARCH_INDEXES = (
+    ("client_fts", "client", "rowid", ("name", "address", "email")),
+    ("sender_fts", "sender", "rowid", ("name", "address", "email", "phone")),
+    ("footer_message_fts", "footer_message", "id", ("message",)),
+    ("invoice_item_fts", "invoice_item", "id", ("item_name",)),
+)
+
+
+def _create_search_index(c, index, table, rowid, columns):
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"NEW.{col}" for col in columns)
+    old_values = ", ".join(f"OLD.{col}" for col in columns)
+    # No prefix= indexes: prefix queries were about as fast without them,
+    # and they made every indexed insert markedly slower
+    c.execute(
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+            {column_list},
+            content='{table}',
+            content_rowid='{rowid}',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """
+    )
+    c.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO {index} (rowid, {column_list})
+            VALUES (NEW.{rowid}, {new_values});
+        END
+    """
+    )
+    c.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO {index} ({index}, rowid, {column_list})
+            VALUES ('delete', OLD.{rowid}, {old_values});
+        END
+    """
+    )
+    c.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {index}_update
+        AFTER UPDATE OF {column_list} ON {table}
+        BEGIN
+            INSERT INTO {index} ({index}, rowid, {column_list})
+            VALUES ('delete', OLD.{rowid}, {old_values});
+            INSERT INTO {index} (rowid, {column_list})
+            VALUES (NEW.{rowid}, {new_values});
+        END
+    """
+    )
+    c.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+
+
+def _add_search_indexes(c):
+    for index, table, rowid, columns in SEARCH_INDEXES:
+        _create_search_index(c, index, table, rowid, columns)
+
+
+def _add_report_indexes(c):
+    # Reports group by the leading column and filter on paid and date_created;
+    # carrying the totals lets them read only the index. The new indexes start
+    # with the same columns as the ones they replace, so lookups by client,
+    # sender or paid status still use them.
+    columns = "paid, date_created, item_count, grand_total"
+    c.execute("DROP INDEX IF EXISTS idx_invoice_client_id")
+    c.execute("DROP INDEX IF EXISTS idx_invoice_sender_id")
+    c.execute("DROP INDEX IF EXISTS idx_invoice_paid_date_created")
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_invoice_client_report "
+        f"ON invoice (client_id, {columns})"
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_invoice_sender_report "
+        f"ON invoice (sender_id, {columns})"
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_invoice_paid_report "
+        f"ON invoice ({columns})"
+    )
+
+
+# A random version 4 UUID, so rows inserted by other tools still get one
+_UUID_DEFAULT = (
+    "lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-4' || "
+    "substr(hex(randomblob(2)), 2) || '-' || "
+    "substr('89ab', 1 + (abs(random()) % 4), 1) || "
+    "substr(hex(randomblob(2)), 2) || '-' || hex(randomblob(6)))"
+)
+
+_CONTACT_COLUMNS = {
+    "sender": ("name", "address", "email", "phone", "external_key"),
+    "client": ("name", "address", "email", "external_key"),
+}
+
+
+def _integer_contact_keys(c):
+    # Senders and clients move from UUID text keys to INTEGER PRIMARY KEYs,
+    # so every invoice row and invoice index stores a small integer instead of
+    # 36 characters. The UUID stays on as an indexed uuid column. Tables are
+    # rebuilt (create, copy, drop, rename), which drops their triggers; those
+    # and the totals triggers that point at invoice are recreated at the end.
+    for trigger in ("insert", "delete", "update"):
+        c.execute(f"DROP TRIGGER IF EXISTS invoice_item_totals_{trigger}")
+
+    for table, columns in _CONTACT_COLUMNS.items():
+        column_list = ", ".join(columns)
+        c.execute(
+            f"""
+            CREATE TABLE {table}_new (
+                id INTEGER PRIMARY KEY,
+                uuid TEXT NOT NULL DEFAULT ({_UUID_DEFAULT}),
+                name TEXT NOT NULL,
+                address TEXT,
+                email TEXT,
+                {"phone TEXT," if "phone" in columns else ""}
+                external_key TEXT
+            )
+        """
+        )
+        c.execute(
+            f"INSERT INTO {table}_new (uuid, {column_list}) "
+            f"SELECT id, {column_list} FROM {table} ORDER BY rowid"
+        )
+        # Invoices pointing at a contact that no longer exists keep their
+        # reference through a placeholder instead of being dropped
+        c.execute(
+            f"""
+            INSERT INTO {table}_new (uuid, name)
+            SELECT DISTINCT {table}_id, 'Missing {table}' FROM invoice
+            WHERE {table}_id NOT IN (SELECT id FROM {table})
+        """
+        )
+        c.execute(f"DROP TABLE {table}")
+        c.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+        c.execute(f"CREATE UNIQUE INDEX idx_{table}_uuid ON {table} (uuid)")
+        c.execute(
+            f"CREATE UNIQUE INDEX idx_{table}_external_key ON {table} (external_key)"
+        )
+        c.execute(f"CREATE INDEX idx_{table}_name ON {table} (name, id)")
+        _create_change_triggers(c, table)
+
+    c.execute(
+        """
+        CREATE TABLE invoice_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_id INTEGER NOT NULL,
+            client_id INTEGER NOT NULL,
+            footer_message_id INTEGER,
+            paid BOOLEAN DEFAULT FALSE,
+            date_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            external_key TEXT,
+            subtotal NUMERIC NOT NULL DEFAULT 0,
+            item_count INTEGER NOT NULL DEFAULT 0,
+            grand_total NUMERIC NOT NULL DEFAULT 0,
+            FOREIGN KEY (sender_id) REFERENCES sender (id),
+            FOREIGN KEY (client_id) REFERENCES client (id),
+            FOREIGN KEY (footer_message_id) REFERENCES footer_message (id)
+        )
+    """
+    )
+    c.execute(
+        """
+        INSERT INTO invoice_new (
+            id, sender_id, client_id, footer_message_id, paid, date_created,
+            external_key, subtotal, item_count, grand_total
+        )
+        SELECT i.id, s.id, cl.id, i.footer_message_id, i.paid, i.date_created,
+               i.external_key, i.subtotal, i.item_count, i.grand_total
+        FROM invoice i
+        JOIN sender s ON s.uuid = i.sender_id
+        JOIN client cl ON cl.uuid = i.client_id
+        ORDER BY i.id
+    """
+    )
+    # Dropping the table forgets its AUTOINCREMENT high-water mark
+    sequence = c.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'invoice'"
+    ).fetchone()
+    c.execute("DROP TABLE invoice")
+    c.execute("ALTER TABLE invoice_new RENAME TO invoice")
+    if sequence is not None:
+        c.execute(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT 'invoice', 0 "
+            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'invoice')"
+        )
+        c.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'invoice'",
+            sequence,
+        )
+    c.execute("CREATE INDEX idx_invoice_date_created ON invoice (date_created)")
+    c.execute(
+        "CREATE UNIQUE INDEX idx_invoice_external_key ON invoice (external_key)"
+    )
+    _add_report_indexes(c)
+    _create_change_triggers(c, "invoice")
+    _create_totals_triggers(c)
+
+    # The contact search indexes are keyed by rowid, which has changed
+    for index, table, rowid, columns in SEARCH_INDEXES:
+        if table in _CONTACT_COLUMNS:
+            _create_search_index(c, index, table, rowid, columns)
+
+
+def _incremental_auto_vacuum(c):
+    # Lets maintenance.incremental_vacuum() hand free pages back to the file
+    # system a few at a time. The mode is only written by the VACUUM that
+    # migrate() runs after the commit, since it cannot run in a transaction
+    c.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    return VACUUM
+
+
+MIGRATIONS = [
+    (1, "Baseline schema", _baseline_schema),
+    (2, "Secondary indexes for items, invoice dates and foreign keys", _add_secondary_indexes),
+    (3, "External keys for imported senders, clients and invoices", _add_external_keys),
+    (4, "Name indexes for paging through senders and clients", _add_name_indexes),
+    (5, "Stored invoice totals maintained by triggers", _add_invoice_totals),
+    (6, "Integer cents and scaled quantities instead of REAL", _integer_money),
+    (7, "Per-table change counters maintained by triggers", _add_change_counters),
+    (8, "FTS5 search over clients, senders, footer messages and items", _add_search_indexes),
+    (9, "Covering indexes for revenue reports", _add_report_indexes),
+    (10, "Integer keys for senders and clients, UUIDs kept in a column", _integer_contact_keys),
+    (11, "Incremental auto-vacuum", _incremental_auto_vacuum),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """Return the schema version recorded in the database"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def check_sqlite_version():
+    """Raise sqlite3.NotSupportedError when SQLite is older than required"""
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        required = ".".join(map(str, MIN_SQLITE_VERSION))
+        raise sqlite3.NotSupportedError(
+            f"pynvoice needs SQLite {required} or newer, but Python is using "
+            f"SQLite {sqlite3.sqlite_version}; upgrade Python or its SQLite "
+            "library"
+        )
+
+
+def migrate(conn, target=None):
+    """Apply pending migrations and return the versions that were applied.
+
+    target stops the upgrade at an earlier version; it defaults to the
+    latest one. Raises sqlite3.NotSupportedError on an SQLite older than
+    MIN_SQLITE_VERSION.
+    """
+    check_sqlite_version()
+    target = SCHEMA_VERSION if target is None else target
+    if get_schema_version(conn) >= target:
+        return []
+
+    conn.execute("BEGIN IMMEDIATE")
+    c = conn.cursor()
+    try:
+        # Another process may have migrated while we waited for the lock
+        current = get_schema_version(conn)
+        applied = []
+        vacuum = False
+        for version, _description, upgrade in MIGRATIONS:
+            if current < version <= target:
+                vacuum = upgrade(c) == VACUUM or vacuum
+                applied.append(version)
+        if applied:
+            c.execute(f"PRAGMA user_version = {applied[-1]}")
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+    finally:
+        c.close()
+    if vacuum:
+        conn.execute("VACUUM")
+    return applied
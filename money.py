@@ -0,0 +1,71 @@
+"""Exact money and quantity arithmetic.
+
+Prices and totals are stored as integers in minor units (cents) and item
+quantities as integers scaled by QUANTITY_SCALE, so sums computed by SQLite
+are exact and never need re-rounding. Values cross the public API as Decimal.
+
+QUANTITY_SCALE is baked into the stored quantities and the invoice_item
+line_total column; changing it for an existing database needs a migration.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+# Minor units per currency unit (cents per dollar)
+MINOR_UNITS = 100
+
+# Quantities keep three decimal places, e.g. 1.25 hours is stored as 1250
+QUANTITY_SCALE = 1000
+
+_CENT = Decimal(1) / MINOR_UNITS
+
+
+def _to_scaled(value, scale, what):
+    if value is None or isinstance(value, bool):
+        raise ValueError(f"Invalid {what}: {value!r}")
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid {what}: {value!r}") from None
+    if not number.is_finite():
+        raise ValueError(f"Invalid {what}: {value!r}")
+    return int((number * scale).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_minor(value):
+    """Convert a currency amount (float, str, int or Decimal) to integer cents"""
+    return _to_scaled(value, MINOR_UNITS, "money amount")
+
+
+def from_minor(value):
+    """Convert integer cents back to a Decimal currency amount"""
+    return (Decimal(value) / MINOR_UNITS).quantize(_CENT)
+
+
+def to_scaled_quantity(value):
+    """Convert a quantity to its stored integer form"""
+    return _to_scaled(value, QUANTITY_SCALE, "quantity")
+
+
+def from_scaled_quantity(value):
+    """Convert a stored integer quantity back to a Decimal"""
+    return Decimal(value) / QUANTITY_SCALE
+
+
+def line_total_minor(quantity, unit_price):
+    """Line total in cents from a stored quantity and unit price, rounded half up.
+
+    Matches the generated invoice_item.line_total column exactly.
+    """
+    return (quantity * unit_price + QUANTITY_SCALE // 2) // QUANTITY_SCALE
+
+
+def line_total(amount, cost_per_unit):
+    """Line total as a Decimal, rounded to the cent the same way the database does"""
+    return from_minor(
+        line_total_minor(to_scaled_quantity(amount), to_minor(cost_per_unit))
+    )
+
+
+def format_quantity(value):
+    """Render a quantity without trailing zeros, e.g. 2 or 1.25"""
+    return f"{Decimal(str(value)).normalize():f}"
@@ -2,9 +2,9 @@ from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from datetime import datetime
+import os
 
-# import os
-from database import get_invoice_data
+from database import get_invoice_data, get_invoice_data_many
 from pdf_styles import get_custom_styles, get_table_styles, LAYOUT
 
 
@@ -21,25 +21,31 @@ def generate_invoice_pdf(invoice_id, output_filename=None):
     if not invoice_data:
         raise ValueError(f"Invoice with ID {invoice_id} not found")
 
-    # Extract data from database result - updated structure includes paid field
-    # Structure: (invoice_id, date_created, paid, sender_name, sender_address, sender_email, sender_phone,
-    #            client_name, client_address, client_email, footer_message, sender_id, client_id, footer_message_id)
-    (
-        invoice_id,
-        date_created,
-        paid,
-        sender_name,
-        sender_address,
-        sender_email,
-        sender_phone,
-        client_name,
-        client_address,
-        client_email,
-        footer_message,
-        sender_id,
-        client_id,
-        footer_message_id,
-    ) = invoice_data
+    return build_invoice_pdf(invoice_data, items, output_filename)
+
+
+def generate_invoice_pdfs(invoice_ids, output_dir="."):
+    """
+    Generate one PDF per invoice for a batch of invoice IDs.
+    Invoice data is loaded with get_invoice_data_many, so the database cost
+    stays constant however many invoices are exported.
+    Returns a dict mapping each found invoice ID to its output filename.
+    """
+    generated = {}
+    for invoice_id, (invoice_data, items) in get_invoice_data_many(invoice_ids).items():
+        output_filename = os.path.join(output_dir, f"invoice_{invoice_id}.pdf")
+        generated[invoice_id] = build_invoice_pdf(invoice_data, items, output_filename)
+    return generated
+
+
+def build_invoice_pdf(invoice_data, items, output_filename=None):
+    """Render an Invoice record and its InvoiceItems to a PDF file"""
+
+    invoice_id = invoice_data.id
+    date_created = invoice_data.date_created
+    sender_address = invoice_data.sender_address
+    client_address = invoice_data.client_address
+    footer_message = invoice_data.footer_message
 
     # Set up output filename
     if not output_filename:
@@ -96,15 +102,15 @@ def generate_invoice_pdf(invoice_id, output_filename=None):
     )
 
     sender_info = f"""<b>From:</b><br/>
-    <b>{sender_name or "N/A"}</b><br/>
+    <b>{invoice_data.sender_name or "N/A"}</b><br/>
     {sender_address_formatted}<br/>
-    {sender_email or ""}<br/>
-    {sender_phone or ""}"""
+    {invoice_data.sender_email or ""}<br/>
+    {invoice_data.sender_phone or ""}"""
 
     client_info = f"""<b>To:</b><br/>
-    <b>{client_name or "N/A"}</b><br/>
+    <b>{invoice_data.client_name or "N/A"}</b><br/>
     {client_address_formatted}<br/>
-    {client_email or ""}"""
+    {invoice_data.client_email or ""}"""
 
     contact_data = [
         [
@@ -130,18 +136,18 @@ def generate_invoice_pdf(invoice_id, output_filename=None):
     item_data = [["Description", "Quantity", "Unit Price", "Total"]]
 
     # Calculate totals as per FR5.1 and FR5.2
+    # Line totals are rounded to the cent exactly as the database stores them
     subtotal = 0
     for item in items:
-        item_name, amount, cost_per_unit = item
-        line_total = amount * cost_per_unit
-        subtotal += line_total
+        item_total = item.line_total
+        subtotal += item_total
 
         item_data.append(
             [
-                item_name,
-                f"{amount:,.2f}",
-                f"${cost_per_unit:,.2f}",
-                f"${line_total:,.2f}",
+                item.item_name,
+                f"{item.amount:,.2f}",
+                f"${item.cost_per_unit:,.2f}",
+                f"${item_total:,.2f}",
             ]
         )
 
@@ -0,0 +1,147 @@
+"""Row types returned by database.py.
+
+Records use __slots__, so each one costs about as much memory as a tuple while
+giving named access (``invoice.client_name``). They also index, unpack and
+compare like the tuples the database layer used to return, so positional
+callers keep working.
+"""
+
+from money import line_total
+
+
+class Record:
+    """Base class for slotted rows; subclasses only declare __slots__"""
+
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Generate a plain positional __init__, as namedtuple and dataclasses
+        # do, instead of looping over setattr for every row
+        fields = cls.__slots__
+        body = "\n".join(f"    self.{name} = {name}" for name in fields)
+        namespace = {}
+        exec(f"def __init__(self, {', '.join(fields)}):\n{body}\n", namespace)
+        cls.__init__ = namespace["__init__"]
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """sqlite3 row_factory building this record from a result row"""
+        return cls(*row)
+
+    def __iter__(self):
+        for name in self.__slots__:
+            yield getattr(self, name)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self)[index]
+        return getattr(self, self.__slots__[index])
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return type(self) is type(other) and tuple(self) == tuple(other)
+        if isinstance(other, tuple):
+            return tuple(self) == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Sender(Record):
+    __slots__ = ("id", "name", "address", "email", "phone")
+
+
+class Client(Record):
+    __slots__ = ("id", "name", "address", "email")
+
+
+class FooterMessage(Record):
+    __slots__ = ("id", "message")
+
+
+class InvoiceSummary(Record):
+    """One row of the invoice list"""
+
+    __slots__ = (
+        "id",
+        "sender_name",
+        "client_name",
+        "date_created",
+        "paid",
+        "item_count",
+        "grand_total",
+    )
+
+
+class Invoice(Record):
+    """Invoice header with sender, client and footer details"""
+
+    __slots__ = (
+        "id",
+        "date_created",
+        "paid",
+        "sender_name",
+        "sender_address",
+        "sender_email",
+        "sender_phone",
+        "client_name",
+        "client_address",
+        "client_email",
+        "footer_message",
+        "sender_id",
+        "client_id",
+        "footer_message_id",
+    )
+
+
+class InvoiceItem(Record):
+    __slots__ = ("item_name", "amount", "cost_per_unit")
+
+    @property
+    def line_total(self):
+        """Amount times unit price, rounded to the cent like the database"""
+        return line_total(self.amount, self.cost_per_unit)
+
+
+class SearchResult(Record):
+    """One search hit; for items, id is the invoice the item belongs to"""
+
+    __slots__ = ("kind", "id", "title", "detail", "rank")
+
+
+class RevenueRow(Record):
+    """One group of a revenue report; total is a Decimal"""
+
+    __slots__ = ("key", "label", "invoices", "items", "total")
+
+
+class AgingRow(Record):
+    """Outstanding amounts for one client by age; money fields are Decimal.
+
+    share is the client's fraction of everything outstanding.
+    """
+
+    __slots__ = (
+        "client_id",
+        "client",
+        "invoices",
+        "current",
+        "days_30",
+        "days_60",
+        "days_90",
+        "total",
+        "oldest_days",
+        "share",
+    )
@@ -0,0 +1,268 @@
+"""Revenue reports computed in SQL.
+
+Totals come from the item_count and grand_total columns that triggers keep
+current on every invoice, so each report is a single GROUP BY over the
+invoice table no matter how many line items there are. Results are cached
+per report and arguments, and reused until change_token() shows a write to
+invoices, senders or clients.
+
+The revenue reports take the same optional filters: paid (True/False) and
+a start/end date range on date_created, given as "YYYY-MM-DD" strings; start
+is inclusive and end exclusive. With include_archive they also cover the
+invoices archive.py has moved out of the main database. aging_report()
+buckets unpaid invoices by how many days they have been outstanding; paid
+invoices are the only ones ever archived, so it never needs the archive.
+"""
+
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+import database
+from database import ARCHIVE_SCHEMA, attach_archive, change_token, get_connection
+from money import from_minor
+from records import AgingRow, RevenueRow
+
+# Invoice writes move the totals; sender and client renames move the labels
+WATCHED_TABLES = ("invoice", "sender", "client")
+
+# Invoices of both files; archiving deletes from invoice, so the change token
+# still moves whenever the archive grows. An archive run interrupted between
+# its copy and its delete leaves an invoice in both; the live row counts
+_REPORT_COLUMNS = "sender_id, client_id, paid, date_created, item_count, grand_total"
+_WITH_ARCHIVE = f"""(
+    SELECT {_REPORT_COLUMNS} FROM main.invoice
+    UNION ALL
+    SELECT {_REPORT_COLUMNS} FROM {ARCHIVE_SCHEMA}.invoice
+    WHERE id NOT IN (SELECT id FROM main.invoice)
+)"""
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _filters(paid=None, start=None, end=None):
+    # The unary + keeps the planner from searching a narrower index on the
+    # filter column; scanning the covering index for the grouped column and
+    # skipping rows is much cheaper than looking each row up in the table
+    clauses, params = [], []
+    if paid is not None:
+        clauses.append("+paid = ?")
+        params.append(bool(paid))
+    if start is not None:
+        clauses.append("+date_created >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("+date_created < ?")
+        params.append(end)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def _source(include_archive):
+    """The invoice table, or it and the archive's when asked for and present"""
+    if include_archive and attach_archive():
+        return _WITH_ARCHIVE
+    return "invoice"
+
+
+def _revenue_row(cursor, row):
+    key, label, invoices, items, total = row
+    return RevenueRow(key, label, invoices, items or 0, from_minor(total or 0))
+
+
+def _cached(name, args, compute):
+    """Return compute()'s rows, reusing them while the data is unchanged"""
+    token = change_token(*WATCHED_TABLES)
+    key = (database.DB_FILE, name) + args
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == token:
+            return list(entry[1])
+    rows = compute()
+    with _cache_lock:
+        _cache[key] = (token, tuple(rows))
+    return list(rows)
+
+
+def clear_cache():
+    """Forget every cached report"""
+    with _cache_lock:
+        _cache.clear()
+
+
+def _run(sql, params):
+    c = get_connection().cursor()
+    c.row_factory = _revenue_row
+    rows = c.execute(sql, params).fetchall()
+    c.close()
+    return rows
+
+
+def _revenue_by_contact(table, column, paid, start, end, include_archive):
+    where, params = _filters(paid, start, end)
+    return _run(
+        f"""
+        SELECT t.{column}, COALESCE(x.name, '(unknown)'), t.invoices, t.items, t.total
+        FROM (
+            SELECT {column},
+                   COUNT(*) AS invoices,
+                   SUM(item_count) AS items,
+                   SUM(grand_total) AS total
+            FROM {_source(include_archive)}
+            {where}
+            GROUP BY {column}
+        ) AS t
+        LEFT JOIN {table} x ON x.id = t.{column}
+        ORDER BY t.total DESC, x.name
+    """,
+        params,
+    )
+
+
+def revenue_by_client(paid=None, start=None, end=None, include_archive=False):
+    """Invoice count, item count and revenue per client, largest first"""
+    return _cached(
+        "client",
+        (paid, start, end, include_archive),
+        lambda: _revenue_by_contact(
+            "client", "client_id", paid, start, end, include_archive
+        ),
+    )
+
+
+def revenue_by_sender(paid=None, start=None, end=None, include_archive=False):
+    """Invoice count, item count and revenue per sender, largest first"""
+    return _cached(
+        "sender",
+        (paid, start, end, include_archive),
+        lambda: _revenue_by_contact(
+            "sender", "sender_id", paid, start, end, include_archive
+        ),
+    )
+
+
+def revenue_by_month(paid=None, start=None, end=None, include_archive=False):
+    """Revenue per calendar month ("YYYY-MM"), oldest first"""
+    where, params = _filters(paid, start, end)
+    return _cached(
+        "month",
+        (paid, start, end, include_archive),
+        lambda: _run(
+            f"""
+            SELECT substr(date_created, 1, 7) AS month, substr(date_created, 1, 7),
+                   COUNT(*), SUM(item_count), SUM(grand_total)
+            FROM {_source(include_archive)}
+            {where}
+            GROUP BY month
+            ORDER BY month
+        """,
+            params,
+        ),
+    )
+
+
+def paid_summary(start=None, end=None, include_archive=False):
+    """Totals for paid and unpaid invoices; both rows are always present"""
+
+    def compute():
+        where, params = _filters(None, start, end)
+        rows = _run(
+            f"""
+            SELECT paid, NULL, COUNT(*), SUM(item_count), SUM(grand_total)
+            FROM {_source(include_archive)}
+            {where}
+            GROUP BY paid
+        """,
+            params,
+        )
+        found = {bool(row.key): row for row in rows}
+        return [
+            RevenueRow(
+                paid,
+                "Paid" if paid else "Unpaid",
+                found[paid].invoices if paid in found else 0,
+                found[paid].items if paid in found else 0,
+                found[paid].total if paid in found else from_minor(0),
+            )
+            for paid in (True, False)
+        ]
+
+    return _cached("paid", (start, end, include_archive), compute)
+
+
+# Lower bound in days of each aging bucket after "current"
+AGING_BUCKETS = (30, 60, 90)
+
+
+def _aging_row(cursor, row):
+    client_id, client, invoices, *amounts, oldest_days, share = row
+    return AgingRow(
+        client_id,
+        client,
+        invoices,
+        *(from_minor(amount) for amount in amounts),
+        oldest_days,
+        share,
+    )
+
+
+def aging_report(as_of=None):
+    """Unpaid totals per client, split into current, 30, 60 and 90+ days.
+
+    Age is counted in whole days from the invoice date to as_of ("YYYY-MM-DD",
+    default today in UTC, matching the stored timestamps); invoices dated
+    after as_of are left out. Clients with the most 90+ day debt come first.
+    """
+    if as_of is None:
+        as_of = datetime.now(timezone.utc).date().isoformat()
+    day = date.fromisoformat(as_of)
+    # An invoice is younger than n days when its date is on or after this;
+    # plain string comparisons keep the per-row work low
+    cutoff_30, cutoff_60, cutoff_90 = (
+        (day - timedelta(days=n - 1)).isoformat() for n in AGING_BUCKETS
+    )
+    until = (day + timedelta(days=1)).isoformat()
+
+    def compute():
+        c = get_connection().cursor()
+        c.row_factory = _aging_row
+        # One pass over the client report index; the window adds each client's
+        # share of the book without a second query
+        rows = c.execute(
+            """
+            SELECT t.client_id, COALESCE(x.name, '(unknown)'), t.invoices,
+                   t.current, t.days_30, t.days_60, t.days_90, t.total,
+                   CAST(julianday(:as_of) - julianday(date(t.oldest)) AS INTEGER),
+                   COALESCE(t.total * 1.0 / NULLIF(SUM(t.total) OVER (), 0), 0)
+            FROM (
+                SELECT client_id,
+                       COUNT(*) AS invoices,
+                       SUM(CASE WHEN date_created < :c30 THEN 0
+                                ELSE grand_total END) AS current,
+                       SUM(CASE WHEN date_created < :c30 AND date_created >= :c60
+                                THEN grand_total ELSE 0 END) AS days_30,
+                       SUM(CASE WHEN date_created < :c60 AND date_created >= :c90
+                                THEN grand_total ELSE 0 END) AS days_60,
+                       SUM(CASE WHEN date_created < :c90
+                                THEN grand_total ELSE 0 END) AS days_90,
+                       SUM(grand_total) AS total,
+                       MIN(date_created) AS oldest
+                FROM invoice
+                WHERE +paid = 0 AND +date_created < :until
+                GROUP BY client_id
+            ) AS t
+            LEFT JOIN client x ON x.id = t.client_id
+            ORDER BY t.days_90 DESC, t.total DESC, x.name
+        """,
+            {
+                "as_of": as_of,
+                "c30": cutoff_30,
+                "c60": cutoff_60,
+                "c90": cutoff_90,
+                "until": until,
+            },
+        ).fetchall()
+        c.close()
+        return rows
+
+    return _cached("aging", (as_of,), compute)
@@ -1,3 +1,4 @@
+from textual import work
 from textual.app import ComposeResult
 from textual.screen import Screen
 from textual.binding import Binding
@@ -10,7 +11,7 @@ from textual.widgets import (
     Input,
 )
 from textual.containers import Container, Horizontal
-from database import create_client, update_client
+import async_database as db
 
 
 class ClientForm(Screen):
@@ -62,9 +63,9 @@ class ClientForm(Screen):
     def on_mount(self):
         if self.is_editing and self.client_data:
             # Populate fields with existing data
-            self.query_one("#name", Input).value = self.client_data[1] or ""
-            self.query_one("#address", Input).value = self.client_data[2] or ""
-            self.query_one("#email", Input).value = self.client_data[3] or ""
+            self.query_one("#name", Input).value = self.client_data.name or ""
+            self.query_one("#address", Input).value = self.client_data.address or ""
+            self.query_one("#email", Input).value = self.client_data.email or ""
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "save":
@@ -72,11 +73,14 @@ class ClientForm(Screen):
         elif event.button.id == "cancel":
             self.action_cancel()
 
-    def save_client(self):
+    @work(exclusive=True, group="save")
+    async def save_client(self):
         name = self.query_one("#name", Input).value.strip()
         address = self.query_one("#address", Input).value.strip() or None
         email = self.query_one("#email", Input).value.strip() or None
 
+        save_button = self.query_one("#save", Button)
+        save_button.disabled = True
         try:
             if not name:
                 self.query_one("#message", Static).update(
@@ -85,14 +89,16 @@ class ClientForm(Screen):
                 return
 
             if self.is_editing:
-                client_id = update_client(self.client_data[0], name, address, email)
+                client_id = await db.update_client(
+                    self.client_data.id, name, address, email
+                )
                 self.query_one("#message", Static).update(
                     f"Client updated successfully! (ID: {client_id})"
                 )
                 # Give a moment to read the message, then go back
                 self.set_timer(1.0, self.action_cancel)
             else:
-                client_id = create_client(name, address, email)
+                client_id = await db.create_client(name, address, email)
                 self.query_one("#message", Static).update(
                     f"Client created successfully! (ID: {client_id})"
                 )
@@ -104,6 +110,8 @@ class ClientForm(Screen):
             self.query_one("#message", Static).update(f"Validation error: {e}")
         except Exception as e:
             self.query_one("#message", Static).update(f"Database error: {e}")
+        finally:
+            save_button.disabled = False
 
     def action_cancel(self):
         self.app.pop_screen()
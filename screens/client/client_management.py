@@ -1,3 +1,6 @@
+import asyncio
+
+from textual import work
 from textual.app import ComposeResult
 from textual.screen import Screen
 from textual.binding import Binding
@@ -9,9 +12,10 @@ from textual.widgets import (
     ListView,
     ListItem,
     Label,
+    Input,
 )
 from textual.containers import Container, Horizontal
-from database import list_clients
+import async_database as db
 from screens.client.client_form import ClientForm
 
 
@@ -22,15 +26,26 @@ class ClientManagement(Screen):
         Binding("escape", "back", "Back to Main Menu"),
     ]
 
+    PAGE_SIZE = 100
+    SEARCH_DELAY = 0.2  # seconds of quiet typing before a search runs
+
+    def __init__(self):
+        super().__init__()
+        self.next_cursor = None  # Keyset cursor for the next page of clients
+        self.loaded_token = None  # change_token() when the list was last built
+        self.search_text = ""
+
     def compose(self) -> ComposeResult:
         yield Header()
         yield Container(
             Static("Add or Edit Clients", classes="title"),
             Horizontal(
                 Button("New Client", variant="primary", id="create"),
+                Button("Load More", variant="default", id="more", disabled=True),
                 Button("Back", variant="default", id="back"),
                 classes="buttons-container",
             ),
+            Input(placeholder="Search name, address or email", id="search"),
             ListView(id="client-list"),
             classes="management-screen",
         )
@@ -39,21 +54,66 @@ class ClientManagement(Screen):
     def on_mount(self):
         self.refresh_clients()
 
-    def refresh_clients(self):
+    @work(exclusive=True, group="load")
+    async def refresh_clients(self, only_if_changed=False, delay=0):
+        """Reload the first page, or the search hits while a search is typed in.
+
+        With only_if_changed the reload is skipped if nothing moved.
+        """
+        if delay:
+            await asyncio.sleep(delay)
+        token = await db.change_token("client")
+        if only_if_changed and token == self.loaded_token:
+            return
         client_list = self.query_one("#client-list", ListView)
+        more_button = self.query_one("#more", Button)
+        client_list.loading = True
+        more_button.disabled = True
+        try:
+            if self.search_text:
+                clients = await db.search_clients(self.search_text)
+                next_cursor = None
+            else:
+                clients, next_cursor = await db.list_clients_page(self.PAGE_SIZE)
+        finally:
+            client_list.loading = False
+            more_button.disabled = self.next_cursor is None
         client_list.clear()
+        self.loaded_token = token
+        self.show_clients(clients, next_cursor, first_page=True)
+
+    @work(exclusive=True, group="load")
+    async def load_clients(self):
+        """Append the next page of clients to the list"""
+        more_button = self.query_one("#more", Button)
+        more_button.disabled = True
+        try:
+            clients, next_cursor = await db.list_clients_page(
+                self.PAGE_SIZE, self.next_cursor
+            )
+        finally:
+            more_button.disabled = self.next_cursor is None
+        self.show_clients(clients, next_cursor)
 
-        clients = list_clients()
+    def show_clients(self, clients, next_cursor, first_page=False):
+        client_list = self.query_one("#client-list", ListView)
+        self.next_cursor = next_cursor
         if clients:
             for client_data in clients:
-                address_display = client_data[2] if client_data[2] else "N/A"
-                email_display = client_data[3] if client_data[3] else "N/A"
-                display_text = f"{client_data[1]} | Addr: {address_display} | Email: {email_display}"
+                address_display = client_data.address or "N/A"
+                email_display = client_data.email or "N/A"
+                display_text = f"{client_data.name} | Addr: {address_display} | Email: {email_display}"
                 item = ListItem(Label(display_text))
                 item.client_data = client_data
                 client_list.append(item)
-        else:
+        elif first_page:
             client_list.append(ListItem(Label("No clients found.")))
+        self.query_one("#more", Button).disabled = self.next_cursor is None
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if event.input.id == "search":
+            self.search_text = event.value.strip()
+            self.refresh_clients(delay=self.SEARCH_DELAY)
 
     def on_list_view_selected(self, event: ListView.Selected) -> None:
         if hasattr(event.item, "client_data"):
@@ -62,12 +122,17 @@ class ClientManagement(Screen):
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "create":
             self.app.push_screen(ClientForm())
+        elif event.button.id == "more":
+            self.load_clients()
         elif event.button.id == "back":
             self.action_back()
 
     def on_screen_resume(self):
-        # Refresh the list when returning from create screen
-        self.refresh_clients()
+        # Refresh the list when returning from create screen, if it changed
+        self.refresh_clients(only_if_changed=True)
+
+    def on_screen_suspend(self):
+        self.workers.cancel_group(self, "load")
 
     def action_back(self):
         self.app.pop_screen()
@@ -1,3 +1,4 @@
+from textual import work
 from textual.app import ComposeResult
 from textual.screen import Screen
 from textual.binding import Binding
@@ -11,13 +12,7 @@ from textual.widgets import (
     Switch,
 )
 from textual.containers import Container, Horizontal
-from database import (
-    list_senders,
-    list_clients,
-    list_footer_messages,
-    create_invoice,
-    update_invoice,
-)
+import async_database as db
 
 
 class InvoiceFormScreen(Screen):
@@ -84,28 +79,37 @@ class InvoiceFormScreen(Screen):
         yield Footer()
 
     def on_mount(self):
-        self.populate_selects()
+        self.load_form()
+
+    @work(exclusive=True, group="load")
+    async def load_form(self):
+        form = self.query_one(".create-form")
+        form.loading = True
+        try:
+            senders = await db.list_senders()
+            clients = await db.list_clients()
+            footer_messages = await db.list_footer_messages()
+        finally:
+            form.loading = False
+        self.populate_selects(senders, clients, footer_messages)
         if self.is_editing and self.invoice_data:
             self.populate_fields()
 
-    def populate_selects(self):
+    def populate_selects(self, senders, clients, footer_messages):
         # Populate senders
         sender_select = self.query_one("#sender_select", Select)
-        senders = list_senders()
-        sender_options = [(f"{s[1]} (ID: {s[0]})", s[0]) for s in senders]
+        sender_options = [(f"{s.name} (ID: {s.id})", s.id) for s in senders]
         sender_select.set_options(sender_options)
 
         # Populate clients
         client_select = self.query_one("#client_select", Select)
-        clients = list_clients()
-        client_options = [(f"{c[1]} (ID: {c[0]})", c[0]) for c in clients]
+        client_options = [(f"{c.name} (ID: {c.id})", c.id) for c in clients]
         client_select.set_options(client_options)
 
         # Populate footer messages
         footer_select = self.query_one("#footer_select", Select)
-        footer_messages = list_footer_messages()
         footer_options = [("No footer message", None)] + [
-            (f"{f[1][:30]}... (ID: {f[0]})", f[0]) for f in footer_messages
+            (f"{f.message[:30]}... (ID: {f.id})", f.id) for f in footer_messages
         ]
         footer_select.set_options(footer_options)
 
@@ -114,13 +118,10 @@ class InvoiceFormScreen(Screen):
         if not self.invoice_data:
             return
 
-        # Invoice data structure: (id, date_created, paid, sender_name, sender_address, sender_email, sender_phone,
-        #                         client_name, client_address, client_email, footer_message, sender_id, client_id, footer_message_id)
-
-        sender_id = self.invoice_data[11]
-        client_id = self.invoice_data[12]
-        footer_message_id = self.invoice_data[13]
-        paid = self.invoice_data[2]
+        sender_id = self.invoice_data.sender_id
+        client_id = self.invoice_data.client_id
+        footer_message_id = self.invoice_data.footer_message_id
+        paid = self.invoice_data.paid
 
         # Set sender
         sender_select = self.query_one("#sender_select", Select)
@@ -144,7 +145,8 @@ class InvoiceFormScreen(Screen):
         elif event.button.id == "cancel":
             self.action_cancel()
 
-    def save_invoice(self):
+    @work(exclusive=True, group="save")
+    async def save_invoice(self):
         sender_id = self.query_one("#sender_select", Select).value
         client_id = self.query_one("#client_select", Select).value
         footer_id = self.query_one("#footer_select", Select).value
@@ -158,10 +160,12 @@ class InvoiceFormScreen(Screen):
             self.query_one("#message", Static).update("Error: Please select a client!")
             return
 
+        save_button = self.query_one("#save", Button)
+        save_button.disabled = True
         try:
             if self.is_editing:
-                invoice_id = update_invoice(
-                    self.invoice_data[0], sender_id, client_id, footer_id, paid
+                invoice_id = await db.update_invoice(
+                    self.invoice_data.id, sender_id, client_id, footer_id, paid
                 )
                 self.query_one("#message", Static).update(
                     f"Invoice updated successfully! (ID: {invoice_id})"
@@ -169,7 +173,9 @@ class InvoiceFormScreen(Screen):
                 # Give a moment to read the message, then go back
                 self.set_timer(1.0, self.action_cancel)
             else:
-                invoice_id = create_invoice(sender_id, client_id, footer_id, paid)
+                invoice_id = await db.create_invoice(
+                    sender_id, client_id, footer_id, paid
+                )
                 self.query_one("#message", Static).update(
                     f"Invoice created successfully! (ID: {invoice_id})"
                 )
@@ -179,6 +185,8 @@ class InvoiceFormScreen(Screen):
                 self.app.push_screen(AddInvoiceItemsScreen(invoice_id))
         except Exception as e:
             self.query_one("#message", Static).update(f"Error: {e}")
+        finally:
+            save_button.disabled = False
 
     def action_cancel(self):
         self.app.pop_screen()
@@ -1,3 +1,6 @@
+from contextlib import contextmanager
+
+from textual import work
 from textual.app import ComposeResult
 from textual.screen import Screen
 from textual.binding import Binding
@@ -10,10 +13,34 @@ from textual.widgets import (
     ListItem,
     Label,
     Input,
+    TextArea,
 )
 from textual.containers import Container, Horizontal
-from database import add_invoice_item, get_invoice_data
-from pdf_generator import generate_invoice_pdf
+import async_database as db
+from money import format_quantity
+
+
+def parse_item_lines(text):
+    """Parse pasted "name, quantity, cost" lines into item tuples.
+
+    The last two comma-separated fields are the numbers, so item names may
+    contain commas themselves. Blank lines are skipped.
+    """
+    items = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        parts = line.rsplit(",", 2)
+        if len(parts) != 3:
+            raise ValueError(f"Line {line_number}: expected name, quantity, cost")
+        item_name, amount_str, cost_str = parts
+        try:
+            items.append((item_name.strip(), float(amount_str), float(cost_str)))
+        except ValueError:
+            raise ValueError(
+                f"Line {line_number}: quantity and cost must be numbers"
+            ) from None
+    return items
 
 
 class AddInvoiceItemsScreen(Screen):
@@ -50,8 +77,14 @@ class AddInvoiceItemsScreen(Screen):
                 ),
                 classes="horizontal-fields",
             ),
+            Container(
+                Label("Or paste several items, one per line (name, quantity, cost):"),
+                TextArea(id="bulk_items"),
+                classes="field bulk-field",
+            ),
             Horizontal(
                 Button("Add Item", variant="primary", id="add_item"),
+                Button("Add Lines", variant="primary", id="add_lines"),
                 Button("Generate PDF", variant="success", id="finish"),
                 Button("Back", variant="default", id="cancel"),
                 classes="buttons-container",
@@ -66,31 +99,51 @@ class AddInvoiceItemsScreen(Screen):
     def on_mount(self):
         self.refresh_items()
 
-    def refresh_items(self):
+    @work(exclusive=True, group="load")
+    async def refresh_items(self):
         items_list = self.query_one("#items-list", ListView)
+        items_list.loading = True
+        try:
+            # Get current items for this invoice
+            _, items = await db.get_invoice_data(self.invoice_id)
+        finally:
+            items_list.loading = False
         items_list.clear()
 
-        # Get current items for this invoice
-        _, items = get_invoice_data(self.invoice_id)
-
         if items:
             for item in items:
-                item_name, amount, cost_per_unit = item
-                total_cost = amount * cost_per_unit
-                display_text = f"{item_name} | Qty: {amount} | Cost: ${cost_per_unit:.2f} | Total: ${total_cost:.2f}"
+                display_text = f"{item.item_name} | Qty: {format_quantity(item.amount)} | Cost: ${item.cost_per_unit:.2f} | Total: ${item.line_total:.2f}"
                 items_list.append(ListItem(Label(display_text)))
         else:
             items_list.append(ListItem(Label("No items added yet.")))
 
+    @contextmanager
+    def saving(self):
+        """Disable the add buttons while a write is in flight"""
+        buttons = [
+            self.query_one("#add_item", Button),
+            self.query_one("#add_lines", Button),
+        ]
+        for button in buttons:
+            button.disabled = True
+        try:
+            yield
+        finally:
+            for button in buttons:
+                button.disabled = False
+
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "add_item":
             self.add_item()
+        elif event.button.id == "add_lines":
+            self.add_item_lines()
         elif event.button.id == "finish":
             self.finish_invoice()
         elif event.button.id == "cancel":
             self.action_back()
 
-    def add_item(self):
+    @work(exclusive=True, group="save")
+    async def add_item(self):
         item_name = self.query_one("#item_name", Input).value.strip()
         amount_str = self.query_one("#amount", Input).value.strip()
         cost_str = self.query_one("#cost_per_unit", Input).value.strip()
@@ -117,7 +170,10 @@ class AddInvoiceItemsScreen(Screen):
                 )
                 return
 
-            add_invoice_item(self.invoice_id, item_name, amount, cost_per_unit)
+            with self.saving():
+                await db.add_invoice_item(
+                    self.invoice_id, item_name, amount, cost_per_unit
+                )
             self.query_one("#status", Static).update("Item added successfully!")
 
             # Clear form
@@ -135,10 +191,34 @@ class AddInvoiceItemsScreen(Screen):
         except Exception as e:
             self.query_one("#status", Static).update(f"Error: {e}")
 
-    def finish_invoice(self):
+    @work(exclusive=True, group="save")
+    async def add_item_lines(self):
+        bulk_input = self.query_one("#bulk_items", TextArea)
+
+        try:
+            items = parse_item_lines(bulk_input.text)
+            if not items:
+                self.query_one("#status", Static).update(
+                    "Error: Paste at least one item line!"
+                )
+                return
+
+            with self.saving():
+                item_ids = await db.add_invoice_items(self.invoice_id, items)
+            self.query_one("#status", Static).update(
+                f"{len(item_ids)} items added successfully!"
+            )
+            bulk_input.text = ""
+            self.refresh_items()
+        except Exception as e:
+            self.query_one("#status", Static).update(f"Error: {e}")
+
+    @work(exclusive=True, group="pdf")
+    async def finish_invoice(self):
+        self.query_one("#status", Static).update("Generating PDF...")
         try:
             # Generate PDF
-            filename = generate_invoice_pdf(self.invoice_id)
+            filename = await db.generate_invoice_pdf(self.invoice_id)
             self.query_one("#status", Static).update(
                 f"Invoice PDF generated: {filename}"
             )
@@ -1,3 +1,6 @@
+import asyncio
+
+from textual import work
 from textual.app import ComposeResult
 from textual.screen import Screen
 from textual.binding import Binding
@@ -9,9 +12,10 @@ from textual.widgets import (
     ListView,
     ListItem,
     Label,
+    Input,
 )
 from textual.containers import Container, Horizontal
-from database import list_invoices, get_invoice_data
+import async_database as db
 from screens.invoice.invoice_form_screen import InvoiceFormScreen
 from screens.invoice.invoice_items_screen import AddInvoiceItemsScreen
 
@@ -23,10 +27,18 @@ class InvoiceManagement(Screen):
         Binding("escape", "back", "Back to Main Menu"),
     ]
 
+    PAGE_SIZE = 100
+    SEARCH_DELAY = 0.2  # seconds of quiet typing before a search runs
+    # The list shows sender and client names next to each invoice
+    WATCHED_TABLES = ("invoice", "sender", "client")
+
     def __init__(self):
         super().__init__()
         self.selected_invoice_id = None
         self.invoice_map = {}  # Maps ListItem index to invoice_id
+        self.next_cursor = None  # Keyset cursor for the next page of invoices
+        self.loaded_token = None  # change_token() when the list was last built
+        self.search_text = ""
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -39,9 +51,11 @@ class InvoiceManagement(Screen):
                 Button("New Invoice", variant="primary", id="create"),
                 Button("Edit Invoice", variant="default", id="edit", disabled=True),
                 Button("View Items", variant="default", id="view_items", disabled=True),
+                Button("Load More", variant="default", id="more", disabled=True),
                 Button("Back", variant="default", id="back"),
                 classes="buttons-container",
             ),
+            Input(placeholder="Search items, clients or providers", id="search"),
             ListView(id="invoice-list"),
             classes="management-screen",
         )
@@ -50,26 +64,76 @@ class InvoiceManagement(Screen):
     def on_mount(self):
         self.refresh_invoices()
 
-    def refresh_invoices(self):
+    @work(exclusive=True, group="load")
+    async def refresh_invoices(self, only_if_changed=False, delay=0):
+        """Reload the first page, or the search hits while a search is typed in.
+
+        With only_if_changed the reload is skipped if nothing moved.
+        """
+        if delay:
+            await asyncio.sleep(delay)
+        token = await db.change_token(*self.WATCHED_TABLES)
+        if only_if_changed and token == self.loaded_token:
+            return
         invoice_list = self.query_one("#invoice-list", ListView)
+        more_button = self.query_one("#more", Button)
+        invoice_list.loading = True
+        more_button.disabled = True
+        try:
+            if self.search_text:
+                invoices = await db.search_invoices(self.search_text)
+                next_cursor = None
+            else:
+                invoices, next_cursor = await db.list_invoices_page(self.PAGE_SIZE)
+        finally:
+            invoice_list.loading = False
+            more_button.disabled = self.next_cursor is None
         invoice_list.clear()
         self.invoice_map.clear()
+        self.loaded_token = token
+        # Reset selection, the rows it pointed at are gone
+        self.selected_invoice_id = None
+        self.query_one("#edit", Button).disabled = True
+        self.query_one("#view_items", Button).disabled = True
+        self.show_invoices(invoices, next_cursor)
 
-        invoices = list_invoices()
+    @work(exclusive=True, group="load")
+    async def load_invoices(self):
+        """Append the next page of invoices to the list"""
+        more_button = self.query_one("#more", Button)
+        more_button.disabled = True
+        try:
+            invoices, next_cursor = await db.list_invoices_page(
+                self.PAGE_SIZE, self.next_cursor
+            )
+        finally:
+            more_button.disabled = self.next_cursor is None
+        self.show_invoices(invoices, next_cursor)
+
+    def show_invoices(self, invoices, next_cursor):
+        invoice_list = self.query_one("#invoice-list", ListView)
+        self.next_cursor = next_cursor
         if invoices:
-            for index, invoice_data in enumerate(invoices):
-                # invoice_data: (id, sender_name, client_name, date_created, paid)
-                invoice_id, sender_name, client_name, date_created, paid = invoice_data
+            start = len(self.invoice_map)
+            for index, invoice_data in enumerate(invoices, start=start):
                 date_str = (
-                    date_created.split()[0] if date_created else "Unknown"
+                    invoice_data.date_created.split()[0]
+                    if invoice_data.date_created
+                    else "Unknown"
                 )  # Split on space and take first part (date only)
-                paid_status = "✓ PAID" if paid else "○ UNPAID"
-                display_text = f"Invoice #{invoice_id} | {sender_name} → {client_name} | {date_str} | {paid_status}"
+                paid_status = "✓ PAID" if invoice_data.paid else "○ UNPAID"
+                display_text = f"Invoice #{invoice_data.id} | {invoice_data.sender_name} → {invoice_data.client_name} | {date_str} | {invoice_data.item_count} items | ${invoice_data.grand_total:,.2f} | {paid_status}"
                 item = ListItem(Label(display_text))
                 invoice_list.append(item)
-                self.invoice_map[index] = invoice_id
-        else:
+                self.invoice_map[index] = invoice_data.id
+        elif not self.invoice_map:
             invoice_list.append(ListItem(Label("No invoices found.")))
+        self.query_one("#more", Button).disabled = self.next_cursor is None
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if event.input.id == "search":
+            self.search_text = event.value.strip()
+            self.refresh_invoices(delay=self.SEARCH_DELAY)
 
     def on_list_view_selected(self) -> None:
         invoice_list = self.query_one("#invoice-list", ListView)
@@ -80,27 +144,34 @@ class InvoiceManagement(Screen):
             self.query_one("#edit", Button).disabled = False
             self.query_one("#view_items", Button).disabled = False
 
+    @work(exclusive=True, group="open")
+    async def edit_invoice(self, invoice_id):
+        # Get full invoice data for editing
+        invoice_data, _ = await db.get_invoice_data(invoice_id)
+        if invoice_data:
+            self.app.push_screen(InvoiceFormScreen(invoice_data))
+
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "create":
             self.app.push_screen(InvoiceFormScreen())
         elif event.button.id == "edit":
             if self.selected_invoice_id:
-                # Get full invoice data for editing
-                invoice_data, _ = get_invoice_data(self.selected_invoice_id)
-                if invoice_data:
-                    self.app.push_screen(InvoiceFormScreen(invoice_data))
+                self.edit_invoice(self.selected_invoice_id)
         elif event.button.id == "view_items":
             if self.selected_invoice_id:
                 self.app.push_screen(AddInvoiceItemsScreen(self.selected_invoice_id))
+        elif event.button.id == "more":
+            self.load_invoices()
         elif event.button.id == "back":
             self.action_back()
 
     def on_screen_resume(self):
-        self.refresh_invoices()
-        # Reset selection when returning to this screen
-        self.selected_invoice_id = None
-        self.query_one("#edit", Button).disabled = True
-        self.query_one("#view_items", Button).disabled = True
+        # Rebuild only if something changed while another screen was open
+        self.refresh_invoices(only_if_changed=True)
+
+    def on_screen_suspend(self):
+        # Nobody is looking; a reload runs again on resume if still needed
+        self.workers.cancel_group(self, "load")
 
     def action_back(self):
         self.app.pop_screen()
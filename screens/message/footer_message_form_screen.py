@@ -1,3 +1,4 @@
+from textual import work
 from textual.app import ComposeResult
 from textual.screen import Screen
 from textual.binding import Binding
@@ -10,7 +11,7 @@ from textual.widgets import (
     Input,
 )
 from textual.containers import Container, Horizontal
-from database import create_footer_message, update_footer_message
+import async_database as db
 
 
 class FooterMessageFormScreen(Screen):
@@ -54,7 +55,7 @@ class FooterMessageFormScreen(Screen):
     def on_mount(self):
         if self.is_editing and self.footer_data:
             # Populate field with existing data
-            self.query_one("#message", Input).value = self.footer_data[1] or ""
+            self.query_one("#message", Input).value = self.footer_data.message or ""
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "save":
@@ -62,9 +63,12 @@ class FooterMessageFormScreen(Screen):
         elif event.button.id == "cancel":
             self.action_cancel()
 
-    def save_footer_message(self):
+    @work(exclusive=True, group="save")
+    async def save_footer_message(self):
         message = self.query_one("#message", Input).value.strip()
 
+        save_button = self.query_one("#save", Button)
+        save_button.disabled = True
         try:
             if not message:
                 self.query_one("#status", Static).update(
@@ -73,14 +77,16 @@ class FooterMessageFormScreen(Screen):
                 return
 
             if self.is_editing:
-                footer_id = update_footer_message(self.footer_data[0], message)
+                footer_id = await db.update_footer_message(
+                    self.footer_data.id, message
+                )
                 self.query_one("#status", Static).update(
                     f"Footer message updated successfully! (ID: {footer_id})"
                 )
                 # Give a moment to read the message, then go back
                 self.set_timer(1.0, self.action_cancel)
             else:
-                footer_id = create_footer_message(message)
+                footer_id = await db.create_footer_message(message)
                 self.query_one("#status", Static).update(
                     f"Footer message created successfully! (ID: {footer_id})"
                 )
@@ -90,6 +96,8 @@ class FooterMessageFormScreen(Screen):
             self.query_one("#status", Static).update(f"Validation error: {e}")
         except Exception as e:
             self.query_one("#status", Static).update(f"Error: {e}")
+        finally:
+            save_button.disabled = False
 
     def action_cancel(self):
         self.app.pop_screen()
@@ -1,3 +1,6 @@
+import asyncio
+
+from textual import work
 from textual.app import ComposeResult
 from textual.screen import Screen
 from textual.binding import Binding
@@ -9,9 +12,10 @@ from textual.widgets import (
     ListView,
     ListItem,
     Label,
+    Input,
 )
 from textual.containers import Container, Horizontal
-from database import list_footer_messages
+import async_database as db
 from screens.message.footer_message_form_screen import FooterMessageFormScreen
 
 
@@ -22,6 +26,13 @@ class MessageManagement(Screen):
         Binding("escape", "back", "Back to Main Menu"),
     ]
 
+    SEARCH_DELAY = 0.2  # seconds of quiet typing before a search runs
+
+    def __init__(self):
+        super().__init__()
+        self.loaded_token = None  # change_token() when the list was last built
+        self.search_text = ""
+
     def compose(self) -> ComposeResult:
         yield Header()
         yield Container(
@@ -31,6 +42,7 @@ class MessageManagement(Screen):
                 Button("Back", variant="default", id="back"),
                 classes="buttons-container",
             ),
+            Input(placeholder="Search messages", id="search"),
             ListView(id="footer-list"),
             classes="management-screen",
         )
@@ -39,29 +51,48 @@ class MessageManagement(Screen):
     def on_mount(self):
         self.refresh_footer_messages()
 
-    def refresh_footer_messages(self):
+    @work(exclusive=True, group="load")
+    async def refresh_footer_messages(self, only_if_changed=False, delay=0):
+        """Reload the list, or the search hits while a search is typed in.
+
+        With only_if_changed the reload is skipped if nothing moved.
+        """
+        if delay:
+            await asyncio.sleep(delay)
+        token = await db.change_token("footer_message")
+        if only_if_changed and token == self.loaded_token:
+            return
         footer_list = self.query_one("#footer-list", ListView)
+        footer_list.loading = True
+        try:
+            if self.search_text:
+                footer_messages = await db.search_footer_messages(self.search_text)
+            else:
+                footer_messages = await db.list_footer_messages()
+        finally:
+            footer_list.loading = False
         footer_list.clear()
+        self.loaded_token = token
 
-        footer_messages = list_footer_messages()
         if footer_messages:
             for footer_data in footer_messages:
                 # Truncate long messages for display
                 truncated_message = (
-                    footer_data[1][:50] + "..."
-                    if len(footer_data[1]) > 50
-                    else footer_data[1]
+                    footer_data.message[:50] + "..."
+                    if len(footer_data.message) > 50
+                    else footer_data.message
                 )
-                display_text = f"{footer_data[0]} | {truncated_message}"
+                display_text = f"{footer_data.id} | {truncated_message}"
                 item = ListItem(Label(display_text))
                 item.footer_data = footer_data
                 footer_list.append(item)
         else:
             footer_list.append(ListItem(Label("No footer messages found.")))
 
-    def get_footer_messages(self):
-        """Get all footer messages from database"""
-        return list_footer_messages()
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if event.input.id == "search":
+            self.search_text = event.value.strip()
+            self.refresh_footer_messages(delay=self.SEARCH_DELAY)
 
     def on_list_view_selected(self, event: ListView.Selected) -> None:
         if hasattr(event.item, "footer_data"):
@@ -74,7 +105,10 @@ class MessageManagement(Screen):
             self.action_back()
 
     def on_screen_resume(self):
-        self.refresh_footer_messages()
+        self.refresh_footer_messages(only_if_changed=True)
+
+    def on_screen_suspend(self):
+        self.workers.cancel_group(self, "load")
 
     def action_back(self):
         self.app.pop_screen()
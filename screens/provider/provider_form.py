@@ -1,3 +1,4 @@
+from textual import work
 from textual.app import ComposeResult
 from textual.screen import Screen
 from textual.binding import Binding
@@ -10,7 +11,7 @@ from textual.widgets import (
     Input,
 )
 from textual.containers import Container, Horizontal
-from database import create_sender, update_sender
+import async_database as db
 
 
 class Provider_Form(Screen):
@@ -70,10 +71,10 @@ class Provider_Form(Screen):
     def on_mount(self):
         if self.is_editing and self.provider_data:
             # Populate fields with existing data
-            self.query_one("#name", Input).value = self.provider_data[1] or ""
-            self.query_one("#address", Input).value = self.provider_data[2] or ""
-            self.query_one("#email", Input).value = self.provider_data[3] or ""
-            self.query_one("#phone", Input).value = self.provider_data[4] or ""
+            self.query_one("#name", Input).value = self.provider_data.name or ""
+            self.query_one("#address", Input).value = self.provider_data.address or ""
+            self.query_one("#email", Input).value = self.provider_data.email or ""
+            self.query_one("#phone", Input).value = self.provider_data.phone or ""
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "save":
@@ -81,12 +82,15 @@ class Provider_Form(Screen):
         elif event.button.id == "cancel":
             self.action_cancel()
 
-    def save_provider(self):
+    @work(exclusive=True, group="save")
+    async def save_provider(self):
         name = self.query_one("#name", Input).value.strip()
         address = self.query_one("#address", Input).value.strip() or None
         email = self.query_one("#email", Input).value.strip() or None
         phone = self.query_one("#phone", Input).value.strip() or None
 
+        save_button = self.query_one("#save", Button)
+        save_button.disabled = True
         try:
             if not name:
                 self.query_one("#message", Static).update(
@@ -95,8 +99,8 @@ class Provider_Form(Screen):
                 return
 
             if self.is_editing and self.provider_data:
-                provider_id = update_sender(
-                    self.provider_data[0], name, address, email, phone
+                provider_id = await db.update_sender(
+                    self.provider_data.id, name, address, email, phone
                 )
                 self.query_one("#message", Static).update(
                     f"Provider updated successfully! (ID: {provider_id})"
@@ -104,7 +108,7 @@ class Provider_Form(Screen):
                 # Give a moment to read the message, then go back
                 self.set_timer(1.0, self.action_cancel)
             else:
-                provider_id = create_sender(name, address, email, phone)
+                provider_id = await db.create_sender(name, address, email, phone)
                 self.query_one("#message", Static).update(
                     f"Provider created successfully! (ID: {provider_id})"
                 )
@@ -117,6 +121,8 @@ class Provider_Form(Screen):
             self.query_one("#message", Static).update(f"Validation error: {e}")
         except Exception as e:
             self.query_one("#message", Static).update(f"Database error: {e}")
+        finally:
+            save_button.disabled = False
 
     def action_cancel(self):
         self.app.pop_screen()
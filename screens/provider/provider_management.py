@@ -1,3 +1,6 @@
+import asyncio
+
+from textual import work
 from textual.app import ComposeResult
 from textual.screen import Screen
 from textual.binding import Binding
@@ -9,9 +12,10 @@ from textual.widgets import (
     ListView,
     ListItem,
     Label,
+    Input,
 )
 from textual.containers import Container, Horizontal
-from database import list_senders
+import async_database as db
 from screens.provider.provider_form import Provider_Form
 
 
@@ -22,9 +26,15 @@ class ProviderManagement(Screen):
         Binding("escape", "back", "Back to Main Menu"),
     ]
 
+    PAGE_SIZE = 100
+    SEARCH_DELAY = 0.2  # seconds of quiet typing before a search runs
+
     def __init__(self):
         super().__init__()
         self.sender_data_map = {}
+        self.next_cursor = None  # Keyset cursor for the next page of senders
+        self.loaded_token = None  # change_token() when the list was last built
+        self.search_text = ""
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -32,10 +42,12 @@ class ProviderManagement(Screen):
             Static("Add or Edit Provider", classes="title"),
             Horizontal(
                 Button("New Provider", variant="primary", id="create"),
+                Button("Load More", variant="default", id="more", disabled=True),
                 Button("Back", variant="default", id="back"),
                 classes="buttons-container",
             ),
             Static("Providers", classes="title"),
+            Input(placeholder="Search name, address, email or phone", id="search"),
             ListView(id="sender-list"),
             classes="management-screen",
         )
@@ -44,20 +56,65 @@ class ProviderManagement(Screen):
     def on_mount(self):
         self.refresh_senders()
 
-    def refresh_senders(self):
+    @work(exclusive=True, group="load")
+    async def refresh_senders(self, only_if_changed=False, delay=0):
+        """Reload the first page, or the search hits while a search is typed in.
+
+        With only_if_changed the reload is skipped if nothing moved.
+        """
+        if delay:
+            await asyncio.sleep(delay)
+        token = await db.change_token("sender")
+        if only_if_changed and token == self.loaded_token:
+            return
         sender_list = self.query_one("#sender-list", ListView)
+        more_button = self.query_one("#more", Button)
+        sender_list.loading = True
+        more_button.disabled = True
+        try:
+            if self.search_text:
+                senders = await db.search_senders(self.search_text)
+                next_cursor = None
+            else:
+                senders, next_cursor = await db.list_senders_page(self.PAGE_SIZE)
+        finally:
+            sender_list.loading = False
+            more_button.disabled = self.next_cursor is None
         sender_list.clear()
         self.sender_data_map.clear()
+        self.loaded_token = token
+        self.show_senders(senders, next_cursor)
+
+    @work(exclusive=True, group="load")
+    async def load_senders(self):
+        """Append the next page of senders to the list"""
+        more_button = self.query_one("#more", Button)
+        more_button.disabled = True
+        try:
+            senders, next_cursor = await db.list_senders_page(
+                self.PAGE_SIZE, self.next_cursor
+            )
+        finally:
+            more_button.disabled = self.next_cursor is None
+        self.show_senders(senders, next_cursor)
 
-        senders = list_senders()
+    def show_senders(self, senders, next_cursor):
+        sender_list = self.query_one("#sender-list", ListView)
+        self.next_cursor = next_cursor
         if senders:
             for sender_data in senders:
-                display_text = f"{sender_data[1]} | {sender_data[2] or 'No Address'} | {sender_data[3] or 'No Email'} | {sender_data[4] or 'No Phone'}"
+                display_text = f"{sender_data.name} | {sender_data.address or 'No Address'} | {sender_data.email or 'No Email'} | {sender_data.phone or 'No Phone'}"
                 item = ListItem(Label(display_text))
                 self.sender_data_map[item] = sender_data
                 sender_list.append(item)
-        else:
+        elif not self.sender_data_map:
             sender_list.append(ListItem(Label("No senders found.")))
+        self.query_one("#more", Button).disabled = self.next_cursor is None
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if event.input.id == "search":
+            self.search_text = event.value.strip()
+            self.refresh_senders(delay=self.SEARCH_DELAY)
 
     def on_list_view_selected(self, event: ListView.Selected) -> None:
         if event.item in self.sender_data_map:
@@ -66,12 +123,17 @@ class ProviderManagement(Screen):
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "create":
             self.app.push_screen(Provider_Form())
+        elif event.button.id == "more":
+            self.load_senders()
         elif event.button.id == "back":
             self.action_back()
 
     def on_screen_resume(self):
-        # Refresh the list when returning from create screen
-        self.refresh_senders()
+        # Refresh the list when returning from create screen, if it changed
+        self.refresh_senders(only_if_changed=True)
+
+    def on_screen_suspend(self):
+        self.workers.cancel_group(self, "load")
 
     def action_back(self):
         self.app.pop_screen()
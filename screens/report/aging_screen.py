@@ -0,0 +1,101 @@
+from textual import work
+from textual.app import ComposeResult
+from textual.screen import Screen
+from textual.binding import Binding
+from textual.widgets import (
+    Button,
+    DataTable,
+    Header,
+    Footer,
+    Static,
+)
+from textual.containers import Container, Horizontal
+import async_database as db
+
+
+class AgingScreen(Screen):
+    """Screen showing unpaid totals per client by days outstanding."""
+
+    BINDINGS = [
+        Binding("escape", "back", "Back to Reports"),
+    ]
+
+    # Paying or adding to an invoice moves the buckets; renames move the labels
+    WATCHED_TABLES = ("invoice", "client")
+
+    def __init__(self):
+        super().__init__()
+        self.loaded_token = None  # change_token() when the table was last built
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        yield Container(
+            Static("Accounts Receivable Aging", classes="title"),
+            Static("", id="aging_total", classes="subtitle"),
+            DataTable(id="report-table", cursor_type="row", zebra_stripes=True),
+            Horizontal(
+                Button("Back", variant="default", id="back"),
+                classes="buttons-container",
+            ),
+            classes="management-screen",
+        )
+        yield Footer()
+
+    def on_mount(self):
+        table = self.query_one("#report-table", DataTable)
+        table.add_columns(
+            "Client", "Invoices", "Current", "30-59", "60-89", "90+", "Total", "Oldest"
+        )
+        self.refresh_aging()
+
+    @work(exclusive=True, group="load")
+    async def refresh_aging(self, only_if_changed=False):
+        """Rebuild the table; with only_if_changed, skip it if nothing moved"""
+        token = await db.change_token(*self.WATCHED_TABLES)
+        if only_if_changed and token == self.loaded_token:
+            return
+        table = self.query_one("#report-table", DataTable)
+        table.loading = True
+        try:
+            rows = await db.aging_report()
+        finally:
+            table.loading = False
+        self.loaded_token = token
+
+        table.clear()
+        for row in rows:
+            table.add_row(
+                row.client,
+                row.invoices,
+                *(
+                    f"{amount:,.2f}"
+                    for amount in (
+                        row.current,
+                        row.days_30,
+                        row.days_60,
+                        row.days_90,
+                        row.total,
+                    )
+                ),
+                f"{row.oldest_days} days",
+            )
+        outstanding = sum(row.total for row in rows)
+        overdue = sum(row.days_90 for row in rows)
+        self.query_one("#aging_total", Static).update(
+            f"Outstanding: {outstanding:,.2f}   90+ days: {overdue:,.2f}"
+            if rows
+            else "No unpaid invoices."
+        )
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        if event.button.id == "back":
+            self.action_back()
+
+    def on_screen_resume(self):
+        self.refresh_aging(only_if_changed=True)
+
+    def on_screen_suspend(self):
+        self.workers.cancel_group(self, "load")
+
+    def action_back(self):
+        self.app.pop_screen()
@@ -0,0 +1,158 @@
+from textual import work
+from textual.app import ComposeResult
+from textual.screen import Screen
+from textual.binding import Binding
+from textual.widgets import (
+    Button,
+    DataTable,
+    Header,
+    Footer,
+    Label,
+    Select,
+    Static,
+)
+from textual.containers import Container, Horizontal
+import async_database as db
+from screens.report.aging_screen import AgingScreen
+
+REPORTS = {
+    "client": ("Client", db.revenue_by_client),
+    "sender": ("Provider", db.revenue_by_sender),
+    "month": ("Month", db.revenue_by_month),
+}
+
+PAID_FILTERS = [
+    ("All invoices", "all"),
+    ("Paid only", "paid"),
+    ("Unpaid only", "unpaid"),
+]
+
+SOURCES = [
+    ("Current invoices", "current"),
+    ("Including archive", "archive"),
+]
+
+
+class ReportScreen(Screen):
+    """Screen showing revenue grouped by client, provider or month."""
+
+    BINDINGS = [
+        Binding("escape", "back", "Back to Main Menu"),
+    ]
+
+    # Invoice writes move the totals; sender and client renames move the labels
+    WATCHED_TABLES = ("invoice", "sender", "client")
+
+    def __init__(self):
+        super().__init__()
+        self.loaded_token = None  # change_token() when the table was last built
+        self.loaded_report = None
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        yield Container(
+            Static("Revenue Reports", classes="title"),
+            Horizontal(
+                Container(
+                    Label("Group by:"),
+                    Select(
+                        [(label, kind) for kind, (label, _) in REPORTS.items()],
+                        value="client",
+                        allow_blank=False,
+                        id="report_select",
+                    ),
+                    classes="field",
+                ),
+                Container(
+                    Label("Invoices:"),
+                    Select(
+                        PAID_FILTERS,
+                        value="all",
+                        allow_blank=False,
+                        id="paid_select",
+                    ),
+                    classes="field",
+                ),
+                Container(
+                    Label("Source:"),
+                    Select(
+                        SOURCES,
+                        value="current",
+                        allow_blank=False,
+                        id="source_select",
+                    ),
+                    classes="field",
+                ),
+                id="report-filters",
+            ),
+            Static("", id="paid_summary", classes="subtitle"),
+            DataTable(id="report-table", cursor_type="row", zebra_stripes=True),
+            Horizontal(
+                Button("Aging", variant="primary", id="aging"),
+                Button("Back", variant="default", id="back"),
+                classes="buttons-container",
+            ),
+            classes="management-screen",
+        )
+        yield Footer()
+
+    def on_mount(self):
+        self.refresh_report()
+
+    @work(exclusive=True, group="load")
+    async def refresh_report(self, only_if_changed=False):
+        """Rebuild the table for the chosen grouping, paid filter and source.
+
+        With only_if_changed the rebuild is skipped if nothing moved.
+        """
+        kind = self.query_one("#report_select", Select).value
+        paid = {"all": None, "paid": True, "unpaid": False}[
+            self.query_one("#paid_select", Select).value
+        ]
+        include_archive = self.query_one("#source_select", Select).value == "archive"
+        token = await db.change_token(*self.WATCHED_TABLES)
+        if (
+            only_if_changed
+            and token == self.loaded_token
+            and (kind, paid, include_archive) == self.loaded_report
+        ):
+            return
+        label, report = REPORTS[kind]
+        table = self.query_one("#report-table", DataTable)
+        table.loading = True
+        try:
+            rows = await report(paid=paid, include_archive=include_archive)
+            summary = await db.paid_summary(include_archive=include_archive)
+        finally:
+            table.loading = False
+        self.loaded_token = token
+        self.loaded_report = (kind, paid, include_archive)
+
+        self.query_one("#paid_summary", Static).update(
+            "   ".join(
+                f"{row.label}: {row.total:,.2f} ({row.invoices} invoices)"
+                for row in summary
+            )
+        )
+        table.clear(columns=True)
+        table.add_columns(label, "Invoices", "Items", "Revenue")
+        for row in rows:
+            table.add_row(row.label, row.invoices, row.items, f"{row.total:,.2f}")
+
+    def on_select_changed(self, event: Select.Changed) -> None:
+        self.refresh_report()
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        if event.button.id == "aging":
+            self.app.push_screen(AgingScreen())
+        elif event.button.id == "back":
+            self.action_back()
+
+    def on_screen_resume(self):
+        self.refresh_report(only_if_changed=True)
+
+    def on_screen_suspend(self):
+        self.workers.cancel_group(self, "load")
+
+    def action_back(self):
+        self.app.pop_screen()
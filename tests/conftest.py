@@ -2,7 +2,7 @@ import pytest
 import tempfile
 import os
 from unittest.mock import patch
-from database import init_db
+from database import init_db, close_connections
 
 
 @pytest.fixture
@@ -15,6 +15,7 @@ def temp_db():
     with patch('database.DB_FILE', temp_db_path):
         init_db()
         yield temp_db_path
+        close_connections()
     
     # Clean up
     if os.path.exists(temp_db_path):
@@ -90,4 +91,21 @@ def mock_invoice_complete():
             ("Consulting Services", 10, 100.00),
             ("Design Work", 5, 50.00)
         ]
-    }
\ No newline at end of file
+    }
+
+@pytest.fixture
+def make_invoice():
+    """Factory for invoices with items and a fixed date_created"""
+    from database import add_invoice_items, create_invoice, get_connection
+
+    def make(sender_id, client_id, date, items, paid=False):
+        invoice_id = create_invoice(sender_id, client_id, paid=paid)
+        add_invoice_items(invoice_id, items)
+        conn = get_connection()
+        conn.execute(
+            "UPDATE invoice SET date_created = ? WHERE id = ?", (date, invoice_id)
+        )
+        conn.commit()
+        return invoice_id
+
+    return make
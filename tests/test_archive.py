@@ -0,0 +1,222 @@
+import os
+import sqlite3
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+import reports
+from exporter import iter_export_rows
+from pdf_generator import generate_invoice_pdfs
+from archive import archive_invoices, archive_stats, count_archivable
+from cli import main
+from database import (
+    archive_file,
+    check_invoice_totals,
+    create_client,
+    create_sender,
+    get_connection,
+    get_invoice_data,
+    get_invoice_data_many,
+    iter_invoice_data,
+    list_invoices,
+    search_invoices,
+)
+
+
+@pytest.fixture
+def archived_db(temp_db):
+    """Temporary database whose archive file is removed afterwards"""
+    with patch("database.DB_FILE", temp_db):
+        reports.clear_cache()
+        path = archive_file()
+        yield temp_db
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+
+
+def _setup(make_invoice):
+    sender = create_sender("Acme")
+    client = create_client("Globex")
+    old_paid = make_invoice(
+        sender, client, "2020-03-01 09:00:00", [("Legacy audit", 2, 100)], True
+    )
+    old_unpaid = make_invoice(
+        sender, client, "2020-04-01 09:00:00", [("Hosting", 1, 20)], False
+    )
+    new_paid = make_invoice(
+        sender, client, "2024-05-01 09:00:00", [("Design", 1, 80)], True
+    )
+    return old_paid, old_unpaid, new_paid
+
+
+class TestArchive:
+    def test_old_paid_invoices_are_moved(self, archived_db, make_invoice):
+        """Test that only old paid invoices leave the main database"""
+        old_paid, old_unpaid, new_paid = _setup(make_invoice)
+        assert count_archivable("2023-01-01") == 1
+
+        result = archive_invoices("2023-01-01")
+
+        assert (result.invoices, result.items) == (1, 1)
+        assert sorted(row.id for row in list_invoices()) == [old_unpaid, new_paid]
+        assert archive_stats() == (1, 1)
+        conn = get_connection()
+        assert conn.execute(
+            "SELECT COUNT(*) FROM main.invoice_item WHERE invoice_id = ?", (old_paid,)
+        ).fetchone() == (0,)
+        # The item search index and stored totals stay consistent
+        assert search_invoices("legacy") == []
+        assert check_invoice_totals() == []
+
+    def test_archived_invoice_data_is_still_readable(
+        self, archived_db, make_invoice
+    ):
+        """Test that get_invoice_data falls back to the archive"""
+        old_paid, _, _ = _setup(make_invoice)
+        archive_invoices("2023-01-01", batch_size=1)
+
+        invoice, items = get_invoice_data(old_paid)
+        assert invoice.id == old_paid
+        assert invoice.client_name == "Globex"
+        assert [(i.item_name, i.amount, i.cost_per_unit) for i in items] == [
+            ("Legacy audit", 2, Decimal("100.00"))
+        ]
+        assert get_invoice_data(999) == (None, [])
+
+    def test_batch_reads_include_the_archive(
+        self, archived_db, tmp_path, make_invoice
+    ):
+        """Test the batch lookup, the iterator and PDF export on archived ids"""
+        old_paid, old_unpaid, new_paid = _setup(make_invoice)
+        archive_invoices("2023-01-01")
+
+        data = get_invoice_data_many([new_paid, old_paid, 999])
+        assert list(data) == [new_paid, old_paid]
+        invoice, items = data[old_paid]
+        assert invoice.client_name == "Globex"
+        assert [i.item_name for i in items] == ["Legacy audit"]
+
+        ids = [invoice.id for invoice, _ in iter_invoice_data(batch_size=1)]
+        assert ids == [old_paid, old_unpaid, new_paid]
+        live = iter_invoice_data(include_archive=False)
+        assert [invoice.id for invoice, _ in live] == [old_unpaid, new_paid]
+
+        generated = generate_invoice_pdfs([old_paid], output_dir=str(tmp_path))
+        assert os.path.exists(generated[old_paid])
+
+    def test_export_includes_the_archive(self, archived_db, make_invoice):
+        """Test that exports cover archived invoices unless told not to"""
+        old_paid, old_unpaid, new_paid = _setup(make_invoice)
+        archive_invoices("2023-01-01")
+
+        rows = list(iter_export_rows())
+        assert [row[0] for row in rows] == [old_paid, old_unpaid, new_paid]
+        assert rows[0][5:8] == ("Acme", None, "Globex")
+        assert rows[0][11:13] == ("Legacy audit", Decimal("2"))
+        assert [row[0] for row in iter_export_rows(paid=True)] == [
+            old_paid,
+            new_paid,
+        ]
+        live = iter_export_rows(include_archive=False)
+        assert [row[0] for row in live] == [old_unpaid, new_paid]
+
+    def test_export_merges_both_files_without_sorting(
+        self, archived_db, make_invoice
+    ):
+        """Test that archived and live rows interleave by date from index scans"""
+        old_paid, old_unpaid, new_paid = _setup(make_invoice)
+        archive_invoices("2030-01-01")
+        statements = []
+        conn = get_connection()
+        conn.set_trace_callback(statements.append)
+        try:
+            rows = list(iter_export_rows())
+        finally:
+            conn.set_trace_callback(None)
+
+        assert [row[0] for row in rows] == [old_paid, old_unpaid, new_paid]
+        selects = [sql for sql in statements if "FROM" in sql and "SELECT" in sql]
+        assert len(selects) == 2
+        for sql in selects:
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+            assert not any("TEMP B-TREE" in row[-1] for row in plan)
+
+    def test_rerun_is_idempotent(self, archived_db, make_invoice):
+        """Test that archiving twice moves nothing more and duplicates nothing"""
+        _setup(make_invoice)
+        archive_invoices("2023-01-01")
+        assert archive_invoices("2023-01-01").invoices == 0
+        assert archive_stats() == (1, 1)
+
+    def test_failed_delete_loses_nothing(self, archived_db, make_invoice):
+        """Test that a failure after the archive commit keeps every row"""
+        old_paid, _, _ = _setup(make_invoice)
+        failure = sqlite3.OperationalError("database or disk is full")
+        with patch("archive._delete_archived", side_effect=failure):
+            with pytest.raises(sqlite3.OperationalError):
+                archive_invoices("2023-01-01")
+
+        # Copied to the archive, but still in the main database
+        assert old_paid in [row.id for row in list_invoices()]
+        assert archive_stats() == (1, 1)
+        assert check_invoice_totals() == []
+        # Readers of both files see the invoice once
+        assert [row[0] for row in iter_export_rows()].count(old_paid) == 1
+        ids = [invoice.id for invoice, _ in iter_invoice_data()]
+        assert ids.count(old_paid) == 1
+        [client] = reports.revenue_by_client(include_archive=True)
+        assert (client.invoices, client.total) == (3, Decimal("300.00"))
+        paid = reports.paid_summary(include_archive=True)[0]
+        assert (paid.label, paid.invoices) == ("Paid", 2)
+
+        result = archive_invoices("2023-01-01")
+        assert (result.invoices, result.items) == (1, 1)
+        assert archive_stats() == (1, 1)
+        invoice, items = get_invoice_data(old_paid)
+        assert invoice.id == old_paid and len(items) == 1
+
+    def test_batch_without_progress_stops(self, archived_db, make_invoice):
+        """Test that a batch whose delete moves nothing ends the run"""
+        old_paid, _, _ = _setup(make_invoice)
+        with patch("archive._delete_archived", return_value=(0, 0)) as delete:
+            result = archive_invoices("2023-01-01")
+
+        assert delete.call_count == 1
+        assert (result.invoices, result.complete) == (0, False)
+        assert old_paid in [row.id for row in list_invoices()]
+        assert archive_invoices("2023-01-01").complete
+
+    def test_reports_can_include_the_archive(self, archived_db, make_invoice):
+        """Test revenue reports with and without archived invoices"""
+        _setup(make_invoice)
+        archive_invoices("2030-01-01")
+
+        [current] = reports.revenue_by_client()
+        assert current.total == Decimal("20.00")
+        [everything] = reports.revenue_by_client(include_archive=True)
+        assert (everything.invoices, everything.total) == (3, Decimal("300.00"))
+        paid = reports.paid_summary(include_archive=True)[0]
+        assert (paid.label, paid.invoices) == ("Paid", 2)
+        months = reports.revenue_by_month(paid=True, include_archive=True)
+        assert [row.key for row in months] == ["2020-03", "2024-05"]
+
+    def test_without_archive(self, archived_db, make_invoice):
+        """Test that nothing needs an archive file until one is made"""
+        _setup(make_invoice)
+        assert archive_stats() == (0, 0)
+        assert len(reports.revenue_by_client(include_archive=True)) == 1
+        assert not os.path.exists(archive_file())
+
+    def test_cli(self, archived_db, capsys, make_invoice):
+        """Test the archive command and its dry run"""
+        _setup(make_invoice)
+        args = ["--db", archived_db, "archive", "--before", "2023-01-01"]
+        assert main(args + ["--dry-run"]) == 0
+        assert "1 paid invoices" in capsys.readouterr().out
+        assert archive_stats() == (0, 0)
+
+        assert main(args) == 0
+        assert "Archived 1 invoices (1 items)" in capsys.readouterr().out
+        assert archive_stats() == (1, 1)
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+import async_database
+import database
+
+
+@pytest.fixture(autouse=True)
+def stop_threads():
+    yield
+    async_database.shutdown()
+
+
+class TestAsyncDatabase:
+    def test_calls_run_off_the_event_loop(self, temp_db):
+        """Test that database work happens on a separate thread"""
+
+        async def scenario():
+            return await async_database.run(threading.get_ident)
+
+        with patch("database.DB_FILE", temp_db):
+            assert asyncio.run(scenario()) != threading.get_ident()
+
+    def test_write_then_read(self, temp_db):
+        """Test that an awaited write is visible to the next read"""
+
+        async def scenario():
+            client_id = await async_database.create_client("Async Client")
+            clients, next_cursor = await async_database.list_clients_page(10)
+            return client_id, clients, next_cursor
+
+        with patch("database.DB_FILE", temp_db):
+            client_id, clients, next_cursor = asyncio.run(scenario())
+            assert [c.id for c in clients] == [client_id]
+            assert next_cursor is None
+
+    def test_errors_propagate(self, temp_db):
+        """Test that validation errors reach the awaiting caller"""
+        with patch("database.DB_FILE", temp_db):
+            with pytest.raises(ValueError, match="Client name is required"):
+                asyncio.run(async_database.create_client(""))
+
+    def test_reads_not_blocked_by_write_lock(self, temp_db):
+        """Test that reads answer while another connection holds the write lock"""
+        import sqlite3
+
+        async def scenario():
+            return await asyncio.wait_for(async_database.list_senders(), timeout=2)
+
+        with patch("database.DB_FILE", temp_db):
+            database.create_sender("Sender")
+            other = sqlite3.connect(temp_db)
+            other.execute("BEGIN IMMEDIATE")
+            try:
+                senders = asyncio.run(scenario())
+            finally:
+                other.rollback()
+                other.close()
+            assert [s.name for s in senders] == ["Sender"]
+
+    def test_cancelled_call_is_dropped(self, temp_db):
+        """Test that a queued call is skipped when its caller is cancelled"""
+        started = threading.Event()
+        release = threading.Event()
+        ran = []
+
+        async def scenario():
+            blocker = asyncio.ensure_future(
+                async_database.run(lambda: (started.set(), release.wait()))
+            )
+            await asyncio.get_running_loop().run_in_executor(None, started.wait)
+            queued = asyncio.ensure_future(async_database.run(ran.append, "queued"))
+            await asyncio.sleep(0)
+            queued.cancel()
+            await asyncio.sleep(0)
+            release.set()
+            await blocker
+            with pytest.raises(asyncio.CancelledError):
+                await queued
+
+        with patch("database.DB_FILE", temp_db):
+            asyncio.run(scenario())
+            async_database.shutdown()
+            assert ran == []
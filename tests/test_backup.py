@@ -0,0 +1,180 @@
+import gzip
+import os
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+import backup
+from archive import open_archive
+from cli import main
+from database import archive_file, create_client, get_connection
+
+
+@pytest.fixture
+def with_archive(temp_db):
+    """Temporary database with an (empty) archive database next to it"""
+    with patch("database.DB_FILE", temp_db):
+        open_archive()
+        path = archive_file()
+        yield temp_db
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+
+
+def _fill():
+    create_client("Globex")
+    conn = get_connection()
+    conn.executemany(
+        "INSERT INTO footer_message (message) VALUES (?)",
+        [("x" * 500,) for _ in range(500)],
+    )
+    conn.commit()
+
+
+def _clients(path):
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+        return [row[0] for row in conn.execute("SELECT name FROM client")]
+    finally:
+        conn.close()
+
+
+class TestBackup:
+    def test_backup_in_steps(self, temp_db, tmp_path):
+        """Test a step-wise backup into a standalone, consistent file"""
+        with patch("database.DB_FILE", temp_db):
+            _fill()
+            steps = []
+            result = backup.backup_database(
+                directory=tmp_path,
+                pages=10,
+                progress=lambda done, total: steps.append((done, total)),
+            )
+
+            assert len(steps) > 1 and steps[-1][0] == steps[-1][1]
+            assert result.path.startswith(str(tmp_path))
+            assert not os.path.exists(result.path + ".part")
+            assert _clients(result.path) == ["Globex"]
+            conn = sqlite3.connect(result.path)
+            assert conn.execute("PRAGMA journal_mode").fetchone() == ("delete",)
+            conn.close()
+
+    def test_writes_during_backup(self, temp_db, tmp_path):
+        """Test that a WAL backup copies the snapshot it started from"""
+        with patch("database.DB_FILE", temp_db):
+            _fill()
+            writer = sqlite3.connect(temp_db)
+
+            def write(done, total):
+                writer.execute("INSERT INTO client (name) VALUES ('Busy')")
+                writer.commit()
+
+            result = backup.backup_database(
+                directory=tmp_path, pages=10, progress=write
+            )
+            writer.close()
+
+            assert result.restarts == 0
+            assert _clients(result.path) == ["Globex"]
+
+    def test_restarts_fall_back_to_one_step(self, tmp_path):
+        """Test that without WAL repeated restarts end in a single-step copy"""
+        source = str(tmp_path / "plain.db")
+        conn = sqlite3.connect(source)
+        conn.execute("CREATE TABLE client (name TEXT)")
+        conn.executemany(
+            "INSERT INTO client (name) VALUES (?)", [("x" * 500,)] * 500
+        )
+        conn.commit()
+
+        def write(done, total):
+            conn.execute("INSERT INTO client (name) VALUES ('Busy')")
+            conn.commit()
+
+        result = backup.backup_database(
+            directory=tmp_path / "backups", pages=10, source=source, progress=write
+        )
+        conn.close()
+
+        assert result.restarts == backup.MAX_RESTARTS
+        assert len(_clients(result.path)) == 500 + backup.MAX_RESTARTS
+
+    def test_compressed_backup(self, temp_db, tmp_path):
+        """Test that a gzipped backup restores to the same database"""
+        with patch("database.DB_FILE", temp_db):
+            _fill()
+            result = backup.backup_database(directory=tmp_path, compress=True)
+
+            assert result.path.endswith(".db.gz")
+            restored = tmp_path / "restored.db"
+            with gzip.open(result.path) as f:
+                restored.write_bytes(f.read())
+            assert _clients(restored) == ["Globex"]
+            assert result.size < result.pages * 4096
+
+    def test_rotation(self, temp_db, tmp_path):
+        """Test that only the newest backups of this database are kept"""
+        with patch("database.DB_FILE", temp_db):
+            stem = os.path.splitext(os.path.basename(temp_db))[0]
+            old = [f"{stem}-2024010{day}-120000.db" for day in range(1, 4)]
+            for name in old + ["other-20240101-120000.db", f"{stem}-notes.txt"]:
+                (tmp_path / name).write_bytes(b"")
+
+            result = backup.backup_database(directory=tmp_path, keep=2)
+
+            assert result.removed == [str(tmp_path / name) for name in old[:2]]
+            assert backup.list_backups(tmp_path) == [
+                str(tmp_path / old[2]),
+                result.path,
+            ]
+            assert (tmp_path / "other-20240101-120000.db").exists()
+
+    def test_interval_from_env(self):
+        """Test the PYNVOICE_BACKUP_INTERVAL switch, in minutes"""
+        with patch.dict("os.environ", {"PYNVOICE_BACKUP_INTERVAL": "15"}):
+            assert backup.interval_from_env() == 900
+        with patch.dict("os.environ", {"PYNVOICE_BACKUP_INTERVAL": ""}):
+            assert backup.interval_from_env() is None
+
+    def test_archive_is_backed_up_too(self, with_archive, tmp_path):
+        """Test that the archive database gets backups of its own"""
+        with patch("database.DB_FILE", with_archive):
+            env = {"PYNVOICE_BACKUP_DIR": str(tmp_path), "PYNVOICE_BACKUP_KEEP": "1"}
+            stem = os.path.splitext(os.path.basename(archive_file()))[0]
+            old = tmp_path / f"{stem}-20240101-120000.db"
+            old.write_bytes(b"")
+            with patch.dict("os.environ", env):
+                main_result, archive_result = backup.backup_from_env()
+
+            assert backup.list_backups(tmp_path) == [main_result.path]
+            assert backup.list_backups(tmp_path, archive_file()) == [
+                archive_result.path
+            ]
+            assert archive_result.removed == [str(old)]
+            conn = sqlite3.connect(archive_result.path)
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+            conn.close()
+            assert {"invoice", "invoice_item"} <= tables
+
+    def test_cli_backs_up_the_archive(self, with_archive, tmp_path):
+        """Test that the backup command includes the archive unless told not to"""
+        with patch("database.DB_FILE", with_archive):
+            args = ["--db", with_archive, "backup", "--dir", str(tmp_path)]
+            assert main(args + ["--no-archive"]) == 0
+            assert backup.list_backups(tmp_path, archive_file()) == []
+
+            assert main(args) == 0
+            assert len(backup.list_backups(tmp_path, archive_file())) == 1
+
+    def test_cli(self, temp_db, tmp_path, capsys):
+        """Test the backup command"""
+        with patch("database.DB_FILE", temp_db):
+            _fill()
+            args = ["--db", temp_db, "backup", "--dir", str(tmp_path), "--gzip"]
+            assert main(args) == 0
+            assert "Backed up" in capsys.readouterr().out
+            [path] = backup.list_backups(tmp_path)
+            assert path.endswith(".db.gz")
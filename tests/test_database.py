@@ -1,15 +1,22 @@
 import pytest
 import sqlite3
+from decimal import Decimal
 import tempfile
 import os
 from unittest.mock import patch
 
 from database import (
     init_db,
+    close_connections,
+    get_connection,
+    get_pragma_profile,
+    set_pragma_profile,
     create_sender,
     list_senders,
     update_sender,
     create_client,
+    get_client_id,
+    get_sender_id,
     list_clients,
     update_client,
     create_footer_message,
@@ -17,9 +24,24 @@ from database import (
     update_footer_message,
     create_invoice,
     list_invoices,
+    list_invoices_page,
+    iter_invoices,
+    list_clients_page,
+    list_senders_page,
     # update_invoice,
     add_invoice_item,
+    add_invoice_items,
     get_invoice_data,
+    get_invoice_data_many,
+    iter_invoice_data,
+    check_invoice_totals,
+    cache_stats,
+    change_token,
+    invalidate_cache,
+    transaction,
+    search,
+    search_clients,
+    search_invoices,
 )
 
 
@@ -33,6 +55,7 @@ def temp_db():
     with patch("database.DB_FILE", temp_db_path):
         init_db()
         yield temp_db_path
+        close_connections()
 
     # Clean up
     if os.path.exists(temp_db_path):
@@ -131,6 +154,24 @@ class TestClientOperations:
             client = next(c for c in clients if c[0] == client_id)
             assert client[1] == "Updated Client"
 
+    def test_integer_id_and_uuid_lookup(self, temp_db):
+        """Test that contacts get integer ids and can be found by their UUID"""
+        with patch("database.DB_FILE", temp_db):
+            client_id = create_client("Keyed Client")
+            sender_id = create_sender("Keyed Sender")
+            assert isinstance(client_id, int) and isinstance(sender_id, int)
+
+            conn = get_connection()
+            client_uuid = conn.execute(
+                "SELECT uuid FROM client WHERE id = ?", (client_id,)
+            ).fetchone()[0]
+            sender_uuid = conn.execute(
+                "SELECT uuid FROM sender WHERE id = ?", (sender_id,)
+            ).fetchone()[0]
+            assert get_client_id(client_uuid) == client_id
+            assert get_sender_id(sender_uuid) == sender_id
+            assert get_client_id("no-such-uuid") is None
+
     def test_create_client_validation(self, temp_db):
         """Test client creation validation"""
         with patch("database.DB_FILE", temp_db):
@@ -207,11 +248,18 @@ class TestInvoiceItemOperations:
 
             # Verify item exists using get_invoice_data
             invoice_data, items = get_invoice_data(invoice_id)
+            assert invoice_data[0] == invoice_id
+            assert invoice_data[11:13] == (sender_id, client_id)
             assert len(items) == 1
             assert items[0][0] == "Test Service"  # item_name field
             assert items[0][1] == 2  # amount field
             assert items[0][2] == 100.00  # cost_per_unit field
 
+    def test_get_invoice_data_missing_invoice(self, temp_db):
+        """Test that an unknown invoice id returns no data"""
+        with patch("database.DB_FILE", temp_db):
+            assert get_invoice_data(999) == (None, [])
+
     def test_add_invoice_item_validation(self, temp_db):
         """Test invoice item creation validation"""
         with patch("database.DB_FILE", temp_db):
@@ -232,3 +280,519 @@ class TestInvoiceItemOperations:
             with pytest.raises(ValueError, match="Cost per unit must be positive"):
                 add_invoice_item(invoice_id, "Service", 2, -100.00)
 
+    def test_add_invoice_items_bulk(self, temp_db):
+        """Test adding many items in one call"""
+        with patch("database.DB_FILE", temp_db):
+            sender_id = create_sender("Test Sender")
+            client_id = create_client("Test Client")
+            invoice_id = create_invoice(sender_id, client_id, None)
+            add_invoice_item(invoice_id, "Existing", 1, 10.00)
+
+            rows = [(f"Line {n}", n, 1.50) for n in range(1, 501)]
+            item_ids = add_invoice_items(invoice_id, rows)
+
+            assert len(item_ids) == 500
+            assert item_ids == sorted(item_ids)
+            _, items = get_invoice_data(invoice_id)
+            assert len(items) == 501
+            assert items[-1] == ("Line 500", 500, 1.50)
+
+    def test_add_invoice_items_rolls_back_on_bad_row(self, temp_db):
+        """Test that one invalid row rejects the whole batch"""
+        with patch("database.DB_FILE", temp_db):
+            sender_id = create_sender("Test Sender")
+            client_id = create_client("Test Client")
+            invoice_id = create_invoice(sender_id, client_id, None)
+
+            rows = [("Good", 1, 10.00), ("Bad", 0, 10.00), ("Also good", 2, 5.00)]
+            with pytest.raises(ValueError, match="Item 2: Amount must be positive"):
+                add_invoice_items(invoice_id, rows)
+
+            _, items = get_invoice_data(invoice_id)
+            assert items == []
+            assert add_invoice_items(invoice_id, []) == []
+
+
+
+class TestConnectionPool:
+    def test_connection_reused_within_thread(self, temp_db):
+        """Test that repeated calls on one thread share a connection"""
+        with patch("database.DB_FILE", temp_db):
+            assert get_connection() is get_connection()
+
+    def test_connection_per_thread(self, temp_db):
+        """Test that each thread gets its own connection"""
+        import threading
+
+        with patch("database.DB_FILE", temp_db):
+            main_conn = get_connection()
+            other = []
+            thread = threading.Thread(target=lambda: other.append(get_connection()))
+            thread.start()
+            thread.join()
+            assert other[0] is not main_conn
+
+    def test_close_connections_reopens(self, temp_db):
+        """Test that connections are reopened after close_connections"""
+        with patch("database.DB_FILE", temp_db):
+            conn = get_connection()
+            close_connections()
+            assert get_connection() is not conn
+            create_client("After Close")
+            assert len(list_clients()) == 1
+
+    def test_failed_write_rolls_back(self, temp_db):
+        """Test that an error inside a write leaves no partial changes"""
+        with patch("database.DB_FILE", temp_db):
+            with pytest.raises(ValueError, match="not found"):
+                update_client("missing-id", "Nobody")
+            assert not get_connection().in_transaction
+
+
+class TestPragmaProfiles:
+    def test_default_profile_uses_wal(self, temp_db):
+        """Test that pooled connections run in WAL mode"""
+        with patch("database.DB_FILE", temp_db):
+            conn = get_connection()
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2  # FULL
+
+    def test_switch_to_fast_bulk_profile(self, temp_db):
+        """Test that switching profiles reconfigures new connections"""
+        with patch("database.DB_FILE", temp_db):
+            try:
+                set_pragma_profile("fast-bulk")
+                conn = get_connection()
+                assert conn.execute("PRAGMA synchronous").fetchone()[0] == 0  # OFF
+                assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+            finally:
+                set_pragma_profile("durable")
+
+    def test_profile_from_environment(self, monkeypatch):
+        """Test that the profile can be selected with an environment variable"""
+        monkeypatch.setenv("PYNVOICE_DB_PROFILE", "fast_bulk")
+        assert get_pragma_profile()["synchronous"] == "OFF"
+
+    def test_unknown_profile_rejected(self):
+        """Test that unknown profile names raise a clear error"""
+        with pytest.raises(ValueError, match="Unknown database profile"):
+            get_pragma_profile("turbo")
+
+
+class TestQueryPlans:
+    def _plans(self, call):
+        """Run call() and return the query plan of every SELECT it issued"""
+        statements = []
+        conn = get_connection()
+        conn.set_trace_callback(statements.append)
+        try:
+            call()
+        finally:
+            conn.set_trace_callback(None)
+
+        plans = {}
+        for sql in statements:
+            if sql.lstrip().upper().startswith("SELECT"):
+                rows = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+                plans[sql] = " | ".join(row[3] for row in rows)
+        return plans
+
+    def test_list_invoices_uses_date_index(self, temp_db):
+        """Test that listing invoices walks the date index instead of sorting"""
+        with patch("database.DB_FILE", temp_db):
+            plans = self._plans(list_invoices)
+            assert any("idx_invoice_date_created" in p for p in plans.values())
+            assert not any("TEMP B-TREE" in p for p in plans.values())
+
+    def test_invoice_items_use_invoice_id_index(self, temp_db):
+        """Test that loading an invoice searches items by index"""
+        with patch("database.DB_FILE", temp_db):
+            sender_id = create_sender("Sender")
+            client_id = create_client("Client")
+            invoice_id = create_invoice(sender_id, client_id)
+            plans = self._plans(lambda: get_invoice_data(invoice_id))
+            assert any(
+                "SEARCH invoice_item USING INDEX idx_invoice_item_invoice_id" in p
+                for p in plans.values()
+            )
+            assert not any("SCAN invoice_item" in p for p in plans.values())
+
+    def test_get_invoice_data_is_one_statement(self, temp_db):
+        """Test that header and items are fetched in a single round trip"""
+        with patch("database.DB_FILE", temp_db):
+            sender_id = create_sender("Sender")
+            client_id = create_client("Client")
+            invoice_id = create_invoice(sender_id, client_id)
+            add_invoice_items(invoice_id, [("A", 1, 1), ("B", 2, 2)])
+
+            plans = self._plans(lambda: get_invoice_data(invoice_id))
+            assert len(plans) == 1
+
+    def test_invoice_indexes_exist(self, temp_db):
+        """Test that the foreign key and paid/date indexes are created"""
+        with patch("database.DB_FILE", temp_db):
+            indexes = {
+                row[0]
+                for row in get_connection().execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'index'"
+                )
+            }
+            assert {
+                "idx_invoice_item_invoice_id",
+                "idx_invoice_date_created",
+                "idx_invoice_client_report",
+                "idx_invoice_sender_report",
+                "idx_invoice_paid_report",
+            } <= indexes
+
+
+class TestPagination:
+    def test_invoice_pages_cover_every_row_once(self, temp_db):
+        """Test walking invoices page by page, newest first"""
+        with patch("database.DB_FILE", temp_db):
+            sender_id = create_sender("Sender")
+            client_id = create_client("Client")
+            created = [create_invoice(sender_id, client_id) for _ in range(7)]
+
+            seen, after, pages = [], None, 0
+            while True:
+                rows, after = list_invoices_page(page_size=3, after=after)
+                seen.extend(row[0] for row in rows)
+                pages += 1
+                if after is None:
+                    break
+
+            assert pages == 3
+            # Same timestamp for all rows, so ties are broken by id descending
+            assert seen == sorted(created, reverse=True)
+            assert seen == [row[0] for row in list_invoices()]
+
+    def test_iter_invoices_streams_in_batches(self, temp_db):
+        """Test that the iterator yields every row with small batches"""
+        with patch("database.DB_FILE", temp_db):
+            sender_id = create_sender("Sender")
+            client_id = create_client("Client")
+            for _ in range(5):
+                create_invoice(sender_id, client_id)
+            assert len(list(iter_invoices(batch_size=2))) == 5
+
+    def test_client_and_sender_pages_ordered_by_name(self, temp_db):
+        """Test name-ordered keyset pages for clients and senders"""
+        with patch("database.DB_FILE", temp_db):
+            for name in ["Delta", "alpha", "Charlie", "Bravo", "Alpha"]:
+                create_client(name)
+                create_sender(name)
+
+            first, after = list_clients_page(page_size=2)
+            second, after = list_clients_page(page_size=2, after=after)
+            third, after = list_clients_page(page_size=2, after=after)
+            names = [row[1] for row in first + second + third]
+            assert names == ["Alpha", "Bravo", "Charlie", "Delta", "alpha"]
+            assert after is None
+            assert [row[1] for row in list_clients()] == names
+
+            senders, after = list_senders_page(page_size=10)
+            assert [row[1] for row in senders] == names
+            assert after is None
+
+    def test_invalid_page_size(self, temp_db):
+        """Test that a zero page size is rejected"""
+        with patch("database.DB_FILE", temp_db):
+            with pytest.raises(ValueError, match="Page size must be positive"):
+                list_clients_page(page_size=0)
+
+
+class TestInvoiceTotals:
+    def _invoice(self):
+        sender_id = create_sender("Sender")
+        client_id = create_client("Client")
+        return create_invoice(sender_id, client_id)
+
+    def _stored(self, invoice_id):
+        """Stored (item_count, subtotal, grand_total); money in cents"""
+        return get_connection().execute(
+            "SELECT item_count, subtotal, grand_total FROM invoice WHERE id = ?",
+            (invoice_id,),
+        ).fetchone()
+
+    def test_triggers_track_item_changes(self, temp_db):
+        """Test that inserts, updates and deletes keep totals in step"""
+        with patch("database.DB_FILE", temp_db):
+            invoice_id = self._invoice()
+            assert self._stored(invoice_id) == (0, 0, 0)
+
+            add_invoice_items(invoice_id, [("A", 2, 10.00), ("B", 1, 5.50)])
+            assert self._stored(invoice_id) == (2, 2550, 2550)
+
+            conn = get_connection()
+            with conn:
+                conn.execute(
+                    "UPDATE invoice_item SET quantity = 3000 WHERE item_name = 'A'"
+                )
+            assert self._stored(invoice_id) == (2, 3550, 3550)
+
+            with conn:
+                conn.execute("DELETE FROM invoice_item WHERE item_name = 'B'")
+            assert self._stored(invoice_id) == (1, 3000, 3000)
+
+            invoices = list_invoices()
+            assert invoices[0][5:] == (1, Decimal("30.00"))
+
+    def test_moving_item_between_invoices(self, temp_db):
+        """Test that re-parenting an item updates both invoices"""
+        with patch("database.DB_FILE", temp_db):
+            first = self._invoice()
+            second = self._invoice()
+            add_invoice_item(first, "A", 1, 100.00)
+
+            conn = get_connection()
+            with conn:
+                conn.execute("UPDATE invoice_item SET invoice_id = ?", (second,))
+            assert self._stored(first) == (0, 0, 0)
+            assert self._stored(second) == (1, 10000, 10000)
+
+    def test_check_and_repair_totals(self, temp_db):
+        """Test detecting and repairing totals that drifted from the items"""
+        with patch("database.DB_FILE", temp_db):
+            invoice_id = self._invoice()
+            add_invoice_item(invoice_id, "A", 4, 25.00)
+            assert check_invoice_totals() == []
+
+            conn = get_connection()
+            with conn:
+                conn.execute("UPDATE invoice SET grand_total = 1, item_count = 9")
+
+            mismatches = check_invoice_totals(repair=True)
+            assert mismatches == [(invoice_id, 9, 1, Decimal("0.01"), Decimal("100"))]
+            assert check_invoice_totals() == []
+            assert self._stored(invoice_id) == (1, 10000, 10000)
+
+
+class TestExactMoney:
+    def test_item_amounts_round_trip_exactly(self, temp_db):
+        """Test that prices that are inexact as floats come back exact"""
+        with patch("database.DB_FILE", temp_db):
+            sender_id = create_sender("Sender")
+            client_id = create_client("Client")
+            invoice_id = create_invoice(sender_id, client_id)
+            add_invoice_items(
+                invoice_id, [("A", "0.1", "0.10")] * 10 + [("B", 1.25, 19.99)]
+            )
+
+            _, items = get_invoice_data(invoice_id)
+            assert items[0] == ("A", Decimal("0.1"), Decimal("0.10"))
+            assert items[-1] == ("B", Decimal("1.25"), Decimal("19.99"))
+            # 10 x 1 cent + 1.25 x 19.99 = 24.9875 -> 24.99
+            assert list_invoices()[0][6] == Decimal("25.09")
+
+    def test_non_numeric_amount_rejected(self, temp_db):
+        """Test that amounts that are not numbers get a clear error"""
+        with patch("database.DB_FILE", temp_db):
+            with pytest.raises(ValueError, match="Amount must be a number"):
+                add_invoice_item(1, "Service", "lots", 10)
+            with pytest.raises(ValueError, match="Amount must be positive"):
+                add_invoice_item(1, "Service", "0.0001", 10)
+
+
+class TestBatchedInvoiceData:
+    def _make_invoices(self, count):
+        sender_id = create_sender("Sender")
+        clients = [create_client("Client A"), create_client("Client B")]
+        invoice_ids = []
+        for n in range(count):
+            invoice_id = create_invoice(sender_id, clients[n % 2], paid=n % 3 == 0)
+            add_invoice_items(
+                invoice_id, [(f"Item {n}-{k}", 1, n + 1) for k in range(n % 4)]
+            )
+            invoice_ids.append(invoice_id)
+        return invoice_ids, clients
+
+    def test_many_matches_single_lookups(self, temp_db):
+        """Test that batched results equal per-invoice results"""
+        with patch("database.DB_FILE", temp_db):
+            invoice_ids, _ = self._make_invoices(10)
+            wanted = list(reversed(invoice_ids)) + [999]
+
+            result = get_invoice_data_many(wanted)
+
+            assert list(result) == list(reversed(invoice_ids))
+            for invoice_id in invoice_ids:
+                assert result[invoice_id] == get_invoice_data(invoice_id)
+            assert get_invoice_data_many([]) == {}
+
+    def test_many_uses_constant_queries(self, temp_db):
+        """Test that the number of statements does not grow with the batch"""
+        with patch("database.DB_FILE", temp_db):
+            invoice_ids, _ = self._make_invoices(30)
+            statements = []
+            conn = get_connection()
+            conn.set_trace_callback(statements.append)
+            try:
+                get_invoice_data_many(invoice_ids)
+            finally:
+                conn.set_trace_callback(None)
+            selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+            assert len(selects) == 2
+
+    def test_iter_invoice_data_filters_and_batches(self, temp_db):
+        """Test walking invoices in batches with range and filters"""
+        with patch("database.DB_FILE", temp_db):
+            invoice_ids, clients = self._make_invoices(12)
+
+            everything = [data[0] for data, _ in iter_invoice_data(batch_size=5)]
+            assert everything == invoice_ids
+
+            in_range = [
+                data[0]
+                for data, _ in iter_invoice_data(
+                    start_id=invoice_ids[2], end_id=invoice_ids[6], batch_size=2
+                )
+            ]
+            assert in_range == invoice_ids[2:7]
+
+            paid = [data[0] for data, _ in iter_invoice_data(paid=True)]
+            assert paid == invoice_ids[::3]
+
+            for data, _ in iter_invoice_data(client_id=clients[1]):
+                assert data[12] == clients[1]
+
+
+class TestReferenceCache:
+    def test_repeated_reads_hit_cache(self, temp_db):
+        """Test that unchanged reference tables are served from the cache"""
+        with patch("database.DB_FILE", temp_db):
+            create_sender("Sender")
+            invalidate_cache()
+            before = cache_stats()
+            first = list_senders()
+            assert list_senders() == first
+            assert list_senders() == first
+            after = cache_stats()
+            assert after["misses"] - before["misses"] == 1
+            assert after["hits"] - before["hits"] == 2
+
+    def test_writes_invalidate(self, temp_db):
+        """Test that create and update calls refresh the cached lists"""
+        with patch("database.DB_FILE", temp_db):
+            client_id = create_client("Before")
+            assert [c.name for c in list_clients()] == ["Before"]
+            update_client(client_id, "After")
+            assert [c.name for c in list_clients()] == ["After"]
+
+            footer_id = create_footer_message("One")
+            assert len(list_footer_messages()) == 1
+            update_footer_message(footer_id, "Two")
+            assert list_footer_messages()[0].message == "Two"
+
+    def test_other_connection_invalidates(self, temp_db):
+        """Test that a commit from another connection is picked up"""
+        with patch("database.DB_FILE", temp_db):
+            create_client("Mine")
+            assert len(list_clients()) == 1
+
+            other = sqlite3.connect(temp_db)
+            other.execute("INSERT INTO client (name) VALUES ('Theirs')")
+            other.commit()
+            other.close()
+
+            assert [c.name for c in list_clients()] == ["Mine", "Theirs"]
+
+    def test_not_cached_inside_transaction(self, temp_db):
+        """Test that uncommitted rows never reach the cache"""
+        with patch("database.DB_FILE", temp_db):
+            with pytest.raises(RuntimeError):
+                with transaction() as c:
+                    c.execute("INSERT INTO sender (name) VALUES ('Tmp')")
+                    assert len(list_senders()) == 1
+                    raise RuntimeError("roll back")
+            assert list_senders() == []
+
+
+class TestChangeToken:
+    def test_token_tracks_each_table(self, temp_db):
+        """Test that writes move only the token of the table written"""
+        with patch("database.DB_FILE", temp_db):
+            start = change_token("sender", "client")
+            client_id = create_client("Client")
+            after_create = change_token("sender", "client")
+            assert after_create[0] == start[0]
+            assert after_create[1] != start[1]
+
+            update_client(client_id, "Renamed")
+            assert change_token("client") != after_create[1:]
+            assert change_token("client") == change_token("client")
+
+    def test_item_changes_move_invoice_token(self, temp_db):
+        """Test that adding items counts as an invoice change"""
+        with patch("database.DB_FILE", temp_db):
+            invoice_id = create_invoice(create_sender("S"), create_client("C"))
+            before = change_token("invoice")
+            add_invoice_item(invoice_id, "Work", 1, 10)
+            assert change_token("invoice") != before
+
+    def test_other_connection_moves_token(self, temp_db):
+        """Test that commits from outside the pool are seen"""
+        with patch("database.DB_FILE", temp_db):
+            before = change_token()
+            other = sqlite3.connect(temp_db)
+            other.execute("INSERT INTO footer_message (message) VALUES ('Hi')")
+            other.commit()
+            other.close()
+            assert change_token() != before
+
+    def test_unknown_table(self, temp_db):
+        """Test that untracked tables are rejected"""
+        with patch("database.DB_FILE", temp_db):
+            with pytest.raises(ValueError, match="not tracked"):
+                change_token("invoice_item")
+
+
+class TestSearch:
+    def _make_data(self):
+        sender_id = create_sender("Acme Supplies", email="hello@acme.test")
+        globex = create_client("Globex Corporation", "1 Main St")
+        initech = create_client("Initech")
+        invoice_id = create_invoice(sender_id, globex)
+        add_invoice_items(invoice_id, [("Website redesign", 1, 900), ("Hosting", 12, 5)])
+        create_footer_message("Thank you for choosing Acme")
+        return sender_id, globex, initech, invoice_id
+
+    def test_prefix_matching_across_tables(self, temp_db):
+        """Test that partial words find senders, clients, messages and items"""
+        with patch("database.DB_FILE", temp_db):
+            sender_id, globex, _, invoice_id = self._make_data()
+
+            kinds = {(hit.kind, hit.id) for hit in search("acm")}
+            assert kinds == {("sender", sender_id), ("footer_message", 1)}
+
+            hits = search("web redes")
+            assert [(hit.kind, hit.id, hit.title) for hit in hits] == [
+                ("invoice_item", invoice_id, "Website redesign")
+            ]
+            assert [c.id for c in search_clients("glo")] == [globex]
+
+    def test_index_follows_updates(self, temp_db):
+        """Test that the triggers keep the index in step with edits"""
+        with patch("database.DB_FILE", temp_db):
+            _, globex, _, _ = self._make_data()
+            update_client(globex, "Hooli")
+            assert search_clients("globex") == []
+            assert [c.name for c in search_clients("hooli")] == ["Hooli"]
+
+    def test_invoices_found_by_item_or_contact(self, temp_db):
+        """Test that invoice search covers item text and contact names"""
+        with patch("database.DB_FILE", temp_db):
+            sender_id, _, initech, invoice_id = self._make_data()
+            other_id = create_invoice(sender_id, initech)
+
+            assert [i.id for i in search_invoices("hosting")] == [invoice_id]
+            assert [i.id for i in search_invoices("initech")] == [other_id]
+            assert {i.id for i in search_invoices("acme")} == {invoice_id, other_id}
+
+    def test_operators_taken_literally(self, temp_db):
+        """Test that FTS syntax in user input cannot break the query"""
+        with patch("database.DB_FILE", temp_db):
+            self._make_data()
+            assert search('"') == []
+            assert search("NOT") == []
+            assert [hit.title for hit in search("glo* (")] == ["Globex Corporation"]
@@ -0,0 +1,132 @@
+import csv
+import gzip
+import json
+from unittest.mock import patch
+
+import pytest
+
+from database import (
+    create_client,
+    create_sender,
+    get_connection,
+    get_invoice_data,
+    list_invoices,
+)
+from cli import main
+from exporter import export_invoices, iter_export_rows
+from importer import import_file
+
+
+def _setup(make_invoice):
+    sender = create_sender("Acme")
+    globex = create_client("Globex")
+    initech = create_client("Initech")
+    first = make_invoice(
+        sender,
+        globex,
+        "2024-01-10 09:00:00",
+        [("Design", 1.5, 80), ("Hosting", 1, 19.99)],
+    )
+    second = make_invoice(sender, initech, "2024-02-01 09:00:00", [], paid=True)
+    third = make_invoice(sender, globex, "2023-12-31 09:00:00", [("Audit", 2, 100)])
+    return globex, [third, first, second]
+
+
+class TestExport:
+    def test_csv_rows(self, temp_db, tmp_path, make_invoice):
+        """Test one CSV row per item, in date order, with exact amounts"""
+        with patch("database.DB_FILE", temp_db):
+            _, (third, first, second) = _setup(make_invoice)
+            path = tmp_path / "invoices.csv"
+            result = export_invoices(path)
+
+            with open(path, newline="", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+            assert [(r["invoice_id"], r["item_name"]) for r in rows] == [
+                (str(third), "Audit"),
+                (str(first), "Design"),
+                (str(first), "Hosting"),
+                (str(second), ""),
+            ]
+            assert rows[1]["amount"] == "1.5"
+            assert rows[2]["cost_per_unit"] == "19.99"
+            assert rows[1]["grand_total"] == "139.99"
+            assert rows[3]["paid"] == "True"
+            assert (result.invoices, result.rows) == (3, 4)
+
+    def test_jsonl_with_filters_and_gzip(self, temp_db, tmp_path, make_invoice):
+        """Test the date, client and paid filters on gzipped JSONL"""
+        with patch("database.DB_FILE", temp_db):
+            globex, (_, first, _) = _setup(make_invoice)
+            path = tmp_path / "invoices.jsonl.gz"
+            result = export_invoices(
+                path, start="2024-01-01", end="2025-01-01", client_id=globex, paid=False
+            )
+
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                records = [json.loads(line) for line in f]
+            assert [r["invoice_id"] for r in records] == [first]
+            assert records[0]["client_name"] == "Globex"
+            assert records[0]["items"] == [
+                {
+                    "item_name": "Design",
+                    "amount": "1.5",
+                    "cost_per_unit": "80.00",
+                    "line_total": "120.00",
+                },
+                {
+                    "item_name": "Hosting",
+                    "amount": "1",
+                    "cost_per_unit": "19.99",
+                    "line_total": "19.99",
+                },
+            ]
+            assert result.invoices == 1
+
+    def test_rows_are_streamed(self, temp_db, make_invoice):
+        """Test that rows are fetched in batches rather than all at once"""
+        with patch("database.DB_FILE", temp_db):
+            _setup(make_invoice)
+            rows = iter_export_rows(batch_size=1)
+            assert next(rows)[-4] == "Audit"
+            rows.close()
+
+    def test_round_trip_through_importer(self, temp_db, tmp_path, make_invoice):
+        """Test that an exported CSV can be imported again"""
+        with patch("database.DB_FILE", temp_db):
+            _, (third, _, _) = _setup(make_invoice)
+            conn = get_connection()
+            conn.execute("UPDATE sender SET external_key = 'S1'")
+            conn.execute("UPDATE client SET external_key = 'C-' || name")
+            conn.execute("UPDATE invoice SET external_key = 'I' || id")
+            conn.commit()
+            path = tmp_path / "invoices.csv"
+            export_invoices(path)
+
+            conn.execute("DELETE FROM invoice_item")
+            conn.commit()
+            result = import_file("invoices", path)
+            assert result.rows == 3
+            assert len(list_invoices()) == 3
+            invoice, items = get_invoice_data(third)
+            assert [(i.item_name, i.amount) for i in items] == [("Audit", 2)]
+
+    def test_cli_client_filter(self, temp_db, tmp_path, make_invoice):
+        """Test the export command with --client, and a client id as a string"""
+        with patch("database.DB_FILE", temp_db):
+            globex, (third, first, _) = _setup(make_invoice)
+            path = tmp_path / "globex.jsonl"
+            args = ["--db", temp_db, "export", str(path), "--client", str(globex)]
+            assert main(args) == 0
+
+            with open(path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f]
+            assert [r["invoice_id"] for r in records] == [third, first]
+            rows = iter_export_rows(client_id=str(globex))
+            assert {row[0] for row in rows} == {third, first}
+
+    def test_unknown_format(self, temp_db, tmp_path):
+        """Test that an unrecognised extension is rejected"""
+        with patch("database.DB_FILE", temp_db):
+            with pytest.raises(ValueError, match="Cannot tell the format"):
+                export_invoices(tmp_path / "invoices.xlsx")
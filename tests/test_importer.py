@@ -0,0 +1,182 @@
+import json
+import pytest
+from unittest.mock import patch
+
+from database import get_invoice_data, list_clients, list_invoices, list_senders
+from importer import import_file
+
+
+def write_csv(path, text):
+    path.write_text(text.strip() + "\n", encoding="utf-8")
+    return path
+
+
+def write_jsonl(path, records):
+    path.write_text("\n".join(json.dumps(r) for r in records) + "\n", encoding="utf-8")
+    return path
+
+
+class TestContactImport:
+    def test_import_clients_csv(self, temp_db, tmp_path):
+        """Test importing clients from CSV in several chunks"""
+        lines = ["name,address,email,external_key"]
+        lines += [f"Client {n},{n} Main St,c{n}@example.com,C{n}" for n in range(25)]
+        path = write_csv(tmp_path / "clients.csv", "\n".join(lines))
+        chunks = []
+
+        with patch("database.DB_FILE", temp_db):
+            result = import_file("clients", path, chunk_size=10, progress=chunks.append)
+
+            assert result.rows == 25
+            assert chunks == [10, 20, 25]
+            assert result.rows_per_second > 0
+            assert len(list_clients()) == 25
+
+    def test_reimport_upserts_by_external_key(self, temp_db, tmp_path):
+        """Test that importing the same keys again updates instead of duplicating"""
+        with patch("database.DB_FILE", temp_db):
+            import_file(
+                "senders",
+                write_csv(tmp_path / "a.csv", "name,phone,external_key\nOld Name,555,S1"),
+            )
+            import_file(
+                "senders",
+                write_csv(tmp_path / "b.csv", "name,phone,external_key\nNew Name,777,S1"),
+            )
+
+            senders = list_senders()
+            assert len(senders) == 1
+            assert senders[0][1] == "New Name"
+            assert senders[0][4] == "777"
+
+    def test_custom_key_field(self, temp_db, tmp_path):
+        """Test upserting on a differently named key column"""
+        path = write_jsonl(tmp_path / "c.jsonl", [{"name": "Acme", "legacy_id": 7}])
+        with patch("database.DB_FILE", temp_db):
+            import_file("clients", path, key="legacy_id")
+            import_file("clients", path, key="legacy_id")
+            assert len(list_clients()) == 1
+
+    def test_missing_name_rejected(self, temp_db, tmp_path):
+        """Test that a record without a name is reported with its position"""
+        path = write_csv(tmp_path / "bad.csv", "name,email\nGood,g@x.com\n,b@x.com")
+        with patch("database.DB_FILE", temp_db):
+            with pytest.raises(ValueError, match="Record 2: name is required"):
+                import_file("clients", path)
+
+
+class TestInvoiceImport:
+    @pytest.fixture
+    def contacts(self, temp_db, tmp_path):
+        with patch("database.DB_FILE", temp_db):
+            import_file(
+                "senders", write_csv(tmp_path / "s.csv", "name,external_key\nMe,S1")
+            )
+            import_file(
+                "clients", write_csv(tmp_path / "c.csv", "name,external_key\nYou,C1")
+            )
+
+    def test_import_invoices_jsonl(self, temp_db, tmp_path, contacts):
+        """Test importing invoices with nested items from JSONL"""
+        records = [
+            {
+                "external_key": "INV-1",
+                "sender_key": "S1",
+                "client_key": "C1",
+                "paid": True,
+                "date_created": "2024-03-01 09:00:00",
+                "items": [
+                    {"item_name": "Hours", "amount": 10, "cost_per_unit": 50},
+                    {"item_name": "Travel", "amount": 1, "cost_per_unit": 80},
+                ],
+            }
+        ]
+        path = write_jsonl(tmp_path / "invoices.jsonl", records)
+
+        with patch("database.DB_FILE", temp_db):
+            import_file("invoices", path)
+            import_file("invoices", path)  # upsert replaces items
+
+            invoices = list_invoices()
+            assert len(invoices) == 1
+            invoice_data, items = get_invoice_data(invoices[0][0])
+            assert invoice_data[1] == "2024-03-01 09:00:00"
+            assert invoice_data[2] == 1
+            assert [item[0] for item in items] == ["Hours", "Travel"]
+
+    def test_import_invoices_csv_groups_rows(self, temp_db, tmp_path, contacts):
+        """Test that consecutive CSV rows with one key become one invoice"""
+        path = write_csv(
+            tmp_path / "invoices.csv",
+            """
+external_key,sender_key,client_key,paid,item_name,amount,cost_per_unit
+INV-1,S1,C1,no,Design,2,100
+INV-1,S1,C1,no,Review,1,40
+INV-2,S1,C1,yes,Support,3,25
+""",
+        )
+        with patch("database.DB_FILE", temp_db):
+            result = import_file("invoices", path)
+
+            assert result.rows == 2
+            item_counts = sorted(
+                len(get_invoice_data(invoice[0])[1]) for invoice in list_invoices()
+            )
+            assert item_counts == [1, 2]
+
+    def test_csv_rows_without_key_are_separate_invoices(
+        self, temp_db, tmp_path, contacts
+    ):
+        """Test that keyless CSV rows are not folded into one invoice"""
+        path = write_csv(
+            tmp_path / "invoices.csv",
+            """
+sender_key,client_key,paid,date_created,item_name,amount,cost_per_unit
+S1,C1,no,2024-01-01 09:00:00,Design,2,100
+S1,C1,yes,2024-02-01 09:00:00,Review,1,40
+S1,C1,no,2024-03-01 09:00:00,Support,3,25
+""",
+        )
+        with patch("database.DB_FILE", temp_db):
+            assert import_file("invoices", path).rows == 3
+
+            invoices = [get_invoice_data(row[0]) for row in list_invoices()]
+            assert sorted(
+                (data.date_created, data.paid, [item.item_name for item in items])
+                for data, items in invoices
+            ) == [
+                ("2024-01-01 09:00:00", 0, ["Design"]),
+                ("2024-02-01 09:00:00", 1, ["Review"]),
+                ("2024-03-01 09:00:00", 0, ["Support"]),
+            ]
+
+    def test_csv_keyless_row_between_keyed_runs(self, temp_db, tmp_path, contacts):
+        """Test that a keyless row does not join the keyed invoices around it"""
+        path = write_csv(
+            tmp_path / "invoices.csv",
+            """
+external_key,sender_key,client_key,item_name,amount,cost_per_unit
+INV-1,S1,C1,Design,2,100
+INV-1,S1,C1,Review,1,40
+,S1,C1,Hosting,1,20
+INV-2,S1,C1,Support,3,25
+INV-2,S1,C1,Travel,1,80
+""",
+        )
+        with patch("database.DB_FILE", temp_db):
+            assert import_file("invoices", path).rows == 3
+            item_counts = sorted(
+                len(get_invoice_data(invoice[0])[1]) for invoice in list_invoices()
+            )
+            assert item_counts == [1, 2, 2]
+
+    def test_unknown_client_rejected(self, temp_db, tmp_path, contacts):
+        """Test that invoices must reference imported clients"""
+        path = write_jsonl(
+            tmp_path / "bad.jsonl",
+            [{"external_key": "X", "sender_key": "S1", "client_key": "nope"}],
+        )
+        with patch("database.DB_FILE", temp_db):
+            with pytest.raises(ValueError, match="unknown client 'nope'"):
+                import_file("invoices", path)
+            assert list_invoices() == []
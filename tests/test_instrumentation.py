@@ -0,0 +1,125 @@
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+import database
+import instrumentation
+import pdf_generator
+import reports
+from instrumentation import Timing
+
+
+@pytest.fixture
+def instrumented(temp_db, tmp_path):
+    slow_log = tmp_path / "slow.log"
+    with patch("database.DB_FILE", temp_db):
+        instrumentation.reset()
+        instrumentation.enable(slow_ms=1000, slow_log=str(slow_log))
+        yield slow_log
+        instrumentation.disable()
+        instrumentation.reset()
+
+
+class TestInstrumentation:
+    def test_functions_and_statements_are_timed(self, instrumented):
+        """Test that public calls, their statements and commits are counted"""
+        original = instrumentation._state.originals["create_client"]
+        assert database.create_client is not original
+
+        database.create_client("Timed Client")
+        database.list_clients()
+
+        stats = instrumentation.stats()
+        assert stats[("function", "create_client")]["count"] == 1
+        assert stats[("function", "list_clients")]["count"] == 1
+        assert stats[("statement", "COMMIT")]["count"] >= 1
+        assert any(
+            kind == "statement" and name.startswith("INSERT INTO client")
+            for kind, name in stats
+        )
+        assert isinstance(
+            database.get_connection(), instrumentation.InstrumentedConnection
+        )
+
+    def test_names_imported_from_database_are_timed(self, instrumented):
+        """Test that "from database import" names in other modules are wrapped"""
+        original = instrumentation._state.originals["get_invoice_data"]
+        assert pdf_generator.get_invoice_data is database.get_invoice_data
+        assert pdf_generator.get_invoice_data is not original
+
+        reports.clear_cache()
+        reports.aging_report()
+        assert ("function", "change_token") in instrumentation.stats()
+
+        instrumentation.disable()
+        assert pdf_generator.get_invoice_data is original
+
+    def test_iterators_are_not_timed(self, instrumented):
+        """Test that functions returning generators are left unwrapped"""
+        for name in ("iter_senders", "iter_clients", "iter_invoices"):
+            assert name not in instrumentation._state.originals
+        database.create_client("Walked")
+        assert [client.name for client in database.iter_clients()] == ["Walked"]
+        stats = instrumentation.stats()
+        assert ("function", "iter_clients") not in stats
+        assert any(
+            kind == "statement" and "FROM client" in name for kind, name in stats
+        )
+
+    def test_slow_log(self, instrumented):
+        """Test that calls over the threshold are appended to the slow log"""
+        database.create_client("Fast")
+        assert not instrumented.exists()
+
+        instrumentation.enable(slow_ms=0, slow_log=str(instrumented))
+        database.create_client("Slow")
+        lines = instrumented.read_text(encoding="utf-8").splitlines()
+        assert any(
+            line.split("\t")[2:] == ["function", "create_client"] for line in lines
+        )
+        # Parameters stay out of the log
+        assert not any("Slow" in line for line in lines)
+
+    def test_disable_restores_plain_functions(self, instrumented):
+        """Test that disabling removes the wrappers and instrumented connections"""
+        original = instrumentation._state.originals["create_client"]
+        instrumentation.disable()
+        assert database.create_client is original
+        assert type(database.get_connection()) is sqlite3.Connection
+        assert not instrumentation.is_enabled()
+
+    def test_summary(self, instrumented):
+        """Test that the summary lists timed names, slowest first"""
+        database.create_client("Summarised")
+        text = instrumentation.summary()
+        assert text.splitlines()[0].split()[:2] == ["kind", "calls"]
+        assert "create_client" in text
+
+
+class TestTiming:
+    def test_histogram_and_percentile(self):
+        """Test bucket counts and the bucket-based percentile"""
+        timing = Timing()
+        for ms in (0.5, 0.5, 3, 40, 2500):
+            timing.add(ms / 1000)
+        assert timing.count == 5
+        assert timing.as_dict()["buckets"] == {
+            "<=1ms": 2,
+            "<=5ms": 1,
+            "<=10ms": 0,
+            "<=50ms": 1,
+            "<=100ms": 0,
+            "<=500ms": 0,
+            "<=1000ms": 0,
+            "slower": 1,
+        }
+        assert timing.percentile(0.5) == 5
+        assert timing.percentile(1.0) == pytest.approx(2500)
+
+    def test_enabled_from_env(self):
+        """Test the PYNVOICE_INSTRUMENT switch"""
+        with patch.dict("os.environ", {"PYNVOICE_INSTRUMENT": "1"}):
+            assert instrumentation.enabled_from_env()
+        with patch.dict("os.environ", {"PYNVOICE_INSTRUMENT": "off"}):
+            assert not instrumentation.enabled_from_env()
@@ -0,0 +1,102 @@
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+import maintenance
+from cli import main
+from database import (
+    add_invoice_items,
+    create_client,
+    create_invoice,
+    create_sender,
+    get_connection,
+)
+
+
+def _fill(invoices=200):
+    sender = create_sender("Acme")
+    client = create_client("Globex")
+    for _ in range(invoices):
+        add_invoice_items(create_invoice(sender, client), [("Work " * 40, 1, 10)])
+
+
+class TestMaintenance:
+    def test_new_databases_use_incremental_vacuum(self, temp_db):
+        """Test that the migration leaves the file in incremental mode"""
+        with patch("database.DB_FILE", temp_db):
+            assert maintenance.incremental_enabled()
+
+    def test_analyze(self, temp_db):
+        """Test that every table gets planner statistics"""
+        with patch("database.DB_FILE", temp_db):
+            _fill()
+            analyzed, done = maintenance.analyze()
+            assert done
+            assert {"invoice", "invoice_item", "client"} <= set(analyzed)
+            tables = {
+                row[0]
+                for row in get_connection().execute("SELECT tbl FROM sqlite_stat1")
+            }
+            assert "invoice_item" in tables
+
+    def test_analyze_out_of_time(self, temp_db):
+        """Test that a spent budget stops before the next table"""
+        with patch("database.DB_FILE", temp_db):
+            assert maintenance.analyze(budget=0) == ([], False)
+
+    def test_incremental_vacuum_frees_pages(self, temp_db):
+        """Test that deleted rows' pages go back to the file system"""
+        with patch("database.DB_FILE", temp_db):
+            _fill()
+            conn = get_connection()
+            conn.execute("DELETE FROM invoice_item")
+            conn.commit()
+            free = maintenance.free_pages()
+            assert free > 10
+
+            freed, remaining = maintenance.incremental_vacuum(pages=4)
+            assert (freed, remaining) == (free, 0)
+            assert maintenance.free_pages() == 0
+
+    def test_incremental_vacuum_needs_the_mode(self, tmp_path):
+        """Test the error for a file created without incremental vacuum"""
+        path = str(tmp_path / "plain.db")
+        sqlite3.connect(path).close()
+        with patch("database.DB_FILE", path):
+            with pytest.raises(ValueError, match="full vacuum"):
+                maintenance.incremental_vacuum()
+            maintenance.full_vacuum()
+            assert maintenance.incremental_enabled()
+
+    def test_check(self, temp_db):
+        """Test quick_check, integrity_check and a check out of time"""
+        with patch("database.DB_FILE", temp_db):
+            _fill()
+            assert maintenance.check() == []
+            assert maintenance.check(full=True) == []
+            assert maintenance.check(budget=0) is None
+            # The progress handler is removed again
+            assert get_connection().execute("SELECT 1").fetchone() == (1,)
+
+    def test_run_maintenance(self, temp_db):
+        """Test a full run within its budget"""
+        with patch("database.DB_FILE", temp_db):
+            _fill()
+            result = maintenance.run_maintenance(budget=None)
+            assert result.complete
+            assert result.analyzed and result.problems == []
+            assert result.free_pages == 0
+
+            result = maintenance.run_maintenance(budget=0)
+            assert not result.complete
+            assert result.problems is None
+
+    def test_cli(self, temp_db, capsys):
+        """Test the maintain command"""
+        with patch("database.DB_FILE", temp_db):
+            _fill(10)
+            assert main(["--db", temp_db, "maintain", "--budget", "0"]) == 0
+            out = capsys.readouterr().out
+            assert "Analyzed" in out
+            assert "Integrity check passed" in out
@@ -0,0 +1,184 @@
+import pytest
+import sqlite3
+from unittest.mock import patch
+
+import migrations
+from migrations import MIGRATIONS, SCHEMA_VERSION, get_schema_version, migrate
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """Fresh connection to an empty database file"""
+    connection = sqlite3.connect(tmp_path / "migrate.db")
+    yield connection
+    connection.close()
+
+
+class TestMigrations:
+    def test_fresh_database_is_brought_to_latest(self, conn):
+        """Test that an empty database receives every migration"""
+        applied = migrate(conn)
+        assert applied == [version for version, _, _ in MIGRATIONS]
+        assert get_schema_version(conn) == SCHEMA_VERSION
+
+    def test_current_database_is_left_alone(self, conn):
+        """Test that a second run applies nothing"""
+        migrate(conn)
+        assert migrate(conn) == []
+        assert not conn.in_transaction
+
+    def test_legacy_database_gains_paid_column(self, conn):
+        """Test upgrading a database created before versioning existed"""
+        conn.execute(
+            """
+            CREATE TABLE invoice (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sender_id TEXT NOT NULL,
+                client_id TEXT NOT NULL,
+                footer_message_id INTEGER,
+                date_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """
+        )
+        conn.execute("INSERT INTO invoice (sender_id, client_id) VALUES ('s', 'c')")
+        conn.commit()
+
+        migrate(conn)
+
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(invoice)")}
+        assert "paid" in columns
+        assert conn.execute("SELECT COUNT(*) FROM invoice").fetchone()[0] == 1
+
+    def test_failed_migration_rolls_back(self, conn):
+        """Test that a failing migration leaves schema and version untouched"""
+
+        def broken(c):
+            c.execute("CREATE TABLE half_done (id INTEGER)")
+            raise RuntimeError("boom")
+
+        with patch.object(
+            migrations, "MIGRATIONS", MIGRATIONS + [(SCHEMA_VERSION + 1, "Broken", broken)]
+        ), patch.object(migrations, "SCHEMA_VERSION", SCHEMA_VERSION + 1):
+            with pytest.raises(RuntimeError, match="boom"):
+                migrate(conn)
+
+        assert get_schema_version(conn) == 0
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+        assert "half_done" not in tables
+        assert "invoice" not in tables
+
+    def test_old_sqlite_is_refused(self, conn):
+        """Test that an SQLite without DROP COLUMN and RETURNING fails up front"""
+        with patch.object(sqlite3, "sqlite_version_info", (3, 31, 1)), patch.object(
+            sqlite3, "sqlite_version", "3.31.1"
+        ):
+            with pytest.raises(sqlite3.NotSupportedError, match="3.35.0 or newer"):
+                migrate(conn)
+
+        assert get_schema_version(conn) == 0
+        assert not conn.in_transaction
+
+    def test_totals_backfilled_for_existing_items(self, conn):
+        """Test that upgrading computes totals for invoices that have items"""
+        migrate(conn, target=4)
+        conn.execute("INSERT INTO invoice (sender_id, client_id) VALUES ('s', 'c')")
+        conn.executemany(
+            "INSERT INTO invoice_item (invoice_id, item_name, amount, cost_per_unit) "
+            "VALUES (1, ?, ?, ?)",
+            [("A", 2, 10.0), ("B", 3, 1.5)],
+        )
+        conn.commit()
+
+        migrate(conn, target=5)
+
+        row = conn.execute(
+            "SELECT item_count, subtotal, grand_total FROM invoice"
+        ).fetchone()
+        assert row == (2, 24.5, 24.5)
+
+    def test_real_amounts_converted_to_integer_cents(self, conn):
+        """Test that REAL item amounts become exact integers"""
+        migrate(conn, target=5)
+        conn.execute("INSERT INTO invoice (sender_id, client_id) VALUES ('s', 'c')")
+        conn.executemany(
+            "INSERT INTO invoice_item (invoice_id, item_name, amount, cost_per_unit) "
+            "VALUES (1, ?, ?, ?)",
+            [("Hours", 1.5, 0.33), ("Licence", 3, 19.99)],
+        )
+        conn.commit()
+
+        migrate(conn)
+
+        items = conn.execute(
+            "SELECT quantity, unit_price, line_total FROM invoice_item ORDER BY id"
+        ).fetchall()
+        # 1.5 x $0.33 = $0.495, rounded half up to 50 cents
+        assert items == [(1500, 33, 50), (3000, 1999, 5997)]
+        row = conn.execute(
+            "SELECT item_count, subtotal, grand_total FROM invoice"
+        ).fetchone()
+        assert row == (2, 6047, 6047)
+        assert all(isinstance(value, int) for value in row)
+
+    def test_search_index_built_for_existing_rows(self, conn):
+        """Test that rows written before the FTS migration are searchable"""
+        migrate(conn, target=7)
+        conn.execute("INSERT INTO client (id, name) VALUES ('c1', 'Globex Corporation')")
+        conn.commit()
+
+        migrate(conn, target=8)
+
+        hits = conn.execute(
+            "SELECT rowid FROM client_fts WHERE client_fts MATCH 'glob*'"
+        ).fetchall()
+        assert len(hits) == 1
+
+    def test_contact_keys_become_integers(self, conn):
+        """Test that UUID text keys are renumbered and invoices follow them"""
+        migrate(conn, target=9)
+        conn.execute("INSERT INTO sender (id, name) VALUES ('s-uuid', 'Acme')")
+        conn.execute("INSERT INTO client (id, name) VALUES ('c-uuid', 'Globex')")
+        conn.execute(
+            "INSERT INTO invoice (id, sender_id, client_id) "
+            "VALUES (7, 's-uuid', 'c-uuid')"
+        )
+        # A client reference with no client row gets a placeholder
+        conn.execute(
+            "INSERT INTO invoice (id, sender_id, client_id) "
+            "VALUES (8, 's-uuid', 'gone')"
+        )
+        conn.commit()
+
+        migrate(conn)
+
+        assert conn.execute("SELECT id, uuid, name FROM sender").fetchall() == [
+            (1, "s-uuid", "Acme")
+        ]
+        clients = conn.execute(
+            "SELECT id, uuid, name FROM client ORDER BY id"
+        ).fetchall()
+        assert clients == [(1, "c-uuid", "Globex"), (2, "gone", "Missing client")]
+        invoices = conn.execute(
+            "SELECT id, sender_id, client_id FROM invoice ORDER BY id"
+        ).fetchall()
+        assert invoices == [(7, 1, 1), (8, 1, 2)]
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+        hits = conn.execute(
+            "SELECT rowid FROM client_fts WHERE client_fts MATCH 'glob*'"
+        ).fetchall()
+        assert hits == [(1,)]
+
+        # New rows get an integer id and a generated UUID
+        conn.execute("INSERT INTO client (name) VALUES ('Initech')")
+        uuid = conn.execute("SELECT uuid FROM client WHERE id = 3").fetchone()[0]
+        assert len(uuid) == 36 and uuid[14] == "4"
+
+    def test_existing_database_switches_to_incremental_vacuum(self, conn):
+        """Test that the auto_vacuum migration rebuilds the file after commit"""
+        migrate(conn, target=10)
+        assert conn.execute("PRAGMA auto_vacuum").fetchone() == (0,)
+
+        assert migrate(conn) == [11]
+
+        assert conn.execute("PRAGMA auto_vacuum").fetchone() == (2,)
+        assert not conn.in_transaction
@@ -0,0 +1,47 @@
+import pytest
+from decimal import Decimal
+
+from money import (
+    format_quantity,
+    from_minor,
+    from_scaled_quantity,
+    line_total,
+    line_total_minor,
+    to_minor,
+    to_scaled_quantity,
+)
+
+
+class TestConversions:
+    def test_to_minor_rounds_half_up(self):
+        """Test converting currency amounts to cents"""
+        assert to_minor(19.99) == 1999
+        assert to_minor("2.675") == 268
+        assert to_minor(Decimal("0.005")) == 1
+        assert to_minor(7) == 700
+
+    def test_round_trip(self):
+        """Test that stored integers convert back to exact decimals"""
+        assert from_minor(to_minor("1234.56")) == Decimal("1234.56")
+        assert from_scaled_quantity(to_scaled_quantity(1.25)) == Decimal("1.25")
+        assert str(from_minor(50)) == "0.50"
+
+    @pytest.mark.parametrize("value", [None, "", "abc", True, "nan", float("inf")])
+    def test_invalid_values_rejected(self, value):
+        """Test that non-numbers raise ValueError"""
+        with pytest.raises(ValueError):
+            to_minor(value)
+
+
+class TestLineTotals:
+    def test_line_total_matches_database_formula(self):
+        """Test that line totals round half up to the cent"""
+        # 1.5 x 0.33 = 0.495
+        assert line_total_minor(1500, 33) == 50
+        assert line_total(1.5, 0.33) == Decimal("0.50")
+        assert line_total(40, 75.00) == Decimal("3000.00")
+
+    def test_format_quantity(self):
+        """Test that quantities are shown without trailing zeros"""
+        assert format_quantity(Decimal("10.000")) == "10"
+        assert format_quantity(Decimal("1.250")) == "1.25"
@@ -5,7 +5,8 @@ from unittest.mock import patch, MagicMock
 from datetime import datetime
 from reportlab.lib.pagesizes import letter
 
-from pdf_generator import generate_invoice_pdf
+from pdf_generator import generate_invoice_pdf, generate_invoice_pdfs
+from records import Invoice, InvoiceItem
 
 
 class TestPDFGenerator:
@@ -35,7 +36,7 @@ class TestPDFGenerator:
             ("Design Work", 5, 50.00)
         ]
         
-        return invoice_data, items
+        return Invoice(*invoice_data), [InvoiceItem(*item) for item in items]
 
     @pytest.fixture
     def temp_output_dir(self):
@@ -132,6 +133,7 @@ class TestPDFGenerator:
             "contact@testcompany.com", "555-123-4567", "Client Corp", "456 Client Ave",
             "billing@clientcorp.com", "Thank you!", "sender-uuid", "client-uuid", 1
         )
+        invoice_data = Invoice(*invoice_data)
         items = []  # No items
         
         output_path = os.path.join(temp_output_dir, "no_items.pdf")
@@ -156,9 +158,10 @@ class TestPDFGenerator:
             "sender-uuid", "client-uuid", 1
         )
         
+        invoice_data = Invoice(*invoice_data)
         items = [
-            ("Very long detailed description of web development services including front-end and back-end work", 40, 75.00),
-            ("Extended consulting services with detailed analysis and recommendations", 10, 100.00)
+            InvoiceItem("Very long detailed description of web development services including front-end and back-end work", 40, 75.00),
+            InvoiceItem("Extended consulting services with detailed analysis and recommendations", 10, 100.00)
         ]
         
         output_path = os.path.join(temp_output_dir, "long_content.pdf")
@@ -167,4 +170,18 @@ class TestPDFGenerator:
             result_path = generate_invoice_pdf(3, output_path)
             
             assert os.path.exists(result_path)
-            assert os.path.getsize(result_path) > 0
\ No newline at end of file
+            assert os.path.getsize(result_path) > 0
+
+    def test_generate_invoice_pdfs_batch(self, mock_invoice_data, temp_output_dir):
+        """Test exporting several invoices with one batched lookup"""
+        invoice_data, items = mock_invoice_data
+        second = Invoice(2, *invoice_data[1:])
+        batch = {1: (invoice_data, items), 2: (second, [])}
+
+        with patch('pdf_generator.get_invoice_data_many', return_value=batch) as lookup:
+            result = generate_invoice_pdfs([1, 2, 3], temp_output_dir)
+
+            lookup.assert_called_once_with([1, 2, 3])
+            assert sorted(result) == [1, 2]
+            for path in result.values():
+                assert os.path.exists(path)
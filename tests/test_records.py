@@ -0,0 +1,55 @@
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+from records import Client, FooterMessage, InvoiceItem, Sender
+
+
+class TestRecords:
+    def test_named_and_positional_access(self):
+        """Test that fields read by name, index, slice and unpacking"""
+        client = Client("c1", "Acme", "1 Road", "a@acme.test")
+        assert client.name == "Acme"
+        assert client[1] == "Acme"
+        assert client[-1] == "a@acme.test"
+        assert client[1:3] == ("Acme", "1 Road")
+        client_id, name, address, email = client
+        assert (client_id, email) == ("c1", "a@acme.test")
+        assert len(client) == 4
+
+    def test_equality_with_tuples(self):
+        """Test that records compare equal to the tuples they replace"""
+        message = FooterMessage(1, "Thanks")
+        assert message == (1, "Thanks")
+        assert message == FooterMessage(1, "Thanks")
+        assert message != FooterMessage(2, "Thanks")
+        assert hash(message) == hash((1, "Thanks"))
+        assert Client("x", "n", None, None) != Sender("x", "n", None, None, None)
+
+    def test_no_instance_dict(self):
+        """Test that records are slotted and reject unknown attributes"""
+        sender = Sender("s1", "Me", None, None, None)
+        assert not hasattr(sender, "__dict__")
+        with pytest.raises(AttributeError):
+            sender.nickname = "x"
+
+    def test_from_row_factory(self):
+        """Test building records directly from a sqlite3 cursor"""
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = FooterMessage.from_row
+        row = conn.execute("SELECT 7, 'Due in 30 days'").fetchone()
+        conn.close()
+        assert isinstance(row, FooterMessage)
+        assert row.message == "Due in 30 days"
+
+    def test_item_line_total(self):
+        """Test the computed line total and dict conversion"""
+        item = InvoiceItem("Consulting", Decimal("1.5"), Decimal("0.33"))
+        assert item.line_total == Decimal("0.50")
+        assert item.as_dict() == {
+            "item_name": "Consulting",
+            "amount": Decimal("1.5"),
+            "cost_per_unit": Decimal("0.33"),
+        }
+        assert repr(item).startswith("InvoiceItem(item_name='Consulting'")
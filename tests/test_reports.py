@@ -0,0 +1,176 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+import reports
+from database import (
+    add_invoice_item,
+    create_client,
+    create_invoice,
+    create_sender,
+    get_connection,
+    update_client,
+    update_invoice,
+)
+from reports import (
+    aging_report,
+    paid_summary,
+    revenue_by_client,
+    revenue_by_month,
+    revenue_by_sender,
+)
+
+
+def _work(total):
+    return [("Work", 1, total)]
+
+
+def _setup(make_invoice):
+    acme = create_sender("Acme")
+    other = create_sender("Other Sender")
+    globex = create_client("Globex")
+    initech = create_client("Initech")
+    make_invoice(acme, globex, "2024-01-15 10:00:00", _work(100), paid=True)
+    make_invoice(acme, globex, "2024-02-03 10:00:00", _work(50))
+    make_invoice(other, initech, "2024-02-20 10:00:00", _work(30), paid=True)
+    return acme, other, globex, initech
+
+
+class TestRevenueReports:
+    def setup_method(self):
+        reports.clear_cache()
+
+    def test_revenue_by_client(self, temp_db, make_invoice):
+        """Test grouping by client, largest total first"""
+        with patch("database.DB_FILE", temp_db):
+            _, _, globex, initech = _setup(make_invoice)
+            rows = revenue_by_client()
+            assert [(r.key, r.label, r.invoices, r.items) for r in rows] == [
+                (globex, "Globex", 2, 2),
+                (initech, "Initech", 1, 1),
+            ]
+            assert rows[0].total == Decimal("150.00")
+
+    def test_revenue_by_sender_with_filters(self, temp_db, make_invoice):
+        """Test the paid and date range filters"""
+        with patch("database.DB_FILE", temp_db):
+            _setup(make_invoice)
+            paid = revenue_by_sender(paid=True)
+            assert [(r.label, r.total) for r in paid] == [
+                ("Acme", Decimal("100.00")),
+                ("Other Sender", Decimal("30.00")),
+            ]
+            february = revenue_by_sender(start="2024-02-01", end="2024-03-01")
+            assert [(r.label, r.total) for r in february] == [
+                ("Acme", Decimal("50.00")),
+                ("Other Sender", Decimal("30.00")),
+            ]
+
+    def test_revenue_by_month(self, temp_db, make_invoice):
+        """Test that months come back oldest first"""
+        with patch("database.DB_FILE", temp_db):
+            _setup(make_invoice)
+            rows = revenue_by_month()
+            assert [(r.key, r.invoices, r.total) for r in rows] == [
+                ("2024-01", 1, Decimal("100.00")),
+                ("2024-02", 2, Decimal("80.00")),
+            ]
+
+    def test_paid_summary_always_has_both_rows(self, temp_db, make_invoice):
+        """Test that paid and unpaid rows are present even with no invoices"""
+        with patch("database.DB_FILE", temp_db):
+            rows = paid_summary()
+            assert [(r.label, r.invoices, r.total) for r in rows] == [
+                ("Paid", 0, Decimal("0")),
+                ("Unpaid", 0, Decimal("0")),
+            ]
+            _setup(make_invoice)
+            rows = paid_summary()
+            assert [(r.label, r.invoices, r.total) for r in rows] == [
+                ("Paid", 2, Decimal("130.00")),
+                ("Unpaid", 1, Decimal("50.00")),
+            ]
+
+    def test_cached_until_data_changes(self, temp_db, make_invoice):
+        """Test that results are reused until an invoice or client changes"""
+        with patch("database.DB_FILE", temp_db):
+            acme, _, globex, _ = _setup(make_invoice)
+            first = revenue_by_client()
+            with patch("reports._run") as run:
+                assert revenue_by_client() == first
+                run.assert_not_called()
+
+            invoice_id = create_invoice(acme, globex)
+            add_invoice_item(invoice_id, "More work", 2, 10)
+            assert revenue_by_client()[0].total == Decimal("170.00")
+
+            update_client(globex, "Globex Corporation", "", "")
+            assert revenue_by_client()[0].label == "Globex Corporation"
+
+            update_invoice(invoice_id, acme, globex, None, True)
+            assert paid_summary()[0].invoices == 3
+
+    def test_report_uses_covering_index(self, temp_db):
+        """Test that the client report reads only the report index"""
+        with patch("database.DB_FILE", temp_db):
+            where, params = reports._filters(True, "2024-01-01", "2025-01-01")
+            plan = get_connection().execute(
+                "EXPLAIN QUERY PLAN SELECT client_id, COUNT(*), SUM(item_count), "
+                f"SUM(grand_total) FROM invoice {where} GROUP BY client_id",
+                params,
+            ).fetchall()
+            assert any(
+                "COVERING INDEX idx_invoice_client_report" in row[3] for row in plan
+            )
+
+
+class TestAgingReport:
+    def setup_method(self):
+        reports.clear_cache()
+
+    def test_buckets_by_days_outstanding(self, temp_db, make_invoice):
+        """Test that unpaid invoices land in the right age bucket"""
+        with patch("database.DB_FILE", temp_db):
+            sender = create_sender("Acme")
+            globex = create_client("Globex")
+            initech = create_client("Initech")
+            make_invoice(sender, globex, "2024-04-01 23:00:00", _work(5))  # 0 days
+            make_invoice(sender, globex, "2024-03-20 23:00:00", _work(10))  # 12 days
+            make_invoice(sender, globex, "2024-03-03 10:00:00", _work(20))  # 29 days
+            make_invoice(sender, globex, "2024-03-02 10:00:00", _work(40))  # 30 days
+            make_invoice(sender, initech, "2024-01-03 10:00:00", _work(80))  # 89 days
+            make_invoice(sender, initech, "2024-01-02 10:00:00", _work(160))  # 90 days
+            make_invoice(sender, initech, "2023-01-01 10:00:00", _work(999), paid=True)
+            # Dated after as_of, so not yet outstanding
+            make_invoice(sender, globex, "2024-04-02 08:00:00", _work(500))
+            make_invoice(sender, create_client("Later"), "2024-06-01", _work(5))
+
+            rows = aging_report(as_of="2024-04-01")
+            assert [
+                (r.client, r.invoices, r.current, r.days_30, r.days_60, r.days_90)
+                for r in rows
+            ] == [
+                ("Initech", 2, 0, 0, Decimal("80.00"), Decimal("160.00")),
+                ("Globex", 4, Decimal("35.00"), Decimal("40.00"), 0, 0),
+            ]
+            assert [r.total for r in rows] == [Decimal("240.00"), Decimal("75.00")]
+            assert [r.oldest_days for r in rows] == [90, 30]
+            assert [round(r.share, 4) for r in rows] == [0.7619, 0.2381]
+
+    def test_paying_removes_invoice(self, temp_db, make_invoice):
+        """Test that a paid invoice drops out of a cached report"""
+        with patch("database.DB_FILE", temp_db):
+            sender = create_sender("Acme")
+            client = create_client("Globex")
+            invoice_id = make_invoice(sender, client, "2024-01-01 10:00:00", _work(50))
+            assert len(aging_report(as_of="2024-04-01")) == 1
+
+            update_invoice(invoice_id, sender, client, None, True)
+            assert aging_report(as_of="2024-04-01") == []
+
+    def test_invalid_date(self, temp_db):
+        """Test that a malformed as_of date is rejected"""
+        with patch("database.DB_FILE", temp_db):
+            with pytest.raises(ValueError):
+                aging_report(as_of="last week")
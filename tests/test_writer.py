@@ -0,0 +1,133 @@
+import sqlite3
+import threading
+from unittest.mock import patch
+
+import pytest
+
+import database
+from database import (
+    create_client,
+    create_invoice,
+    create_sender,
+    get_invoice_data,
+    list_clients,
+    lock_stats,
+    reset_lock_stats,
+    set_pragma_profile,
+    transaction,
+)
+from writer import WriteQueue
+
+
+@pytest.fixture
+def write_queue():
+    queue = WriteQueue(max_delay=0.05)
+    yield queue
+    queue.close()
+
+
+class TestWriteQueue:
+    def test_results_and_order(self, temp_db, write_queue):
+        """Test that jobs return their results in submission order"""
+        with patch("database.DB_FILE", temp_db):
+            futures = [
+                write_queue.submit(create_client, f"Client {n}") for n in range(5)
+            ]
+            ids = [future.result() for future in futures]
+            assert len(set(ids)) == 5
+            assert [c.name for c in list_clients()] == [f"Client {n}" for n in range(5)]
+
+    def test_group_commit(self, temp_db, write_queue):
+        """Test that writes queued together share one transaction"""
+        with patch("database.DB_FILE", temp_db):
+            invoice_id = create_invoice(create_sender("S"), create_client("C"))
+            release = threading.Event()
+            blocker = write_queue.submit(release.wait)
+            futures = [
+                write_queue.submit(
+                    database.add_invoice_item, invoice_id, f"Item {n}", 1, 10
+                )
+                for n in range(20)
+            ]
+            release.set()
+            blocker.result()
+            for future in futures:
+                future.result()
+
+            stats = write_queue.stats()
+            assert stats["jobs"] == 21
+            assert stats["batches"] < 21
+            assert len(get_invoice_data(invoice_id)[1]) == 20
+
+    def test_failed_job_rolls_back_alone(self, temp_db, write_queue):
+        """Test that one failing job does not undo the rest of its batch"""
+
+        def insert_then_fail():
+            with transaction() as c:
+                c.execute("INSERT INTO client (name) VALUES ('Doomed')")
+                raise RuntimeError("boom")
+
+        with patch("database.DB_FILE", temp_db):
+            release = threading.Event()
+            write_queue.submit(release.wait)
+            good = write_queue.submit(create_client, "Kept")
+            bad = write_queue.submit(insert_then_fail)
+            invalid = write_queue.submit(create_client, "")
+            release.set()
+
+            assert good.result()
+            with pytest.raises(RuntimeError, match="boom"):
+                bad.result()
+            with pytest.raises(ValueError, match="Client name is required"):
+                invalid.result()
+            assert [c.name for c in list_clients()] == ["Kept"]
+            assert write_queue.stats()["failed"] == 2
+
+    def test_close_and_restart(self, temp_db, write_queue):
+        """Test that a closed queue starts a new thread when used again"""
+        with patch("database.DB_FILE", temp_db):
+            write_queue.call(create_client, "Before")
+            write_queue.close()
+            write_queue.call(create_client, "After")
+            assert len(list_clients()) == 2
+
+
+class TestLockRetry:
+    @pytest.fixture
+    def short_timeout(self, temp_db):
+        with patch("database.DB_FILE", temp_db):
+            set_pragma_profile({"busy_timeout": 20, "journal_mode": "WAL"})
+            reset_lock_stats()
+            yield
+            set_pragma_profile("durable")
+
+    def test_retries_until_lock_released(self, temp_db, short_timeout):
+        """Test that a write waits out another connection's lock"""
+        other = sqlite3.connect(temp_db, check_same_thread=False)
+        other.execute("BEGIN IMMEDIATE")
+        timer = threading.Timer(0.1, other.rollback)
+        timer.start()
+        try:
+            create_client("Patient")
+        finally:
+            timer.join()
+            other.close()
+
+        stats = lock_stats()
+        assert stats["retries"] >= 1
+        assert stats["contended"] == 1
+        assert stats["total_wait"] >= 0.05
+        assert [c.name for c in list_clients()] == ["Patient"]
+
+    def test_gives_up_after_retries(self, temp_db, short_timeout):
+        """Test that a lock held for too long still raises"""
+        other = sqlite3.connect(temp_db)
+        other.execute("BEGIN IMMEDIATE")
+        try:
+            with patch("database.WRITE_RETRY_DELAY", 0.001):
+                with pytest.raises(sqlite3.OperationalError, match="locked"):
+                    create_client("Impatient")
+        finally:
+            other.rollback()
+            other.close()
+        assert lock_stats()["failures"] == 1
@@ -0,0 +1,152 @@
+"""Single-writer queue with group commit.
+
+Many small writes from several threads each pay for their own transaction
+and fight over the database lock. A WriteQueue funnels them through one
+background thread instead: every job that queued up while the previous
+commit was running (up to ``max_batch`` of them) goes into the next
+transaction, so the commit cost is shared. A ``max_delay`` above zero also
+waits that many seconds for more jobs, trading latency for larger groups.
+Each job runs in its own savepoint, so a job that raises is rolled back
+alone and the rest of the batch still commits.
+
+Jobs are ordinary database.py calls::
+
+    queue = WriteQueue()
+    future = queue.submit(database.add_invoice_item, invoice_id, "Work", 1, 80)
+    item_id = future.result()
+
+Futures resolve only after the batch has committed.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import database
+
+DEFAULT_MAX_BATCH = 200
+DEFAULT_MAX_DELAY = 0.0
+
+
+class WriteQueue:
+    """Serializes writes through one thread and commits them in groups"""
+
+    def __init__(self, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY):
+        if max_batch < 1:
+            raise ValueError("Batch size must be positive")
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self.jobs = 0
+        self.failed = 0
+        self.batches = 0
+        self.largest_batch = 0
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) and return a Future for its result"""
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="pynvoice-writer", daemon=True
+                )
+                self._thread.start()
+            self._queue.put((future, func, args, kwargs))
+        return future
+
+    def call(self, func, *args, **kwargs):
+        """Run func through the queue and wait for its result"""
+        return self.submit(func, *args, **kwargs).result()
+
+    def close(self):
+        """Finish the queued jobs and stop the writer thread.
+
+        A later submit() starts a new thread.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def stats(self):
+        """Return job, batch and lock-wait counts"""
+        with self._stats_lock:
+            stats = {
+                "jobs": self.jobs,
+                "failed": self.failed,
+                "batches": self.batches,
+                "largest_batch": self.largest_batch,
+            }
+        stats["lock"] = database.lock_stats()
+        return stats
+
+    def _next_batch(self):
+        """Block for one job, then gather more until the batch or delay runs out.
+
+        Returns (batch, stop); stop is True once close() has been called.
+        """
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    job = self._queue.get(timeout=remaining)
+                else:
+                    job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        # Callers may have given up on a job while it sat in the queue
+        jobs = [job for job in batch if job[0].set_running_or_notify_cancel()]
+        if not jobs:
+            return
+
+        outcomes = []
+        try:
+            with database.transaction():
+                for future, func, args, kwargs in jobs:
+                    try:
+                        with database.transaction():
+                            outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            # The commit itself failed, so nothing in the batch was written
+            outcomes = [(future, None, e) for future, *_ in jobs]
+
+        failed = 0
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                failed += 1
+                future.set_exception(error)
+
+        with self._stats_lock:
+            self.jobs += len(jobs)
+            self.failed += failed
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(jobs))